@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import time
+import cv2
+from aiohttp import web
+
+# Bounds for the per-client query parameters and for adaptation
+MIN_FPS, MAX_FPS = 1.0, 30.0
+MIN_SCALE, MAX_SCALE = 0.25, 1.0
+MIN_QUALITY, MAX_QUALITY = 20, 95
+
+
+def clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+class AdaptiveStream:
+    """Per-client frame rate, scale and JPEG quality, adapted to the link.
+
+    The query parameters are ceilings. After every frame the measured send
+    time is compared with the frame budget (the interval at the current fps):
+    when sends overrun or the socket buffer backs up, quality drops first, then
+    resolution, then frame rate; when the link has headroom they recover in
+    the reverse order.
+    """
+
+    def __init__(self, max_fps=15, scale=1.0, quality=80, backlog_limit=256 * 1024):
+        self.max_fps = clamp(max_fps, MIN_FPS, MAX_FPS)
+        self.max_scale = clamp(scale, MIN_SCALE, MAX_SCALE)
+        self.max_quality = int(clamp(quality, MIN_QUALITY, MAX_QUALITY))
+        self.fps = self.max_fps
+        self.scale = self.max_scale
+        self.quality = self.max_quality
+        self.backlog_limit = backlog_limit  # Bytes queued in the transport before it counts as back-pressure
+        self.throughput = None  # Smoothed bytes per second
+        self._headroom_frames = 0
+
+    @classmethod
+    def from_query(cls, query):
+        return cls(max_fps=float(query.get('fps', 15)),
+                   scale=float(query.get('scale', 1.0)),
+                   quality=int(query.get('quality', 80)))
+
+    @property
+    def interval(self):
+        return 1.0 / self.fps
+
+    def profile(self):
+        """Encoding key, quantised so clients with similar settings share encodes."""
+        return round(self.scale * 20) / 20, int(self.quality // 5 * 5)
+
+    def record_send(self, size, seconds, backlog):
+        rate = size / max(seconds, 1e-6)
+        self.throughput = rate if self.throughput is None else 0.8 * self.throughput + 0.2 * rate
+        budget = self.interval * 0.8
+        if seconds > budget or backlog > self.backlog_limit:
+            self._headroom_frames = 0
+            self._degrade()
+        elif seconds < budget * 0.4 and backlog == 0:
+            self._headroom_frames += 1
+            if self._headroom_frames >= self.fps:  # About a second of spare capacity
+                self._headroom_frames = 0
+                self._recover()
+        else:
+            self._headroom_frames = 0
+
+    def _degrade(self):
+        if self.quality > MIN_QUALITY + 20:
+            self.quality = max(MIN_QUALITY, self.quality - 10)
+        elif self.scale > MIN_SCALE:
+            self.scale = max(MIN_SCALE, self.scale * 0.75)
+        elif self.fps > MIN_FPS:
+            self.fps = max(MIN_FPS, self.fps * 0.75)
+        else:
+            self.quality = max(MIN_QUALITY, self.quality - 10)
+
+    def _recover(self):
+        if self.fps < self.max_fps:
+            self.fps = min(self.max_fps, self.fps * 1.25)
+        elif self.scale < self.max_scale:
+            self.scale = min(self.max_scale, self.scale / 0.75)
+        elif self.quality < self.max_quality:
+            self.quality = min(self.max_quality, self.quality + 5)
+
+
+class EncodeCache:
+    """Latest encode per (scale, quality) profile, shared by every client using it."""
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+        self._entries = {}  # profile -> (version, jpeg bytes)
+        self._pending = {}  # (profile, version) -> future of an encode in flight
+        self._new_frame = None  # Set (and replaced) on the loop for every captured frame
+        self._listener = None
+
+    def attach(self, loop):
+        """Have the broadcaster's producer thread wake wait_for_frame() on this loop."""
+        self._new_frame = asyncio.Event()
+        self._listener = lambda: loop.call_soon_threadsafe(self._wake)
+        self.broadcaster.add_listener(self._listener)
+
+    def detach(self):
+        """Stop waking the loop, before it closes."""
+        if self._listener is not None:
+            self.broadcaster.remove_listener(self._listener)
+            self._listener = None
+
+    def _wake(self):
+        event, self._new_frame = self._new_frame, asyncio.Event()
+        event.set()
+
+    async def wait_for_frame(self, last_version):
+        """Return once the broadcaster has a frame newer than last_version."""
+        while True:
+            event = self._new_frame  # Taken before the check, so a frame in between still wakes it
+            if self.broadcaster.version != last_version:
+                return
+            await event.wait()
+
+    def _encode(self, frame, scale, quality):
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer.tobytes() if ret else None
+
+    async def get(self, profile):
+        """Encoded newest frame for a profile, or None if no frame has been captured yet."""
+        version, frame = self.broadcaster.version, self.broadcaster.frame
+        if frame is None:
+            return None, None
+        entry = self._entries.get(profile)
+        if entry and entry[0] == version:
+            return entry
+        pending = self._pending.get((profile, version))
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = loop.run_in_executor(None, self._encode, frame, *profile)
+            self._pending[(profile, version)] = pending
+            pending.add_done_callback(lambda future: self._finish(profile, version, future))
+        # Shielded: a client that disconnects must not cancel the encode other clients are awaiting
+        return version, await asyncio.shield(pending)
+
+    def _finish(self, profile, version, future):
+        del self._pending[(profile, version)]
+        entry = self._entries.get(profile)
+        if not future.cancelled() and future.exception() is None and (entry is None or entry[0] < version):
+            self._entries[profile] = (version, future.result())
+
+
+async def video_feed(request):
+    broadcaster = request.app['broadcaster']
+    cache = request.app['encode_cache']
+    stream = AdaptiveStream.from_query(request.query)
+    broadcaster.start()
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'multipart/x-mixed-replace; boundary=frame',
+        'Cache-Control': 'no-cache',
+    })
+    await response.prepare(request)
+
+    sent_version = 0
+    try:
+        while True:
+            next_due = time.monotonic() + stream.interval
+            await cache.wait_for_frame(sent_version)
+            version, jpeg = await cache.get(stream.profile())
+            sent_version = version
+            if jpeg is None:
+                continue
+
+            started = time.monotonic()
+            # write() awaits transport drain, so a congested link shows up as send time
+            await response.write(b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+            elapsed = time.monotonic() - started
+            backlog = request.transport.get_write_buffer_size() if request.transport else 0
+            stream.record_send(len(jpeg), elapsed, backlog)
+
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+    except ConnectionResetError:
+        logging.info(f"Video client {request.remote} disconnected")
+    return response
+
+
+def wsgi_handler(wsgi_app):
+    """aiohttp handler serving a request from a WSGI app (the Flask routes) on the default executor."""
+    from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+    def call(environ):
+        app_iter, status, headers = run_wsgi_app(wsgi_app, environ, buffered=True)
+        try:
+            return b''.join(app_iter), status, headers
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    async def handler(request):
+        builder = EnvironBuilder(path=request.path, method=request.method, query_string=request.query_string,
+                                 headers=list(request.headers.items()), data=await request.read())
+        environ = builder.get_environ()
+        environ['REMOTE_ADDR'] = request.remote or ''
+        body, status, headers = await asyncio.get_running_loop().run_in_executor(None, call, environ)
+        headers = [(name, value) for name, value in headers.items() if name.lower() != 'content-length']
+        return web.Response(body=body, status=int(status.split()[0]), headers=headers)
+    return handler
+
+
+def create_app(broadcaster, wsgi_app=None):
+    """Stream /video-feed from broadcaster; any other path is served by wsgi_app, if given."""
+    app = web.Application()
+    app['broadcaster'] = broadcaster
+    app['encode_cache'] = EncodeCache(broadcaster)
+
+    async def attach_cache(app):
+        app['encode_cache'].attach(asyncio.get_running_loop())
+
+    async def detach_cache(app):
+        app['encode_cache'].detach()
+    app.on_startup.append(attach_cache)
+    app.on_cleanup.append(detach_cache)
+    app.router.add_get('/video-feed', video_feed)
+    if wsgi_app is not None:
+        app.router.add_route('*', '/{path:.*}', wsgi_handler(wsgi_app))
+    return app
+
+
+def run(broadcaster, host='0.0.0.0', port=5005, wsgi_app=None):
+    web.run_app(create_app(broadcaster, wsgi_app), host=host, port=port)
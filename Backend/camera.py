@@ -1,24 +1,97 @@
-from flask import Flask, Response
-import cv2
+from flask import Flask, Response, request, jsonify
+import argparse
+import os
+import sys
+from frame_broadcaster import FrameBroadcaster
+from overlay import DetectionOverlay
+from detection_feed import DetectionFeed
+
+# Victim index, frame sources and metrics are shared with the detection server
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yolo-drone copy'))
+from victim_index import VictimIndex
+from sources import open_frame_source
+from instrumentation import Registry
 
 app = Flask(__name__)
 
-camera = cv2.VideoCapture(0) 
+# Camera index, video file or 'synthetic' (see sources.open_frame_source). Opened when the first
+# viewer connects, so flask run and WSGI servers get it too; --source overrides it.
+CAMERA_SOURCE = os.environ.get('CAMERA_SOURCE', '0')
+
+# Latest detections, drawn onto the stream frames right before they are encoded
+overlay = DetectionOverlay()
+
+# Stream metrics of this process; the detection server's are relayed through the feed
+metrics = Registry(prefix='backend_')
+
+# One capture + encode for all viewers (CameraFeed and MapComponent both open /video-feed)
+broadcaster = FrameBroadcaster(None, overlay=overlay, metrics=metrics,
+                               open_camera=lambda: open_frame_source(CAMERA_SOURCE))
+
+# Victims reported by the detection server, for live map queries
+victims = VictimIndex(merge_radius=5.0)
+
+# Subscription to the detection server, started from --detection-server
+feed = None
 
 def generate_frames():
-    while True:
-        success, frame = camera.read()
-        if not success:
-            break
-        else:
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    return broadcaster.stream()
 
 @app.route('/video-feed')
 def video_feed():
     return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text format: this stream's metrics plus the latest ones relayed by the detection server."""
+    text = metrics.render() + (feed.remote_metrics if feed is not None else '')
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
+@app.route('/detections', methods=['POST'])
+def detections():
+    """Receive the latest detection results to draw on the live stream."""
+    data = request.get_json(force=True)
+    overlay.update(data.get('detections', []), data['frame_width'], data['frame_height'],
+                   data.get('track_ids'))
+    return jsonify({'status': 'ok'})
+
+@app.route('/victims', methods=['GET'])
+def list_victims():
+    """All known victims, or the k nearest to ?latitude=&longitude=&k=."""
+    if 'latitude' in request.args and 'longitude' in request.args:
+        nearest = victims.nearest(float(request.args['latitude']), float(request.args['longitude']),
+                                  k=int(request.args.get('k', 5)))
+        return jsonify([dict(victims.get(victim_id), distance=distance) for victim_id, distance in nearest])
+    return jsonify(victims.all())
+
+@app.route('/victims/rectangle', methods=['POST'])
+def victims_in_rectangle():
+    """Victims inside an area, in the same format the dashboard sends to /drone/dispatch/rectangle."""
+    return jsonify(victims.query_rectangle(request.get_json(force=True)))
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5005)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Serve /video-feed from the asyncio server with per-client '
+                             'fps/scale/quality query parameters and link adaptation')
+    parser.add_argument('--detection-server', metavar='HOST:PORT',
+                        help='Subscribe to a DetectionServer and draw its detections on the stream')
+    parser.add_argument('--camera-id', default='nadir',
+                        help='Detection server camera whose boxes are drawn on this stream (default: nadir)')
+    parser.add_argument('--source', default=CAMERA_SOURCE,
+                        help='Camera index, video file to replay in real time, or synthetic '
+                             '(default: $CAMERA_SOURCE or 0)')
+    args = parser.parse_args()
+    CAMERA_SOURCE = args.source
+
+    if args.detection_server:
+        host, _, port = args.detection_server.rpartition(':')
+        feed = DetectionFeed(overlay, host, int(port), victims=victims, camera_id=args.camera_id)
+        feed.start()
+
+    if args.use_async:
+        import async_stream
+        # The Flask routes (metrics, victims, detections) are served alongside the async stream
+        async_stream.run(broadcaster, host='0.0.0.0', port=5005, wsgi_app=app)
+    else:
+        app.run(host='0.0.0.0', port=5005, threaded=True)
@@ -0,0 +1,63 @@
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+
+# The framed message protocol is shared with the detection server
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yolo-drone copy'))
+from protocol import MessageReader, DETECTIONS, TRACKS, METRICS
+
+
+class DetectionFeed:
+    """Subscribes to the detection server, feeding one camera's boxes into the stream
+    overlay and its victims into a VictimIndex the dashboard can query."""
+
+    def __init__(self, overlay, host, port=5000, retry_interval=2.0, victims=None, camera_id='nadir'):
+        self.overlay = overlay
+        self.victims = victims
+        self.camera_id = camera_id  # Camera whose boxes are drawn on the stream; None draws every camera's
+        self.remote_metrics = ''  # Latest metrics text relayed by the detection server
+        self.host = host
+        self.port = port
+        self.retry_interval = retry_interval
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._loop, name='detection_feed', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+
+    def _loop(self):
+        while self._running.is_set():
+            try:
+                with socket.create_connection((self.host, self.port), timeout=5) as sock:
+                    sock.settimeout(5)
+                    logging.info(f"Subscribed to detection server {self.host}:{self.port}")
+                    reader = MessageReader()
+                    while self._running.is_set():
+                        for msg_type, payload in reader.recv_from(sock):
+                            if msg_type == DETECTIONS:
+                                if self.camera_id is not None and payload.get('camera_id') != self.camera_id:
+                                    continue  # Boxes of another camera would be drawn on the wrong frame
+                                self.overlay.update(payload['boxes'], payload['frame_width'],
+                                                    payload['frame_height'], payload.get('track_ids'))
+                            elif msg_type == TRACKS and self.victims is not None:
+                                self.update_victims(payload['tracks'])
+                            elif msg_type == METRICS:
+                                self.remote_metrics = payload['text']
+            except Exception as e:
+                logging.warning(f"Detection feed error: {e}")
+                time.sleep(self.retry_interval)
+
+    def update_victims(self, tracks):
+        """Keep victims under the server's ids, following each track's smoothed position."""
+        for track in tracks:
+            victim_id = track.get('victim_id')
+            if victim_id is not None:
+                self.victims.upsert(victim_id, track['latitude'], track['longitude'], track['confidence'])
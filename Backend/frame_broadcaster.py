@@ -0,0 +1,114 @@
+import threading
+import time
+import cv2
+
+
+class FrameBroadcaster:
+    """Captures each frame once and shares it with every viewer.
+
+    A single producer thread owns the camera. Client generators only wait for
+    the frame version to change, so a slow client simply skips to the newest
+    frame instead of holding up the camera or the other viewers. The shared
+    JPEG is encoded by the first stream() client that wants a frame, so
+    nothing is encoded when only listeners (async_stream) use the frames.
+    """
+
+    def __init__(self, camera, jpeg_quality=80, overlay=None, metrics=None, open_camera=None):
+        self.camera = camera
+        self.open_camera = open_camera  # Opens the camera on the first start() when none was given
+        self.overlay = overlay  # Optional DetectionOverlay drawn before the shared encode
+        self.read_time = self.encode_time = None
+        if metrics is not None:  # Optional instrumentation.Registry
+            self.read_time = metrics.histogram('frame_read_seconds', 'Camera read per streamed frame')
+            self.encode_time = metrics.histogram('jpeg_encode_seconds', 'Shared JPEG encode per streamed frame')
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.frame = None    # Latest raw frame
+        self.jpeg = None     # Encoded frame of version jpeg_version
+        self.jpeg_version = 0
+        self.version = 0
+        self._cond = threading.Condition()
+        self._encode_lock = threading.Lock()
+        self._listeners = []  # Called from the producer thread after every new frame
+        self._running = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the producer thread if it is not running yet."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self.camera is None:
+                self.camera = self.open_camera()
+            self._running.set()
+            self._thread = threading.Thread(target=self._produce, name='frame_broadcaster', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _produce(self):
+        while self._running.is_set():
+            start = time.perf_counter()
+            success, frame = self.camera.read()
+            if not success:
+                time.sleep(0.05)
+                continue
+            if self.overlay is not None:
+                self.overlay.draw(frame)
+            if self.read_time is not None:
+                self.read_time.record(time.perf_counter() - start)
+            with self._cond:
+                self.frame = frame
+                self.version += 1
+                self._cond.notify_all()
+            for listener in list(self._listeners):
+                listener()
+
+    def add_listener(self, callback):
+        """Call callback() from the producer thread after each new frame, e.g. to wake an event loop."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def wait_for_frame(self, last_version, timeout=1.0):
+        """Block until a frame newer than last_version exists; returns (version, jpeg) or None."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.version != last_version or not self._running.is_set(),
+                                       timeout):
+                return None
+            if self.version == last_version:
+                return None
+            version, frame = self.version, self.frame
+        jpeg = self._encoded(version, frame)
+        return None if jpeg is None else (version, jpeg)
+
+    def _encoded(self, version, frame):
+        """JPEG of a frame version, encoded once however many clients ask for it."""
+        with self._encode_lock:
+            if self.jpeg_version != version:
+                start = time.perf_counter()
+                ret, buffer = cv2.imencode('.jpg', frame, self.encode_params)
+                if self.encode_time is not None:
+                    self.encode_time.record(time.perf_counter() - start)
+                if not ret:
+                    return None
+                self.jpeg, self.jpeg_version = buffer.tobytes(), version
+            return self.jpeg
+
+    def stream(self):
+        """multipart/x-mixed-replace generator for one client."""
+        self.start()
+        version = 0
+        while self._running.is_set():
+            latest = self.wait_for_frame(version)
+            if latest is None:
+                continue
+            version, frame = latest
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
@@ -0,0 +1,96 @@
+import threading
+import time
+import cv2
+import numpy as np
+
+
+class GlyphCache:
+    """Pre-rendered label images, so each distinct label part is rasterised once."""
+
+    def __init__(self, color, font_scale=0.5, thickness=1, max_entries=256):
+        self.color = color
+        self.font_scale = font_scale
+        self.thickness = thickness
+        self.max_entries = max_entries
+        self._glyphs = {}
+
+    def get(self, text):
+        glyph = self._glyphs.get(text)
+        if glyph is None:
+            if len(self._glyphs) >= self.max_entries:
+                self._glyphs.clear()
+            (width, height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX,
+                                                        self.font_scale, self.thickness)
+            mask = np.zeros((height + baseline + 2, width + 2), dtype=np.uint8)
+            cv2.putText(mask, text, (1, height + 1), cv2.FONT_HERSHEY_SIMPLEX,
+                        self.font_scale, 255, self.thickness)
+            glyph = self._glyphs[text] = mask > 0
+        return glyph
+
+
+class DetectionOverlay:
+    """Draws the latest detection results onto outgoing video frames.
+
+    Detections are stored with boxes normalised to the frame they came from,
+    so they can be drawn on the stream whatever its resolution. Results older
+    than ``ttl`` seconds are not drawn.
+    """
+
+    def __init__(self, color=(0, 255, 0), thickness=2, ttl=1.0):
+        self.color = color
+        self.thickness = thickness
+        self.ttl = ttl
+        self.glyphs = GlyphCache(color)
+        self._boxes = np.empty((0, 4))
+        self._labels = []
+        self._updated = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, detections, frame_width, frame_height, track_ids=None):
+        """
+        Replace the boxes to draw.
+
+        Args:
+            detections (array): (N, >=5) rows of x_min, y_min, x_max, y_max, conf in source pixels.
+            frame_width (int): Width of the frame the detections were made on.
+            frame_height (int): Height of the frame the detections were made on.
+            track_ids (list): Optional track id per detection, shown in the label.
+        """
+        rows = np.asarray(detections, dtype=np.float64)
+        if not rows.size:
+            rows = np.empty((0, 6))
+        boxes = rows[:, :4] / np.array([frame_width, frame_height, frame_width, frame_height])
+        # Labels are drawn in parts: the name is stable per track and the confidence text
+        # takes at most 101 values, so both stay cached while confidences change every frame
+        if track_ids is None:
+            labels = [("Human", f" {conf:.2f}") for conf in rows[:, 4]]
+        else:
+            labels = [(f"#{track_id}", f" {conf:.2f}") for track_id, conf in zip(track_ids, rows[:, 4])]
+        with self._lock:
+            self._boxes = boxes
+            self._labels = labels
+            self._updated = time.monotonic()
+
+    def draw(self, frame):
+        """Draw the current boxes onto frame in place."""
+        with self._lock:
+            if time.monotonic() - self._updated > self.ttl or not len(self._boxes):
+                return frame
+            boxes, labels = self._boxes, self._labels
+
+        height, width = frame.shape[:2]
+        pixels = (boxes * np.array([width, height, width, height])).astype(np.int32)
+        corners = np.stack([pixels[:, [0, 1]], pixels[:, [2, 1]],
+                            pixels[:, [2, 3]], pixels[:, [0, 3]]], axis=1)
+        # All rectangles in a single call
+        cv2.polylines(frame, list(corners), True, self.color, self.thickness)
+
+        for (x_min, y_min, _, _), label in zip(pixels, labels):
+            glyphs = [self.glyphs.get(part) for part in label]
+            top = max(0, y_min - max(glyph.shape[0] for glyph in glyphs) - 2)
+            left = min(max(0, x_min), width - 1)
+            for glyph in glyphs:
+                region = frame[top:top + glyph.shape[0], left:left + glyph.shape[1]]
+                region[glyph[:region.shape[0], :region.shape[1]]] = self.color
+                left += glyph.shape[1]
+        return frame
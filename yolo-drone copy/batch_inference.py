@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+try:
+    from utils.instrumentation import REGISTRY
+except ImportError:  # Imported from the repository checkout, as yolo-model/ does
+    from instrumentation import REGISTRY
+
+
+class BatchResult:
+    """Detections for one frame of a batched forward pass."""
+
+    __slots__ = ('camera_id', 'packet', 'detections', 'results', 'index', 'mode')
+
+    def __init__(self, camera_id, packet, detections, results, index, mode='full'):
+        self.camera_id = camera_id
+        self.packet = packet
+        self.detections = detections  # (N, 6) array: x_min, y_min, x_max, y_max, conf, class
+        self.results = results
+        self.index = index
+        self.mode = mode  # 'full', 'roi' or 'skip' (no detector pass, see inference_scheduler)
+
+    def render(self):
+        """Annotated copy of this frame, rendered from the shared batch results."""
+        return self.results.render()[self.index]
+
+
+class BatchInferenceEngine:
+    """Runs frames from several cameras through the model in shared batches.
+
+    Each camera keeps at most one pending frame (newer frames replace older
+    ones), and a batch is dispatched once every registered camera has a frame
+    waiting, ``max_batch_size`` is reached or ``max_wait`` seconds have passed
+    since the first frame of the batch arrived.
+
+    With a ``scheduler`` (see inference_scheduler.InferenceScheduler) each
+    frame of the batch may instead be cropped around its tracks or skipped.
+    """
+
+    def __init__(self, predict_batch, on_result, max_batch_size=4, max_wait=0.01, scheduler=None):
+        self.predict_batch = predict_batch
+        self.detector = getattr(predict_batch, '__self__', None)  # Owner of a bound predict_batch, for its timings
+        self.on_result = on_result
+        self.scheduler = scheduler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._pending = {}  # camera_id -> latest FramePacket, in arrival order
+        self._cameras = {}  # camera_id -> {'frames': n, 'dropped': n}
+        self._running = threading.Event()
+        self._thread = None
+        self.batches = 0
+        self.batched_frames = 0
+        self.batch_time = REGISTRY.histogram('inference_batch_seconds', 'Scheduled detector call per batch')
+        # Parts of the detector call, as the backend reports them in detector.timings
+        self.stage_times = {stage: REGISTRY.histogram('detector_seconds', 'Detector time per batch by stage',
+                                                      stage=stage)
+                            for stage in ('preprocess', 'inference', 'postprocess')}
+        self.frame_counts = {mode: REGISTRY.counter('inference_frames', 'Frames by inference mode', mode=mode)
+                             for mode in ('full', 'roi', 'skip')}
+
+    def register(self, camera_id):
+        with self._cond:
+            self._cameras.setdefault(camera_id, {'frames': 0, 'dropped': 0})
+
+    def submit(self, camera_id, packet):
+        """Queue a frame for the next batch, replacing any unprocessed older frame."""
+        with self._cond:
+            counters = self._cameras.setdefault(camera_id, {'frames': 0, 'dropped': 0})
+            counters['frames'] += 1
+            if camera_id in self._pending:
+                counters['dropped'] += 1
+            self._pending[camera_id] = packet
+            self._cond.notify()
+
+    def _collect(self):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending, timeout=0.5):
+                return []
+            target = min(self.max_batch_size, len(self._cameras))
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            # Cameras that have waited longest go first when the batch is capped
+            batch = list(self._pending.items())[:self.max_batch_size]
+            for camera_id, _ in batch:
+                del self._pending[camera_id]
+            return batch
+
+    def _loop(self):
+        while self._running.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            frames = [packet.frame for _, packet in batch]
+            try:
+                start = time.perf_counter()
+                if self.scheduler is not None:
+                    detections, modes, results = self.scheduler.predict(
+                        self.predict_batch, [camera_id for camera_id, _ in batch], frames)
+                else:
+                    detections, results = self.predict_batch(frames)
+                    modes = ['full'] * len(batch)
+                self.batch_time.record(time.perf_counter() - start)
+            except Exception as e:
+                logging.error(f"Batch inference error: {e}")
+                continue
+            if 'full' in modes or 'roi' in modes:  # Otherwise the detector did not run this batch
+                for stage, seconds in getattr(self.detector, 'timings', {}).items():
+                    if stage in self.stage_times:
+                        self.stage_times[stage].record(seconds)
+            for mode in modes:
+                self.frame_counts[mode].inc()
+            self.batches += 1
+            self.batched_frames += len(batch)
+            for index, (camera_id, packet) in enumerate(batch):
+                self.on_result(BatchResult(camera_id, packet, detections[index], results, index, modes[index]))
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._loop, name='batch_inference', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def stats(self):
+        with self._cond:
+            cameras = {camera_id: dict(counters) for camera_id, counters in self._cameras.items()}
+            pending = len(self._pending)
+        return {
+            'cameras': cameras,
+            'pending': pending,
+            'batches': self.batches,
+            'mean_batch_size': self.batched_frames / self.batches if self.batches else None,
+        }
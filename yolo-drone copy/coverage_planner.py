@@ -0,0 +1,77 @@
+import math
+import numpy as np
+try:
+    from utils.geodesy import LocalFrame, haversine_np
+except ImportError:  # Imported from the repository checkout, as Backend/ does
+    from geodesy import LocalFrame, haversine_np
+
+
+def parse_rectangle(area):
+    """(north, south, west, east) from the dashboard's dispatch body (top_left / bottom_right)."""
+    north = float(area['top_left']['latitude'])
+    west = float(area['top_left']['longitude'])
+    south = float(area['bottom_right']['latitude'])
+    east = float(area['bottom_right']['longitude'])
+    return max(north, south), min(north, south), min(west, east), max(west, east)
+
+
+def swath_width(altitude, fov=45):
+    """Ground width in meters seen across the frame from altitude, as in PixelTables."""
+    return 2 * altitude * math.tan(math.radians(fov) / 2)
+
+
+def lane_offsets(extent, swath, spacing):
+    """Lane centre lines covering [0, extent] with lanes at most spacing apart."""
+    if extent <= swath:
+        return np.array([extent / 2])
+    lanes = int(math.ceil((extent - swath) / spacing)) + 1
+    return np.linspace(swath / 2, extent - swath / 2, lanes)
+
+
+def plan_coverage(north, south, west, east, altitude, fov=45, overlap=0.2):
+    """
+    Boustrophedon (lawnmower) waypoints that sweep the camera footprint over a rectangle.
+
+    Lanes run along the longer side of the rectangle, so there are as few turns
+    as possible, and only lane end points are returned. Planning cost is
+    O(lanes), so a square kilometer takes well under a millisecond.
+
+    Args:
+        north, south, west, east (float): Rectangle bounds in decimal degrees.
+        altitude (float): Search altitude above ground in meters.
+        fov (float): Camera field of view in degrees.
+        overlap (float): Fraction of the swath shared by neighbouring lanes, 0 to <1.
+
+    Returns:
+        array: (N, 2) latitude, longitude waypoints in flying order.
+    """
+    if not 0 <= overlap < 1:
+        raise ValueError("overlap must be in [0, 1)")
+    frame = LocalFrame(south, west)
+    width, height = (float(v) for v in frame.to_enu(north, east))
+    swath = swath_width(altitude, fov)
+    spacing = swath * (1 - overlap)
+
+    along_east = width >= height
+    along, across = (width, height) if along_east else (height, width)
+    offsets = lane_offsets(across, swath, spacing)
+    start, end = (swath / 2, along - swath / 2) if along > swath else (along / 2, along / 2)
+
+    # Two points per lane, every other lane flown in reverse
+    ends = np.tile([start, end], (len(offsets), 1))
+    ends[1::2] = ends[1::2, ::-1]
+    along_m = ends.ravel()
+    across_m = np.repeat(offsets, 2)
+    east_m, north_m = (along_m, across_m) if along_east else (across_m, along_m)
+    lat, lon = frame.to_geodetic(east_m, north_m)
+    waypoints = np.column_stack([lat, lon])
+    # A rectangle narrower than the swath gives zero-length lanes
+    keep = np.concatenate([[True], np.any(np.diff(waypoints, axis=0) != 0, axis=1)])
+    return waypoints[keep]
+
+
+def path_length(waypoints):
+    """Length in meters of the path through (N, 2) latitude, longitude waypoints."""
+    if len(waypoints) < 2:
+        return 0.0
+    return float(haversine_np(waypoints[:-1, 0], waypoints[:-1, 1], waypoints[1:, 0], waypoints[1:, 1]).sum())
@@ -0,0 +1,142 @@
+import numpy as np
+try:
+    from utils.geodesy import haversine_matrix
+except ImportError:  # Imported from the repository checkout, as yolo-model/ does
+    from geodesy import haversine_matrix
+
+
+def nearest_neighbour(dist, start, candidates, count):
+    """Greedy open path from start through up to count of the candidate nodes."""
+    remaining = np.asarray(candidates, dtype=np.intp)
+    path = [start]
+    for _ in range(min(count, len(remaining))):
+        k = int(np.argmin(dist[path[-1], remaining]))
+        path.append(int(remaining[k]))
+        remaining = np.delete(remaining, k)
+    return np.array(path, dtype=np.intp)
+
+
+def two_opt(dist, path, max_passes=20):
+    """Improve an open path with a fixed first node by reversing segments while it gets shorter.
+
+    For each segment start the best segment end is found in one vectorized
+    pass over the distance matrix, so a pass costs O(n) numpy operations.
+    """
+    path = np.array(path, dtype=np.intp)
+    n = len(path)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = path[i - 1], path[i]
+            ends = path[i + 1:]                       # Candidate segment ends path[j], j > i
+            after = path[i + 2:]                      # path[j + 1], missing for the last node
+            removed = dist[a, b] + np.append(dist[ends[:-1], after], 0.0)
+            added = dist[a, ends] + np.append(dist[b, after], 0.0)
+            delta = added - removed
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-6:
+                j = i + 1 + k
+                path[i:j + 1] = path[i:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return path
+
+
+def path_length(dist, path):
+    return float(dist[path[:-1], path[1:]].sum())
+
+
+class DeliveryPlanner:
+    """Orders confirmed victims into a delivery route from the drone's current position.
+
+    Node 0 of the distance matrix is the drone, the rest are targets. Adding
+    or moving a target only computes its own row, and a new target is slotted
+    into the current route by cheapest insertion instead of replanning.
+    """
+
+    def __init__(self, max_passes=20):
+        self.max_passes = max_passes
+        self.ids = []
+        self.lats = np.zeros(1)
+        self.lons = np.zeros(1)
+        self.dist = np.zeros((1, 1))
+        self.route = []  # Planned target ids, in visiting order
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _update_row(self, node):
+        row = haversine_matrix(self.lats[node:node + 1], self.lons[node:node + 1], self.lats, self.lons)[0]
+        self.dist[node, :] = row
+        self.dist[:, node] = row
+
+    def set_position(self, lat, lon):
+        self.lats[0], self.lons[0] = lat, lon
+        self._update_row(0)
+
+    def update_target(self, target_id, lat, lon, payloads=None):
+        """
+        Add a target or move an existing one.
+
+        Args:
+            target_id: Track id of the victim.
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+            payloads (int): Remaining payloads; when given, a new target is inserted into
+                the current route if there is a payload left for it.
+        """
+        if target_id in self.ids:
+            node = self.ids.index(target_id) + 1
+            self.lats[node], self.lons[node] = lat, lon
+            self._update_row(node)
+            return
+        self.ids.append(target_id)
+        self.lats = np.append(self.lats, lat)
+        self.lons = np.append(self.lons, lon)
+        self.dist = np.pad(self.dist, ((0, 1), (0, 1)))
+        self._update_row(len(self.ids))
+        if payloads is not None and len(self.route) < payloads:
+            self._insert(target_id)
+
+    def remove_target(self, target_id):
+        if target_id not in self.ids:
+            return
+        node = self.ids.index(target_id) + 1
+        del self.ids[node - 1]
+        self.lats = np.delete(self.lats, node)
+        self.lons = np.delete(self.lons, node)
+        self.dist = np.delete(np.delete(self.dist, node, axis=0), node, axis=1)
+        if target_id in self.route:
+            self.route.remove(target_id)
+
+    def _nodes(self, route):
+        return np.array([0] + [self.ids.index(target_id) + 1 for target_id in route], dtype=np.intp)
+
+    def _insert(self, target_id):
+        """Cheapest insertion of one target into the current route."""
+        path = self._nodes(self.route)
+        node = self.ids.index(target_id) + 1
+        # Cost of placing the node after each path position; appending at the end has no outgoing edge
+        cost = self.dist[path, node] + np.append(self.dist[node, path[1:]] - self.dist[path[:-1], path[1:]], 0.0)
+        position = int(np.argmin(cost))
+        self.route.insert(position, target_id)
+
+    def plan(self, payloads):
+        """
+        Replan from scratch: nearest-neighbour over the targets, then 2-opt.
+
+        Args:
+            payloads (int): Number of targets that can still be served.
+
+        Returns:
+            list: Target ids in visiting order, at most payloads long.
+        """
+        path = nearest_neighbour(self.dist, 0, np.arange(1, len(self.ids) + 1), payloads)
+        path = two_opt(self.dist, path, self.max_passes)
+        self.route = [self.ids[node - 1] for node in path[1:]]
+        return self.route
+
+    def route_length(self, route=None):
+        """Length in meters of the route from the current position."""
+        return path_length(self.dist, self._nodes(self.route if route is None else route))
@@ -1,141 +1,398 @@
-import torch
+import argparse
 import cv2
 import os
-import math
-import json
-import socket
 import logging
-from datetime import datetime
-from utils.pixhawk_connection import PixhawkConnection
+import threading
+import time
+from utils.sources import ReplayClock, open_frame_source
+from utils.telemetry_sources import open_telemetry
+from utils.frame_pipeline import FramePacket, LatestQueue, StageStats
+from utils.batch_inference import BatchInferenceEngine
+from utils.detectors import load_detector
+from utils.inference_scheduler import make_scheduler, POLICIES, SKIP
+from utils.geolocation import Geolocator, LAT, LON, DISTANCE, CONFIDENCE
+from utils.tracker import Tracker
+from utils.victim_index import VictimIndex
+from utils.evidence_writer import EvidenceWriter
+from utils.protocol import encode_message, DETECTIONS, TRACKS, HEARTBEAT, ACK, METRICS
+from utils.ground_server import BroadcastServer
+from utils.instrumentation import REGISTRY, MetricsServer
+from utils.flight_recorder import FlightRecorder, new_flight_directory
+from utils.startup import Startup
+
+# Detector backend ('hub', 'ultralytics', 'onnx', 'torchscript' or 'auto' by extension) and weights.
+# An exported .onnx/.torchscript model loads offline and skips the torch.hub checkout; 'auto'
+# picks up an export saved next to the .pt weights (see detectors.exported_model).
+DETECTOR_BACKEND = 'auto'
+MODEL_PATH = '/path/to/your/best.pt'
+# Optimized ONNX graphs and TensorRT engines kept between restarts (None to rebuild every start)
+MODEL_CACHE_DIR = 'model_cache'
+
+# When to run the detector: 'always' (every frame), 'every_n', 'motion' or 'roi', see inference_scheduler.POLICIES.
+# 'roi' saves compute but crops at most max_rois tracks per frame; opt in with --scheduler where that suffices.
+SCHEDULER_POLICY = 'always'
+
+# Prometheus-style GET /metrics of this process (None to disable); also relayed to the Backend's /metrics
+METRICS_PORT = 9100
+
+# Flight data recorder output; every run records detections, poses and events to a new
+# directory under it (None to disable). Read a flight back with flight_recorder.load_flight.
+RECORD_DIR = 'flights'
+
+# Camera id -> frame source (see sources.open_frame_source); add the oblique camera here when fitted.
+# A video file or 'synthetic' replays instead of capturing, e.g. for bench runs without hardware.
+CAMERA_SOURCES = {
+    'nadir': 0,  # /dev/video0 for GoPro
+}
 
 class DetectionServer:
-    def __init__(self):
+    def __init__(self, camera_sources=None, max_batch_size=4, backend=DETECTOR_BACKEND, model_path=MODEL_PATH,
+                 scheduler_policy=SCHEDULER_POLICY, telemetry=None, clock=None, metrics_port=METRICS_PORT,
+                 record_dir=RECORD_DIR, model_cache=MODEL_CACHE_DIR):
         # Initialize logging
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
         
+        camera_sources = camera_sources or CAMERA_SOURCES
+        self.metrics = self.recorder = self.startup = self.server = self.pixhawk = None
         try:
-            # Initialize YOLO
-            self.model = torch.hub.load('ultralytics/yolov5', 'custom', path='/path/to/your/best.pt')
-            self.model.conf = 0.25
-            logging.info("YOLO model loaded successfully")
+            # Metrics first, so component readiness can be scraped while the rest starts
+            self.metrics = MetricsServer(port=metrics_port).start() if metrics_port else None
+            self.recorder = FlightRecorder(new_flight_directory(record_dir, 'detection')) if record_dir else None
+
+            # Model, cameras and telemetry initialize concurrently. Serving needs the model and
+            # cameras; telemetry (which blocks until the autopilot's heartbeat) joins when it arrives,
+            # and until then detections are tracked without geolocation.
+            self.clock = clock or ReplayClock()  # Replayed sources share one clock with replayed telemetry
+            self.startup = Startup()
+            # Exported models get a fixed batch of one frame per camera
+            self.startup.start('model', lambda: load_detector(
+                backend, model_path, conf=0.25, batch_size=min(max_batch_size, len(camera_sources)),
+                cache_dir=model_cache))
+            self.startup.start('cameras', lambda: self.open_cameras(camera_sources))
+            # Pixhawk connection, or a replayed/synthetic telemetry source (telemetry_sources)
+            self.startup.start('telemetry', lambda: open_telemetry(telemetry, self.clock, max_age=2.0),
+                               on_ready=self.on_telemetry, retry_interval=5.0)
+
+            self.geolocator = Geolocator(fov=45)  # Camera field of view in degrees
+            # Every reported victim, so repeat sightings from other passes or cameras merge into one
+            self.victims = VictimIndex(merge_radius=5.0)
+            self.track_victims = {}  # (camera_id, track_id) -> victim_id
+            # Snapshots are encoded and written off the detection loop
+            self.evidence = EvidenceWriter(output_dir='detections', encoding='jpeg', jpeg_quality=90)
+            self.result_queue = LatestQueue(maxsize=4)
+            self.inference_age = StageStats()
+            self.publish_age = StageStats()
+            self.stats_interval = 10  # Seconds between pipeline stats log lines
+            self.metrics_interval = 5  # Seconds between metrics relayed to subscribers
+            self.geolocation_time = REGISTRY.histogram('geolocation_seconds', 'Georeferencing per frame')
+            self.tracking_time = REGISTRY.histogram('tracking_seconds',
+                                                    'Geolocation, tracker, victims and evidence per frame')
+            self.publish_time = REGISTRY.histogram('publish_seconds', 'Encoding and queueing one frame\'s messages')
+            self.frame_ages = {stage: REGISTRY.histogram('frame_age_seconds', 'Capture-to-stage frame age',
+                                                         stage=stage)
+                               for stage in ('inference', 'publish')}
+            self.heartbeat_interval = 1.0  # Seconds without traffic before a heartbeat is sent
+            self.last_stats = time.monotonic()
+            self.running = threading.Event()
+            self.threads = []
 
-            # Initialize camera
-            self.cap = cv2.VideoCapture(0)  # /dev/video0 for GoPro
-            if not self.cap.isOpened():
-                raise Exception("Cannot open GoPro camera")
-            logging.info("Camera initialized successfully")
-
-            # Initialize Pixhawk connection
-            self.pixhawk = PixhawkConnection()
-            logging.info("Pixhawk connection established")
-            
-            # Initialize network server
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.bind(('0.0.0.0', 5000))
-            self.server_socket.listen(1)
+            # Initialize network server; controller, dashboard and loggers can all subscribe
+            self.server = BroadcastServer('0.0.0.0', 5000, max_queue=64, on_message=self.handle_message)
             logging.info("Detection server started on port 5000")
 
+            self.detector = self.startup.wait('model')
+            logging.info("YOLO model loaded successfully")
+            self.caps = self.startup.wait('cameras')
+            logging.info(f"Cameras initialized successfully: {list(self.caps)}")
+
+            # One tracker per camera, since tracks live in image coordinates
+            self.trackers = {camera_id: Tracker(min_hits=3) for camera_id in self.caps}
+            # Full, cropped or no inference per frame, from a motion check and the predicted tracks
+            self.scheduler = make_scheduler(
+                scheduler_policy, lambda camera_id: self.trackers[camera_id].predicted_boxes())
+
+            # Capture -> batched inference -> publish stages. Each camera keeps
+            # only its newest frame pending, results go through a drop-oldest queue.
+            self.engine = BatchInferenceEngine(
+                self.detector.predict_batch, self.on_inference_result,
+                max_batch_size=max_batch_size, scheduler=self.scheduler
+            )
+            for camera_id in self.caps:
+                self.engine.register(camera_id)
+            logging.info(f"Ready to serve after {time.monotonic() - self.startup.start_time:.2f}s")
+
         except Exception as e:
             logging.error(f"Initialization error: {e}")
+            self.close_started()
             raise
 
-    def calculate_coordinates(self, detection, frame_width, frame_height):
-        # Get current drone position
-        gps_data = self.pixhawk.get_gps_coordinates()
-        if not gps_data:
-            raise Exception("Could not get GPS coordinates")
-        
-        current_lat, current_lon, current_alt = gps_data
-
-        # Get bounding box coordinates
-        x_min, y_min, x_max, y_max = detection[:4]
-        bbox_center_x = (x_min + x_max) / 2
-        bbox_center_y = (y_min + y_max) / 2
-
-        # Calculate distance from center of frame
-        fov = 45  # Camera field of view in degrees
-        fov_rad = math.radians(fov)
-        horizontal_fov_meters = 2 * current_alt * math.tan(fov_rad / 2)
-        pixel_size_meters = horizontal_fov_meters / frame_width
-
-        distance = math.sqrt((bbox_center_x - frame_width / 2) ** 2 + 
-                           (bbox_center_y - frame_height / 2) ** 2)
-        distance_meters = distance * pixel_size_meters
-
-        # Convert to latitude/longitude changes
-        meters_per_degree_lat = 111320
-        meters_per_degree_lon = 40075000 * math.cos(math.radians(current_lat)) / 360
-
-        # Calculate direction and offset
-        angle = math.atan2(bbox_center_y - frame_height/2, 
-                          bbox_center_x - frame_width/2)
-        
-        delta_lat = (distance_meters * math.cos(angle)) / meters_per_degree_lat
-        delta_lon = (distance_meters * math.sin(angle)) / meters_per_degree_lon
+    def close_started(self):
+        """Release what a failed __init__ already started, so a retry in this process can bind the same ports."""
+        if self.startup is not None:
+            self.startup.stop()  # Components that finish loading from now on close themselves
+            if self.startup.ready('cameras'):
+                for cap in self.startup.wait('cameras').values():
+                    cap.release()
+        if self.pixhawk is not None:
+            self.pixhawk.close()
+        for resource in (self.server, self.metrics, self.recorder):
+            if resource is not None:
+                resource.close()
+
+    def open_cameras(self, camera_sources):
+        caps = {}
+        for camera_id, source in camera_sources.items():
+            cap = open_frame_source(source, self.clock)
+            if not cap.isOpened():
+                raise Exception(f"Cannot open camera {camera_id} ({source})")
+            # Keep the driver buffer short so reads return the newest frame
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            caps[camera_id] = cap
+        return caps
+
+    def on_telemetry(self, pixhawk):
+        """Called by the telemetry startup thread once the link is up."""
+        pixhawk.recorder = self.recorder
+        self.pixhawk = pixhawk
+        logging.info(f"Telemetry from {type(pixhawk).__name__} established")
 
-        target_lat = current_lat + delta_lat
-        target_lon = current_lon + delta_lon
+    def calculate_all_coordinates(self, detections, frame_width, frame_height, capture_time=None):
+        """Georeference every detection of a frame in one vectorized call."""
+        if self.pixhawk is None:
+            raise Exception("Telemetry not connected yet")
+        # Get the drone pose at the moment the frame was captured
+        pose = self.pixhawk.get_pose_at(capture_time) if capture_time is not None else None
+        if pose:
+            current_lat, current_lon, current_alt, heading = pose
+        else:
+            gps_data = self.pixhawk.get_gps_coordinates()
+            if not gps_data:
+                raise Exception("Could not get GPS coordinates")
+            current_lat, current_lon, current_alt = gps_data
+            heading = None
 
+        with self.geolocation_time.time():
+            located = self.geolocator.locate(detections, current_lat, current_lon, current_alt,
+                                             frame_width, frame_height, heading)
+        return located, current_alt
+
+    def calculate_coordinates(self, detection, frame_width, frame_height, capture_time=None):
+        located, current_alt = self.calculate_all_coordinates(detection, frame_width, frame_height,
+                                                              capture_time)
+        return self.coordinates_message(located[0], current_alt)
+
+    @staticmethod
+    def coordinates_message(location, altitude):
         return {
-            'latitude': target_lat,
-            'longitude': target_lon,
-            'altitude': current_alt,
-            'distance': distance_meters,
-            'confidence': float(detection[4])
+            'latitude': float(location[LAT]),
+            'longitude': float(location[LON]),
+            'altitude': altitude,
+            'distance': float(location[DISTANCE]),
+            'confidence': float(location[CONFIDENCE])
         }
 
+    def capture_loop(self, camera_id, cap):
+        """Read frames from one camera as fast as it delivers them."""
+        seq = 0
+        read_time = REGISTRY.histogram('frame_read_seconds', 'Frame source read per frame', camera=camera_id)
+        read_failures = REGISTRY.counter('frame_read_failures', 'Failed frame reads', camera=camera_id)
+        while self.running.is_set():
+            with read_time.time():
+                ret, frame = cap.read()
+            if not ret:
+                if getattr(cap, 'finished', False):
+                    logging.info(f"Replay of {camera_id} finished")
+                    return
+                read_failures.inc()
+                if read_failures.value in (1, 10, 100) or read_failures.value % 1000 == 0:
+                    logging.warning(f"Failed to grab frame from {camera_id} ({read_failures.value} failures)")
+                time.sleep(0.01)
+                continue
+            seq += 1
+            self.engine.submit(camera_id, FramePacket(seq, frame, time.monotonic(), camera_id))
+
+    def track_detections(self, result):
+        """Update the camera's tracks; returns track ids, new alarms and all confirmed tracks."""
+        tracker = self.trackers[result.camera_id]
+        located, current_alt = None, None
+        if result.mode == SKIP:
+            # No detector pass for this frame: tracks coast and their predicted boxes are published
+            result.detections, track_ids = tracker.coast()
+        else:
+            if len(result.detections) > 0 and self.pixhawk is not None:
+                frame_height, frame_width = result.packet.frame.shape[:2]
+                try:
+                    located, current_alt = self.calculate_all_coordinates(
+                        result.detections, frame_width, frame_height, result.packet.capture_time)
+                except Exception as e:
+                    logging.error(f"Error processing detection: {e}")
+            track_ids = tracker.update(result.detections, located)
+        if self.recorder is not None:
+            self.recorder.record_detections(result.packet.capture_time, result.camera_id, result.packet.seq,
+                                            result.detections, track_ids, located, result.mode)
+
+        alarms = []
+        for alarm in tracker.pop_alarms():
+            victim_id, merged = self.victims.insert(alarm['latitude'], alarm['longitude'], alarm['confidence'])
+            self.track_victims[(result.camera_id, alarm['track_id'])] = victim_id
+            if self.recorder is not None:
+                self.recorder.record_event('resighted' if merged else 'alarm', victim_id)
+            if merged:
+                logging.info(f"Track {alarm['track_id']} on {result.camera_id} is known victim {victim_id}")
+                continue
+            alarm['victim_id'] = victim_id
+            alarm['altitude'] = current_alt
+            alarm['camera_id'] = result.camera_id
+            alarms.append(alarm)
+            matched = result.detections[track_ids == alarm['track_id']]
+            bbox = [float(v) for v in matched[0, :4]] if len(matched) else None
+            saved = self.evidence.submit(result.packet.frame, dict(alarm, bbox=bbox),
+                                         boxes=result.detections, track_id=alarm['track_id'],
+                                         bbox=bbox)
+            if saved:
+                logging.info(f"Detection queued for saving: {saved}")
+
+        alarm_ids = {alarm['track_id'] for alarm in alarms}
+        tracks = tracker.confirmed_tracks()
+        for track in tracks:
+            track['victim_id'] = self.track_victims.get((result.camera_id, track['track_id']))
+            track['alarm'] = track['track_id'] in alarm_ids
+        return track_ids, alarms, tracks, current_alt
+
+    def on_inference_result(self, result):
+        """Called by the inference engine for every frame of a finished batch."""
+        age = result.packet.age()
+        self.inference_age.record(age)
+        self.frame_ages['inference'].record(age)
+        with self.tracking_time.time():
+            tracked = self.track_detections(result)
+        self.result_queue.put((result, *tracked))
+
+        now = time.monotonic()
+        if now - self.last_stats >= self.stats_interval:
+            logging.info(f"Pipeline stats: {self.pipeline_stats()}")
+            self.last_stats = now
+
+    def start_pipeline(self):
+        self.running.set()
+        self.engine.start()
+        for camera_id, cap in self.caps.items():
+            thread = threading.Thread(target=self.capture_loop, args=(camera_id, cap),
+                                      name=f"capture_{camera_id}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def pipeline_stats(self):
+        """Queue depth, drop counts and capture-to-stage frame age per stage."""
+        engine_stats = self.engine.stats()
+        return {
+            'capture': engine_stats['cameras'],
+            'inference': dict(self.inference_age.snapshot(),
+                              pending=engine_stats['pending'],
+                              batches=engine_stats['batches'],
+                              mean_batch_size=engine_stats['mean_batch_size'],
+                              queue_depth=self.result_queue.depth,
+                              dropped=self.result_queue.dropped),
+            'publish': self.publish_age.snapshot(),
+            'scheduler': self.scheduler.stats(),
+            'victims': len(self.victims),
+            'startup': self.startup.status(),
+            'subscribers': self.server.stats(),
+        }
+
+    def publish_messages(self, result, track_ids, alarms, tracks, altitude):
+        """Framed messages describing one processed frame."""
+        frame_height, frame_width = result.packet.frame.shape[:2]
+        messages = [encode_message(DETECTIONS, {
+            'camera_id': result.camera_id,
+            'seq': result.packet.seq,
+            'mode': result.mode,
+            'frame_width': frame_width,
+            'frame_height': frame_height,
+            'boxes': result.detections[:, :5].tolist(),
+            'track_ids': track_ids.tolist(),
+        })]
+        if tracks:
+            messages.append(encode_message(TRACKS, {
+                'camera_id': result.camera_id,
+                'altitude': altitude,
+                'tracks': tracks,
+            }))
+        return messages
+
+    def handle_message(self, subscriber, msg_type, payload):
+        """Called by the broadcast server for messages sent by subscribers."""
+        if msg_type == ACK:
+            logging.info(f"Alarm for victim {payload.get('victim_id')} (track {payload['track_id']}) "
+                         f"acknowledged by {subscriber.addr}")
+            if self.recorder is not None:
+                self.recorder.record_event('alarm_ack', payload.get('victim_id'))
+
     def run(self):
+        # Capture and inference run all the time, whether or not anyone is subscribed
+        self.start_pipeline()
+        self.server.start()
+        last_sent = last_metrics = time.monotonic()
         while True:
-            logging.info("Waiting for ground station connection...")
-            client, addr = self.server_socket.accept()
-            logging.info(f"Connected to ground station: {addr}")
-
-            try:
-                while True:
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        logging.warning("Failed to grab frame")
-                        continue
-
-                    # Run detection
-                    results = self.model(frame)
-                    detections = results.xyxy[0].cpu().numpy()
-
-                    if len(detections) > 0:
-                        # Get first detection
-                        detection = detections[0]
-                        frame_height, frame_width = frame.shape[:2]
-                        
-                        try:
-                            # Calculate coordinates
-                            coords = self.calculate_coordinates(detection, frame_width, frame_height)
-                            
-                            # Send to ground station
-                            client.send(json.dumps(coords).encode())
-                            
-                            # Save detection image
-                            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                            cv2.imwrite(f"detection_{timestamp}.jpg", results.render()[0])
-                            logging.info(f"Detection saved: detection_{timestamp}.jpg")
-                            
-                            # Stop after first successful detection
-                            break
-                            
-                        except Exception as e:
-                            logging.error(f"Error processing detection: {e}")
-
-            except Exception as e:
-                logging.error(f"Connection error: {e}")
-            finally:
-                client.close()
+            item = self.result_queue.get(timeout=self.heartbeat_interval)
+            now = time.monotonic()
+            if now - last_metrics >= self.metrics_interval:
+                self.server.broadcast(encode_message(METRICS, {'text': REGISTRY.render()}))
+                last_metrics = now
+            if item is not None:
+                age = item[0].packet.age()
+                self.publish_age.record(age)
+                self.frame_ages['publish'].record(age)
+                # Encode once, fan out to every subscriber's queue
+                with self.publish_time.time():
+                    self.server.broadcast(b''.join(self.publish_messages(*item)))
+                last_sent = now
+            elif not any(thread.is_alive() for thread in self.threads):
+                logging.info("All frame sources finished")
+                return
+            elif now - last_sent >= self.heartbeat_interval:
+                self.server.broadcast(encode_message(HEARTBEAT, {
+                    'time': time.time(), 'components': self.startup.status()}))
+                last_sent = now
 
     def cleanup(self):
-        self.cap.release()
+        self.startup.stop()
+        self.running.clear()
+        for thread in self.threads:
+            thread.join(timeout=2)
+        self.engine.stop()
+        self.evidence.close()
+        for cap in self.caps.values():
+            cap.release()
         cv2.destroyAllWindows()
-        self.server_socket.close()
+        if self.pixhawk is not None:
+            self.pixhawk.close()
+        self.server.close()
+        if self.metrics is not None:
+            self.metrics.close()
+        # Last, once nothing (ACKs on the server thread included) records any more
+        if self.recorder is not None:
+            self.recorder.close()
 
 if __name__ == "__main__":
-    server = DetectionServer()
+    parser = argparse.ArgumentParser(description='Detection server. Without options it captures from '
+                                                 'CAMERA_SOURCES and reads telemetry from the Pixhawk.')
+    parser.add_argument('--source', action='append', metavar='CAMERA_ID=SPEC',
+                        help='Frame source per camera: device index, video file or synthetic (repeatable)')
+    parser.add_argument('--telemetry', metavar='SPEC',
+                        help='Telemetry: a .tlog or flight recording directory to replay, synthetic:LAT,LON[,ALT], '
+                             'or a MAVLink connection string')
+    parser.add_argument('--record-dir', default=RECORD_DIR,
+                        help='Directory for flight recordings (empty to disable recording)')
+    parser.add_argument('--max-speed', action='store_true',
+                        help='Replay files as fast as they are consumed instead of in real time')
+    parser.add_argument('--scheduler', choices=tuple(POLICIES), default=SCHEDULER_POLICY,
+                        help='When to run the detector (see inference_scheduler.POLICIES)')
+    args = parser.parse_args()
+
+    sources = dict(source.split('=', 1) for source in args.source) if args.source else None
+    server = DetectionServer(sources, telemetry=args.telemetry, clock=ReplayClock(realtime=not args.max_speed),
+                             record_dir=args.record_dir or None, scheduler_policy=args.scheduler)
     try:
         server.run()
     except KeyboardInterrupt:
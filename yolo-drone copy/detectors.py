@@ -0,0 +1,313 @@
+import hashlib
+import logging
+import os
+import time
+import cv2
+import numpy as np
+try:
+    from utils.preprocess import Letterbox
+except ImportError:  # Imported from the repository checkout, as yolo-model/ does
+    from preprocess import Letterbox
+
+BACKENDS = ('hub', 'ultralytics', 'onnx', 'torchscript')
+
+# Every backend's predict_batch(frames) returns (detections, results): one (N, 6) array of
+# x_min, y_min, x_max, y_max, conf, class per frame in that frame's pixels, and a results
+# object whose render() gives annotated copies of the frames. Afterwards ``timings`` holds
+# the seconds the call spent per stage (preprocess, inference, postprocess where separable).
+
+
+class DetectionResults:
+    """Results of the non-hub backends, with the same render() as torch.hub results."""
+
+    def __init__(self, frames, detections):
+        self.frames = frames
+        self.xyxy = detections
+
+    def render(self):
+        rendered = []
+        for frame, boxes in zip(self.frames, self.xyxy):
+            image = frame.copy()
+            for x_min, y_min, x_max, y_max, conf in boxes[:, :5]:
+                cv2.rectangle(image, (int(x_min), int(y_min)), (int(x_max), int(y_max)), (0, 255, 0), 2)
+                cv2.putText(image, f"Human {conf:.2f}", (int(x_min), int(y_min) - 5),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+            rendered.append(image)
+        return rendered
+
+
+class HubDetector:
+    """YOLOv5 through torch.hub (needs the hub checkout or network on first load).
+
+    AutoShape letterboxes every image to a common shape and stacks them into a
+    single tensor, so one call is one forward pass regardless of camera count.
+    """
+
+    def __init__(self, weights, conf=0.25, warmup=1, **kwargs):
+        import torch
+        # Load from the existing hub checkout when there is one: no GitHub request, works offline
+        checkout = os.path.join(torch.hub.get_dir(), 'ultralytics_yolov5_master')
+        if os.path.isdir(checkout):
+            self.model = torch.hub.load(checkout, 'custom', path=weights, source='local')
+        else:
+            self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=weights)
+        self.model.conf = conf
+        self.timings = {}
+        warm_up(self, warmup)
+
+    def predict_batch(self, frames):
+        start = time.perf_counter()
+        results = self.model(frames)  # AutoShape pre- and postprocesses inside the call
+        detections = [d.cpu().numpy() for d in results.xyxy]
+        self.timings = {'inference': time.perf_counter() - start}
+        return detections, results
+
+
+class UltralyticsDetector:
+    """Any model the ultralytics package loads (YOLOv5u/v8/11 .pt, or its own exports).
+
+    Frames are letterboxed into a reused pinned buffer and passed as one
+    tensor, which skips ultralytics' own per-frame preprocessing.
+    """
+
+    def __init__(self, weights, conf=0.25, iou=0.45, input_size=640, batch_size=1, half=False, warmup=1,
+                 **kwargs):
+        import torch
+        from ultralytics import YOLO
+        self.torch = torch
+        self.model = YOLO(weights, verbose=False)
+        self.conf = conf
+        self.iou = iou
+        self.half = half
+        self.letterbox = Letterbox(input_size, batch_size, pin_memory=torch.cuda.is_available())
+        self.timings = {}
+        warm_up(self, warmup)
+
+    def predict_batch(self, frames):
+        detections = []
+        letterbox = self.letterbox
+        timings = {'preprocess': 0.0, 'inference': 0.0, 'postprocess': 0.0}
+        for start in range(0, len(frames), letterbox.batch_size):
+            chunk = frames[start:start + letterbox.batch_size]
+            t0 = time.perf_counter()
+            letterbox.fill(chunk)
+            if letterbox.tensor is not None:
+                batch = letterbox.tensor[:len(chunk)]
+            else:
+                batch = self.torch.from_numpy(letterbox.buffer[:len(chunk)])
+            t1 = time.perf_counter()
+            results = self.model.predict(batch, conf=self.conf, iou=self.iou, half=self.half, verbose=False)
+            t2 = time.perf_counter()
+            for index, (frame, result) in enumerate(zip(chunk, results)):
+                detections.append(letterbox.unscale(result.boxes.data.cpu().numpy(), index, frame.shape))
+            timings['preprocess'] += t1 - t0
+            timings['inference'] += t2 - t1
+            timings['postprocess'] += time.perf_counter() - t2
+        self.timings = timings
+        return detections, DetectionResults(frames, detections)
+
+
+class ExportedDetector:
+    """Runs an exported YOLO model (ONNX Runtime or TorchScript) on a fixed input shape.
+
+    The (batch_size, 3, input_size, input_size) input buffer is allocated once
+    and frames are letterboxed into it (see preprocess.Letterbox), so the shape
+    never changes between calls and the runtime never re-plans. Works with YOLOv5 exports
+    (batch, anchors, 5 + classes) and ultralytics exports (batch, 4 + classes, anchors).
+
+    FP16 is used when the ONNX model was exported in half precision, or with
+    ``half=True`` for TorchScript on CUDA. INT8 needs a quantized ONNX file
+    (see yolo-model/export_model.py --int8); it loads like any other.
+
+    With a ``cache_dir``, ONNX Runtime's optimized graph (or the TensorRT
+    engines) are saved there on the first load and reused by later ones.
+    """
+
+    def __init__(self, weights, backend='onnx', conf=0.25, iou=0.45, input_size=640, batch_size=1,
+                 half=False, max_det=300, warmup=3, cache_dir=None, **kwargs):
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+        self.input_size = input_size
+        self.batch_size = batch_size
+        self.timings = {}
+        if backend == 'onnx':
+            self._load_onnx(weights, cache_dir)
+        else:
+            self._load_torchscript(weights, half)
+        warm_up(self, warmup)
+
+    def _load_onnx(self, weights, cache_dir=None):
+        import onnxruntime as ort
+        preferred = ['TensorrtExecutionProvider', 'CUDAExecutionProvider', 'CPUExecutionProvider']
+        available = ort.get_available_providers()
+        providers = [p for p in preferred if p in available]
+        if not cache_dir:
+            self.session = ort.InferenceSession(weights, providers=providers)
+        else:
+            self.session = self._load_onnx_cached(ort, weights, providers, cache_dir)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Fixed dimensions in the exported graph win over the constructor arguments
+        batch, _, height, _ = model_input.shape
+        if isinstance(batch, int):
+            self.batch_size = batch
+        if isinstance(height, int):
+            self.input_size = height
+        dtype = np.float16 if model_input.type == 'tensor(float16)' else np.float32
+        self.letterbox = Letterbox(self.input_size, self.batch_size, dtype=dtype)
+        self._forward = lambda: self.session.run(None, {self.input_name: self.letterbox.buffer})[0]
+        logging.info(f"ONNX model {weights} on {self.session.get_providers()[0]}, "
+                     f"input {self.batch_size}x3x{self.input_size}x{self.input_size} {dtype.__name__}")
+
+    @staticmethod
+    def _load_onnx_cached(ort, weights, providers, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        if 'TensorrtExecutionProvider' in providers:
+            # Engines hold compiled nodes, which ONNX Runtime cannot save as a model
+            options = [{'trt_engine_cache_enable': True, 'trt_engine_cache_path': cache_dir}
+                       if p == 'TensorrtExecutionProvider' else {} for p in providers]
+            return ort.InferenceSession(weights, providers=providers, provider_options=options)
+
+        stat = os.stat(weights)
+        key = hashlib.sha1(f"{os.path.abspath(weights)}|{stat.st_size}|{stat.st_mtime_ns}|"
+                           f"{ort.__version__}|{providers}".encode()).hexdigest()[:12]
+        cached = os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(weights))[0]}.{key}.onnx")
+        if os.path.exists(cached):
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            try:
+                return ort.InferenceSession(cached, sess_options=options, providers=providers)
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable cached model {cached}: {e}")
+        # Written under a temporary name, so an interrupted save never leaves a broken cache entry
+        options = ort.SessionOptions()
+        options.optimized_model_filepath = cached + '.tmp'
+        session = ort.InferenceSession(weights, sess_options=options, providers=providers)
+        if os.path.exists(cached + '.tmp'):
+            os.replace(cached + '.tmp', cached)
+            logging.info(f"Optimized model cached as {cached}")
+        return session
+
+    def _load_torchscript(self, weights, half):
+        import torch
+        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        half = half and self.device.type == 'cuda'
+        self.model = torch.jit.load(weights, map_location=self.device).eval()
+        if half:
+            self.model.half()
+        dtype = np.float16 if half else np.float32
+        self.letterbox = Letterbox(self.input_size, self.batch_size, dtype=dtype,
+                                   pin_memory=self.device.type == 'cuda')
+        self.input_tensor = torch.zeros((self.batch_size, 3, self.input_size, self.input_size),
+                                        dtype=torch.float16 if half else torch.float32, device=self.device)
+        source = self.letterbox.tensor if self.letterbox.tensor is not None else torch.from_numpy(self.letterbox.buffer)
+
+        def forward():
+            with torch.inference_mode():
+                self.input_tensor.copy_(source, non_blocking=True)
+                output = self.model(self.input_tensor)
+                if isinstance(output, (list, tuple)):
+                    output = output[0]
+                return output.float().cpu().numpy()
+        self._forward = forward
+        logging.info(f"TorchScript model {weights} on {self.device}, "
+                     f"input {self.batch_size}x3x{self.input_size}x{self.input_size} {dtype.__name__}")
+
+    def _decode(self, output, index, frame_shape):
+        prediction = output[index]
+        if prediction.shape[0] < prediction.shape[1]:
+            # ultralytics layout: (4 + classes, anchors), no objectness
+            prediction = prediction.T
+            class_scores = prediction[:, 4:]
+        else:
+            class_scores = prediction[:, 5:] * prediction[:, 4:5]
+        classes = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_scores)), classes]
+        keep = scores >= self.conf
+        boxes, scores, classes = prediction[keep, :4], scores[keep], classes[keep]
+        if not len(boxes):
+            return np.empty((0, 6), dtype=np.float32)
+
+        # Per-class NMS in one call by offsetting each class into its own coordinate range
+        xywh = boxes.astype(np.float32)
+        xywh[:, :2] -= xywh[:, 2:] / 2
+        shifted = xywh.copy()
+        shifted[:, :2] += (classes * 4096.0)[:, None]
+        kept = cv2.dnn.NMSBoxes(shifted.tolist(), scores.tolist(), self.conf, self.iou, top_k=self.max_det)
+        kept = np.asarray(kept, dtype=np.intp).reshape(-1)
+
+        detections = np.empty((len(kept), 6), dtype=np.float32)
+        detections[:, :2] = xywh[kept, :2]
+        detections[:, 2:4] = xywh[kept, :2] + xywh[kept, 2:4]
+        detections[:, 4] = scores[kept]
+        detections[:, 5] = classes[kept]
+        return self.letterbox.unscale(detections, index, frame_shape)
+
+    def predict_batch(self, frames):
+        detections = []
+        timings = {'preprocess': 0.0, 'inference': 0.0, 'postprocess': 0.0}
+        for start in range(0, len(frames), self.batch_size):
+            chunk = frames[start:start + self.batch_size]
+            t0 = time.perf_counter()
+            self.letterbox.fill(chunk)
+            t1 = time.perf_counter()
+            output = self._forward()
+            t2 = time.perf_counter()
+            detections.extend(self._decode(output, index, frame.shape) for index, frame in enumerate(chunk))
+            timings['preprocess'] += t1 - t0
+            timings['inference'] += t2 - t1
+            timings['postprocess'] += time.perf_counter() - t2
+        self.timings = timings
+        return detections, DetectionResults(frames, detections)
+
+
+def warm_up(detector, iterations):
+    """Run a few dummy batches so lazy allocation and kernel selection happen at load time."""
+    if not iterations:
+        return
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        detector.predict_batch([frame])
+    logging.info(f"{type(detector).__name__} warmed up in {(time.perf_counter() - start) * 1000:.0f} ms "
+                 f"({iterations} iterations)")
+
+
+def exported_model(weights):
+    """An .onnx or .torchscript export next to .pt weights and newer than them, else None."""
+    stem, extension = os.path.splitext(weights)
+    if extension.lower() != '.pt' or not os.path.exists(weights):
+        return None
+    for candidate in (stem + '.onnx', stem + '.torchscript'):
+        if os.path.exists(candidate) and os.path.getmtime(candidate) >= os.path.getmtime(weights):
+            return candidate
+    return None
+
+
+def load_detector(backend, weights, **kwargs):
+    """
+    Create a detector.
+
+    Args:
+        backend (str): One of BACKENDS, or 'auto' to choose from the weights file extension
+            (.onnx -> onnx, .torchscript -> torchscript, anything else -> hub). For .pt
+            weights with an up-to-date export next to them (see exported_model), 'auto'
+            loads the export, which skips importing torch and the hub checkout.
+        weights (str): Path to the model file.
+        **kwargs: conf, iou, input_size, batch_size, half, warmup, cache_dir, as the backend supports them.
+    """
+    if backend == 'auto':
+        exported = exported_model(weights)
+        if exported:
+            logging.info(f"Loading {exported} exported from {weights}")
+            weights = exported
+        extension = os.path.splitext(weights)[1].lower()
+        backend = {'.onnx': 'onnx', '.torchscript': 'torchscript'}.get(extension, 'hub')
+    if backend == 'hub':
+        return HubDetector(weights, **kwargs)
+    if backend == 'ultralytics':
+        return UltralyticsDetector(weights, **kwargs)
+    if backend in ('onnx', 'torchscript'):
+        return ExportedDetector(weights, backend=backend, **kwargs)
+    raise ValueError(f"backend must be 'auto' or one of {BACKENDS}")
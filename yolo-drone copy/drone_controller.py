@@ -1,132 +1,366 @@
-from dronekit import connect, VehicleMode, LocationGlobalRelative
+from dronekit import connect, VehicleMode, LocationGlobalRelative, Command
+from pymavlink import mavutil
+import argparse
+import select
 import socket
-import json
+import threading
 import time
 import logging
-import math
+from utils.protocol import MessageReader, encode_message, TRACKS, HEARTBEAT, ACK
+from utils.mission_events import VehicleEvents, PhaseTimer, PhaseTimeout
+from utils.delivery_planner import DeliveryPlanner
+from utils.geodesy import haversine
+from utils.coverage_planner import plan_coverage, path_length
+from utils.instrumentation import REGISTRY, MetricsServer
+from utils.flight_recorder import FlightRecorder, new_flight_directory
+from utils.startup import Startup
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
 class DroneController:
-    def __init__(self):
+    def __init__(self, metrics_port=9101, record_dir='flights', payloads=1):
         try:
+            # Mission phase, detection link and ACK metrics on GET /metrics (None to disable)
+            self.metrics = MetricsServer(port=metrics_port).start() if metrics_port else None
+            self.track_messages = REGISTRY.counter('track_messages', 'TRACKS messages from the detection server')
+            self.ack_time = REGISTRY.histogram('ack_send_seconds', 'Sending one alarm ACK to the detection server')
+            # Mission phases and deliveries go to the flight recorder (record_dir None to disable)
+            self.recorder = FlightRecorder(new_flight_directory(record_dir, 'controller')) if record_dir else None
+            self.timer = PhaseTimer(recorder=self.recorder)
+            self.events = VehicleEvents()  # Listens to the vehicle once it is connected
+
             # Connect to drone through telemetry
             self.connection_string = "COM9"  # Modify with your actual connection string
-            self.vehicle = connect(self.connection_string, baud=57600, wait_ready=False)
-            logging.info("Drone connected successfully")
-            
+
             # Connect to Jetson Xavier
-            self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.client_socket = None  # Current connection; each has its own receive thread
             self.xavier_ip = '192.168.1.X'  # Replace with Xavier's IP
             self.xavier_port = 5000
-            
+            self.tracks = {}  # victim_id -> latest confirmed track of that victim from the detection server
+            self.last_heartbeat = None
+            self.retarget_distance = 1.0  # Meters a target must move before we re-issue the goto
+            self.receiving = None  # Stop event of the current connection's receive thread
+            self.receive_thread = None
+
+            # Victims still to be served, ordered by route cost from the current position
+            self.payloads = payloads  # Payloads loaded for this sortie, one per victim served
+            self.planner = DeliveryPlanner()
+            self.delivered = set()
+
+            # Mission parameters; timeouts are in seconds, None waits indefinitely
+            self.arrival_radius = 2.0
+            self.drop_altitude = 5.0
+            self.altitude_tolerance = 0.5
+            self.servo_open_pwm = 2100
+            self.servo_closed_pwm = 1000
+            self.servo_hold_time = 1.0  # Seconds to keep the release open once the servo is confirmed open
+            self.camera_fov = 45  # Degrees, as used by the detection server's geolocation
+            self.search_overlap = 0.2  # Fraction of the camera swath shared by neighbouring search lanes
+            self.timeouts = {'armable': 120, 'arm': 15, 'takeoff': 60, 'target': None,
+                             'next_target': 60, 'transit': 300, 'descend': 30, 'climb': 30, 'mode': 5,
+                             'servo': 2, 'detection_link': 60}
+
+            # The vehicle link (dronekit connect blocks until the autopilot answers) and the
+            # detection server link come up concurrently; tracks received in the meantime are
+            # kept, so the mission can start on them as soon as the vehicle is ready.
+            self.startup = Startup()
+            self.startup.start('vehicle', lambda: connect(self.connection_string, baud=57600, wait_ready=False))
+            self.startup.start('detection_link', self.connect_detection_server, on_ready=self.start_receiving,
+                               retry_interval=2.0)
+            self.vehicle = self.startup.wait('vehicle')
+            logging.info("Drone connected successfully")
+            self.events.attach(self.vehicle)
+
             # Initialize ToF sensor
             self.sensor_altitude = 0.0
+            self.sensor_updated = None
             self.setup_altitude_sensor()
+            self.servo_output = None  # Latest channel 8 PWM reported by the autopilot
+            self.setup_servo_feedback()
             
         except Exception as e:
             logging.error(f"Initialization error: {e}")
             raise
 
     def setup_altitude_sensor(self):
-        def distance_sensor_callback(self, name, message):
+        def distance_sensor_callback(vehicle, name, message):
             """Callback function to handle DISTANCE_SENSOR MAVLink messages."""
             self.sensor_altitude = message.current_distance / 100.0  # Convert cm to meters
+            self.sensor_updated = time.monotonic()
+            self.events.notify()
         self.vehicle.add_message_listener('DISTANCE_SENSOR', distance_sensor_callback)
 
+    def setup_servo_feedback(self):
+        def servo_output_callback(vehicle, name, message):
+            """SERVO_OUTPUT_RAW (RC channels stream): confirms the release servo actually moved."""
+            self.servo_output = message.servo8_raw
+            self.events.notify()
+        self.vehicle.add_message_listener('SERVO_OUTPUT_RAW', servo_output_callback)
+
+    def current_altitude(self):
+        """Rangefinder altitude when the sensor is reporting, otherwise the autopilot's relative altitude."""
+        if self.sensor_updated is not None and time.monotonic() - self.sensor_updated < 1.0:
+            return self.sensor_altitude
+        return self.vehicle.location.global_relative_frame.alt or 0.0
+
     def arm_and_takeoff(self, target_altitude):
         """Arm the drone and take off to target altitude."""
+        logging.info("Waiting for vehicle to initialize...")
+        self.events.wait_until(lambda: self.vehicle.is_armable, self.timeouts['armable'], "vehicle armable")
+
         logging.info("Arming motors")
-        
-        while not self.vehicle.is_armable:
-            logging.info("Waiting for vehicle to initialize...")
-            time.sleep(1)
-            
         self.vehicle.mode = VehicleMode("GUIDED")
         self.vehicle.armed = True
-        
-        while not self.vehicle.armed:
-            logging.info("Waiting for arming...")
-            time.sleep(1)
-            
+        self.events.wait_until(lambda: self.vehicle.armed, self.timeouts['arm'], "arming")
+
         logging.info("Taking off")
         self.vehicle.simple_takeoff(target_altitude)
-        
-        while True:
-            logging.info(f"Altitude: {self.sensor_altitude} meters (sensor)")
-            if self.sensor_altitude >= target_altitude * 0.95:
-                logging.info("Reached target altitude")
-                break
-            time.sleep(1)
+        self.events.wait_until(lambda: self.current_altitude() >= target_altitude * 0.95,
+                               self.timeouts['takeoff'], f"altitude {target_altitude} m")
+        logging.info(f"Reached target altitude: {self.current_altitude():.2f} meters")
 
     def drop_payload(self):
         """Drop the payload using servo control."""
         try:
             logging.info("Dropping payload using Channel 8")
-            self.vehicle.channels.overrides = {'8': 2100}  # Open Servos
-            logging.info("Servos Opened (PWM: 2100)")
-            time.sleep(10)  # Keep servos open for 10 seconds
-            self.vehicle.channels.overrides = {'8': 1000}  # Close servos
-            logging.info("Servos Closed")
+            try:
+                self.vehicle.channels.overrides = {'8': self.servo_open_pwm}  # Open Servos
+                try:
+                    self.events.wait_until(lambda: (self.servo_output or 0) >= self.servo_open_pwm - 50,
+                                           self.timeouts['servo'], "servo 8 to open")
+                    logging.info(f"Servos Opened (PWM: {self.servo_output})")
+                except PhaseTimeout:
+                    logging.warning("No servo output feedback, holding the release open unconfirmed")
+                time.sleep(self.servo_hold_time)  # Short hold so the payload clears the release
+            finally:
+                # Never leave channel 8 overridden open, whatever went wrong above
+                self.vehicle.channels.overrides = {'8': self.servo_closed_pwm}  # Close servos
+                logging.info("Servos Closed")
         except Exception as e:
             logging.error(f"Payload drop error: {e}")
 
     def get_distance_meters(self, location1, location2):
         """Calculate distance between two locations in meters."""
-        dlat = location2.lat - location1.lat
-        dlon = location2.lon - location1.lon
-        return math.sqrt((dlat ** 2) + (dlon ** 2)) * 1.113195e5
+        return haversine(location1.lat, location1.lon, location2.lat, location2.lon)
+
+    def set_mode(self, name):
+        self.vehicle.mode = VehicleMode(name)
+        self.events.wait_until(lambda: self.vehicle.mode.name == name, self.timeouts['mode'], f"{name} mode")
+
+    def upload_search_mission(self, area, altitude):
+        """
+        Plan a lawnmower sweep of a rectangle and upload it as one mission.
+
+        Args:
+            area (tuple): north, south, west, east bounds in decimal degrees.
+            altitude (float): Search altitude in meters.
+        """
+        start = time.perf_counter()
+        waypoints = plan_coverage(*area, altitude, fov=self.camera_fov, overlap=self.search_overlap)
+        planned = time.perf_counter()
+
+        cmds = self.vehicle.commands
+        cmds.clear()
+        # Ignored by the autopilot when already airborne, kept so the mission is valid from the ground
+        cmds.add(Command(0, 0, 0, mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
+                         mavutil.mavlink.MAV_CMD_NAV_TAKEOFF, 0, 0, 0, 0, 0, 0, 0, 0, altitude))
+        for lat, lon in waypoints:
+            cmds.add(Command(0, 0, 0, mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
+                             mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, 0, 0, 0, 0, 0, 0,
+                             float(lat), float(lon), altitude))
+        cmds.upload()
+        logging.info(f"Search mission: {len(waypoints)} waypoints, {path_length(waypoints):.0f} m, "
+                     f"planned in {(planned - start) * 1000:.1f} ms, "
+                     f"uploaded in {time.perf_counter() - planned:.2f} s")
 
-    def execute_mission(self):
-        """Execute the complete mission including detection and payload delivery."""
+    def receive_messages(self, client_socket, reader, timeout):
+        """Process whatever the detection server has sent on a connection, waiting at most timeout seconds."""
+        readable, _, _ = select.select([client_socket], [], [], timeout)
+        if not readable:
+            return
+        for msg_type, payload in reader.recv_from(client_socket):
+            if msg_type == TRACKS:
+                self.track_messages.inc()
+                with self.events.condition:
+                    for track in payload['tracks']:
+                        victim_id = track['victim_id']
+                        self.tracks[victim_id] = track
+                        if victim_id not in self.delivered:
+                            self.planner.update_target(victim_id, track['latitude'],
+                                                       track['longitude'], payloads=self.payloads)
+                    self.events.condition.notify_all()
+                for track in payload['tracks']:
+                    if track.get('alarm'):
+                        logging.info(f"Alarm for victim {track['victim_id']}: {track}")
+                        if self.recorder is not None:
+                            self.recorder.record_event('alarm_received', track['victim_id'])
+                        with self.ack_time.time():
+                            client_socket.sendall(encode_message(ACK, {'track_id': track['track_id'],
+                                                                            'victim_id': track['victim_id']}))
+            elif msg_type == HEARTBEAT:
+                self.last_heartbeat = time.monotonic()
+
+    def connect_detection_server(self):
+        """Open the link to the detection server; startup retries it with backoff until it connects."""
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            client_socket.connect((self.xavier_ip, self.xavier_port))
+        except OSError:
+            client_socket.close()
+            raise
+        logging.info(f"Connected to detection server at {self.xavier_ip}:{self.xavier_port}")
+        return client_socket
+
+    def start_receiving(self, client_socket):
+        """Make client_socket the current connection and read it on its own thread."""
+        stop = threading.Event()
+        self.client_socket, self.receiving = client_socket, stop
+        # Nothing carries over from a previous connection, not even a partial frame
+        self.receive_thread = threading.Thread(target=self.receive_loop, args=(client_socket, MessageReader(), stop),
+                                               name='receive_loop', daemon=True)
+        self.receive_thread.start()
+
+    def receive_loop(self, client_socket, reader, stop):
+        """Background thread: keep self.tracks current and wake any phase waiting on it."""
+        while not stop.is_set():
+            try:
+                self.receive_messages(client_socket, reader, timeout=0.5)
+            except Exception as e:
+                stop.set()
+                client_socket.close()
+                if client_socket is not self.client_socket:
+                    return  # Already replaced; the newer connection is not ours to restart
+                logging.error(f"Detection link error: {e}")
+                # Reconnects with backoff; detection_link reports not ready until it is back
+                self.startup.restart('detection_link')
+
+    def wait_for_target(self, timeout):
+        """Block until an unserved victim is known; returns the track to visit next."""
+        self.events.wait_until(lambda: len(self.planner), timeout, "a confirmed victim")
+        with self.events.condition:
+            current = self.vehicle.location.global_relative_frame
+            self.planner.set_position(current.lat, current.lon)
+            route = self.planner.plan(self.payloads)
+            logging.info(f"Delivery order {route} ({self.planner.route_length():.0f} m)")
+            return self.tracks[route[0]]
+
+    def mark_delivered(self, target_id):
+        with self.events.condition:
+            self.delivered.add(target_id)
+            self.planner.remove_target(target_id)
+            self.payloads -= 1
+        if self.recorder is not None:
+            self.recorder.record_event('delivered', target_id)
+
+    def updated_target(self, target_id, target):
+        """The target's latest tracked location if it moved more than retarget_distance, else None."""
+        update = self.tracks.get(target_id)
+        if update is None:
+            return None
+        updated = LocationGlobalRelative(update['latitude'], update['longitude'], target.alt)
+        if self.get_distance_meters(target, updated) > self.retarget_distance:
+            return updated
+        return None
+
+    def fly_to(self, target_id, target):
+        """Fly to the target, following its track, until within arrival_radius; returns the final target."""
+        self.vehicle.simple_goto(target)
+        deadline = time.monotonic() + self.timeouts['transit']
+
+        def arrived():
+            current = self.vehicle.location.global_relative_frame
+            return self.get_distance_meters(current, target) < self.arrival_radius
+
+        while True:
+            self.events.wait_until(lambda: arrived() or self.updated_target(target_id, target) is not None,
+                                   deadline - time.monotonic(), "arrival at target")
+            updated = self.updated_target(target_id, target)
+            if updated is None:
+                return target
+            logging.info(f"Retargeting to {updated}")
+            target = updated
+            self.vehicle.simple_goto(target)
+
+    def execute_mission(self, search_area=None):
+        """Execute the complete mission including detection and payload delivery.
+
+        With a search_area (north, south, west, east), the drone sweeps it in AUTO mode
+        between deliveries; otherwise it hovers and waits for detections.
+        """
         try:
-            # Connect to Xavier
-            logging.info(f"Connecting to Xavier at {self.xavier_ip}:{self.xavier_port}")
-            self.client_socket.connect((self.xavier_ip, self.xavier_port))
-            logging.info("Connected to detection server")
+            # Connecting since startup; blocks here only if the detection server is not up yet
+            try:
+                self.startup.wait('detection_link', timeout=self.timeouts['detection_link'])
+            except TimeoutError as e:
+                logging.error(f"Detection server unreachable, mission not started: {e}")
+                return
 
             # Take off
             target_altitude = 10  # 10m initial altitude
-            self.arm_and_takeoff(target_altitude)
-            
-            # Wait for detection data
-            logging.info("Waiting for human detection data...")
-            data = self.client_socket.recv(1024).decode()
-            coords = json.loads(data)
-            logging.info(f"Received coordinates: {coords}")
-
-            # Move to detected location
-            target = LocationGlobalRelative(
-                coords['latitude'],
-                coords['longitude'],
-                self.sensor_altitude
-            )
-            logging.info(f"Moving to target location: {target}")
-            self.vehicle.simple_goto(target)
+            with self.timer.phase('takeoff'):
+                self.arm_and_takeoff(target_altitude)
 
-            # Wait until reached target
-            while True:
-                current = self.vehicle.location.global_relative_frame
-                distance = self.get_distance_meters(current, target)
-                logging.info(f"Distance to target: {distance:.2f} meters")
-                if distance < 2:  # Within 2 meters
-                    logging.info("Reached target location")
+            if search_area:
+                with self.timer.phase('search_upload'):
+                    self.upload_search_mission(search_area, target_altitude)
+                    self.vehicle.commands.next = 0
+                    self.set_mode("AUTO")
+            
+            delivery = 1
+            while self.payloads > 0:
+                # Wait for detection data; after the first drop, give up if nobody else is found
+                logging.info("Waiting for human detection data...")
+                timeout = self.timeouts['target'] if delivery == 1 else self.timeouts['next_target']
+                try:
+                    with self.timer.phase(f'wait_for_target_{delivery}'):
+                        coords = self.wait_for_target(timeout)
+                except PhaseTimeout as e:
+                    logging.info(f"No more victims to serve: {e}")
                     break
-                time.sleep(1)
+                target_id = coords['victim_id']
+                logging.info(f"Received coordinates: {coords}")
+
+                # Move to detected location, following updates to the target's track
+                target = LocationGlobalRelative(
+                    coords['latitude'],
+                    coords['longitude'],
+                    target_altitude
+                )
+                logging.info(f"Moving to target location: {target}")
+                if self.vehicle.mode.name != "GUIDED":
+                    self.set_mode("GUIDED")  # Leave the search pattern; AUTO resumes it later
+                with self.timer.phase(f'transit_{delivery}'):
+                    target = self.fly_to(target_id, target)
+                logging.info("Reached target location")
+
+                # Lower altitude for payload drop
+                logging.info("Lowering altitude for payload drop")
+                lower_location = LocationGlobalRelative(
+                    target.lat,
+                    target.lon,
+                    self.drop_altitude
+                )
+                with self.timer.phase(f'descend_{delivery}'):
+                    self.vehicle.simple_goto(lower_location)
+                    self.events.wait_until(
+                        lambda: self.current_altitude() <= self.drop_altitude + self.altitude_tolerance,
+                        self.timeouts['descend'], f"altitude {self.drop_altitude} m")
 
-            # Lower altitude for payload drop
-            logging.info("Lowering altitude for payload drop")
-            lower_location = LocationGlobalRelative(
-                target.lat,
-                target.lon,
-                5  # Lower altitude for drop
-            )
-            self.vehicle.simple_goto(lower_location)
-            time.sleep(5)  # Wait for altitude adjustment
+                # Drop payload
+                with self.timer.phase(f'drop_{delivery}'):
+                    self.drop_payload()
+                self.mark_delivered(target_id)
+                delivery += 1
 
-            # Drop payload
-            self.drop_payload()
+                # Climb back to search altitude before heading to the next victim
+                if self.payloads > 0:
+                    with self.timer.phase(f'climb_{delivery - 1}'):
+                        self.vehicle.simple_goto(LocationGlobalRelative(target.lat, target.lon, target_altitude))
+                        self.events.wait_until(lambda: self.current_altitude() >= target_altitude * 0.95,
+                                               self.timeouts['climb'], f"altitude {target_altitude} m")
+                    if search_area:
+                        self.set_mode("AUTO")  # Continue the sweep from the current search waypoint
 
             # Return to launch
             logging.info("Mission complete, returning to launch")
@@ -134,17 +368,39 @@ class DroneController:
             
         except Exception as e:
             logging.error(f"Mission failed: {e}")
+            if self.recorder is not None:
+                self.recorder.record_event('mission_failed')
             self.vehicle.mode = VehicleMode("RTL")
             
         finally:
+            logging.info(f"Mission phase timings (s): {self.timer.summary()}")
             logging.info("Cleaning up connections")
-            self.client_socket.close()
+            self.startup.stop()
+            if self.receiving is not None:
+                self.receiving.set()
+            if self.client_socket is not None:
+                self.client_socket.close()
+            if self.receive_thread is not None:
+                self.receive_thread.join(timeout=2)
             self.vehicle.close()
+            # Last, once the receive thread and vehicle listeners no longer record
+            if self.recorder is not None:
+                self.recorder.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--area', nargs=4, type=float, metavar=('NORTH', 'SOUTH', 'WEST', 'EAST'),
+                        help='Rectangle to sweep while searching, as sent to /drone/dispatch/rectangle')
+    parser.add_argument('--payloads', type=int, default=1,
+                        help='Payloads loaded; with more than one, victims are served on one planned route')
+    parser.add_argument('--metrics-port', type=int, default=9101, help='Port of GET /metrics, 0 to disable')
+    parser.add_argument('--record-dir', default='flights',
+                        help='Directory for flight recordings (empty to disable recording)')
+    args = parser.parse_args()
     try:
-        controller = DroneController()
-        controller.execute_mission()
+        controller = DroneController(metrics_port=args.metrics_port, record_dir=args.record_dir or None,
+                                     payloads=args.payloads)
+        controller.execute_mission(search_area=args.area)
     except Exception as e:
         logging.error(f"Program error: {e}")
 
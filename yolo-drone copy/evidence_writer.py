@@ -0,0 +1,119 @@
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+import cv2
+
+ENCODINGS = ('jpeg', 'png', 'crop')
+
+
+class EvidenceWriter:
+    """Writes detection snapshots and JSON sidecars from background threads.
+
+    submit() never blocks: once the queue is three quarters full new snapshots
+    are downsampled by half, and when it is full they are dropped, so disk I/O
+    can fall behind without stalling the detection loop.
+
+    Encodings:
+        jpeg: annotated full frame at ``jpeg_quality``.
+        png:  annotated full frame, lossless.
+        crop: lossless PNG of the alarm's bounding box only.
+    """
+
+    def __init__(self, output_dir='detections', encoding='jpeg', jpeg_quality=90,
+                 workers=2, max_queue=16):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}")
+        self.output_dir = output_dir
+        self.encoding = encoding
+        self.jpeg_quality = jpeg_quality
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.downsample_depth = max(1, max_queue * 3 // 4)
+        self._seq = itertools.count(1)
+        self.written = 0
+        self.downsampled = 0
+        self.dropped = 0
+        os.makedirs(output_dir, exist_ok=True)
+        self.workers = [threading.Thread(target=self._work, name=f'evidence_writer_{i}', daemon=True)
+                        for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, frame, metadata, boxes=None, track_id=None, bbox=None):
+        """
+        Queue a snapshot for writing.
+
+        Args:
+            frame (array): Raw BGR frame; it must not be modified by the caller afterwards.
+            metadata (dict): Geolocation, confidence and anything else for the JSON sidecar.
+            boxes (array): Optional (N, >=4) boxes to draw on full-frame snapshots.
+            track_id (int): Track id, used in the file name.
+            bbox (sequence): x_min, y_min, x_max, y_max of the alarm, required for crop encoding.
+
+        Returns:
+            str or None: Base path (without extension) of the queued snapshot, None if dropped.
+        """
+        scale = 1.0
+        if self.queue.qsize() >= self.downsample_depth:
+            scale = 0.5
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        name = f"detection_{timestamp}_{next(self._seq):06d}"
+        if track_id is not None:
+            name += f"_t{track_id}"
+        base = os.path.join(self.output_dir, name)
+        try:
+            self.queue.put_nowait((base, frame, dict(metadata), boxes, bbox, scale))
+        except queue.Full:
+            self.dropped += 1
+            return None
+        if scale != 1.0:
+            self.downsampled += 1
+        return base
+
+    def _encode(self, frame, boxes, bbox, scale):
+        if self.encoding == 'crop' and bbox is not None:
+            x_min, y_min, x_max, y_max = (int(v) for v in bbox[:4])
+            image = frame[max(0, y_min):y_max, max(0, x_min):x_max]
+            params, ext = [], '.png'
+        else:
+            image = frame.copy()
+            if boxes is not None:
+                for x_min, y_min, x_max, y_max in (tuple(int(v) for v in box[:4]) for box in boxes):
+                    cv2.rectangle(image, (x_min, y_min), (x_max, y_max), (0, 255, 0), 2)
+            if self.encoding == 'jpeg':
+                params, ext = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality], '.jpg'
+            else:
+                params, ext = [], '.png'
+        if scale != 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return image, params, ext
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            base, frame, metadata, boxes, bbox, scale = item
+            try:
+                image, params, ext = self._encode(frame, boxes, bbox, scale)
+                cv2.imwrite(base + ext, image, params)
+                metadata.update(image=os.path.basename(base + ext), encoding=self.encoding, scale=scale)
+                with open(base + '.json', 'w') as sidecar:
+                    json.dump(metadata, sidecar)
+                self.written += 1
+            except Exception as e:
+                logging.error(f"Error writing evidence {base}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def close(self):
+        """Write everything still queued, then stop the workers."""
+        self.queue.join()
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=5)
@@ -0,0 +1,264 @@
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import numpy as np
+
+# Fixed-width records, one file per stream. Times are time.monotonic() of the recording
+# process; meta.json holds the wall-clock time of monotonic_start to convert them.
+DETECTION_DTYPE = np.dtype([
+    ('time', '<f8'),         # Frame capture time
+    ('seq', '<u4'),          # Frame sequence number of the camera
+    ('camera', 'u1'),        # Index into meta['cameras']
+    ('mode', 'u1'),          # Index into MODES
+    ('cls', '<u2'),
+    ('track_id', '<i4'),     # -1 when no track was assigned
+    ('box', '<f4', (4,)),    # x_min, y_min, x_max, y_max in frame pixels
+    ('conf', '<f4'),
+    ('latitude', '<f8'),     # NaN when the frame could not be georeferenced
+    ('longitude', '<f8'),
+    ('distance', '<f4'),
+])
+POSE_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('latitude', '<f8'),
+    ('longitude', '<f8'),
+    ('altitude', '<f4'),     # Meters above home
+    ('heading', '<f4'),      # Degrees, NaN when unknown
+])
+EVENT_DTYPE = np.dtype([
+    ('time', '<f8'),         # Event time, or start time of a timed phase
+    ('name', 'S24'),
+    ('target', '<i4'),       # Victim id the event concerns, -1 for none
+    ('value', '<f8'),        # Phase duration in seconds, NaN for instant events
+])
+STREAMS = {'detections': DETECTION_DTYPE, 'poses': POSE_DTYPE, 'events': EVENT_DTYPE}
+MODES = ('full', 'roi', 'skip')
+
+# File header: magic, version, record size, record count, padded to HEADER_SIZE bytes
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 64
+MAGIC = b'FLIGHTRC'
+VERSION = 1
+
+
+class RecordStream:
+    """Append-only file of fixed-width records, written through a memory map.
+
+    The file is preallocated and doubled when full, so an append is a write
+    into mapped memory plus a count update in the header; nothing is
+    serialized. Readers trust the header count, so a crash loses at most the
+    records the OS had not written back yet. One writer thread per stream.
+    """
+
+    def __init__(self, path, dtype, capacity=4096):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.dtype.itemsize, 0).ljust(HEADER_SIZE, b'\0'))
+            f.truncate(HEADER_SIZE + capacity * self.dtype.itemsize)
+        self._map(capacity)
+
+    def _map(self, capacity):
+        self.capacity = capacity
+        self._mmap = np.memmap(self.path, dtype=np.uint8, mode='r+',
+                               shape=(HEADER_SIZE + capacity * self.dtype.itemsize,))
+        self._count_field = self._mmap[16:24].view('<u8')
+        self.records = self._mmap[HEADER_SIZE:].view(self.dtype)
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        self._mmap.flush()
+        del self.records, self._count_field, self._mmap
+        with open(self.path, 'r+b') as f:
+            f.truncate(HEADER_SIZE + capacity * self.dtype.itemsize)
+        self._map(capacity)
+
+    def reserve(self, n):
+        """Writable view of the next n records; they become visible to readers on commit(n)."""
+        if self.count + n > self.capacity:
+            self._grow(self.count + n)
+        return self.records[self.count:self.count + n]
+
+    def commit(self, n):
+        self.count += n
+        self._count_field[0] = self.count
+
+    def append(self, *values):
+        self.reserve(1)[0] = values
+        self.commit(1)
+
+    def flush(self):
+        self._mmap.flush()
+
+    def close(self):
+        """Flush and cut the preallocated tail off the file."""
+        self.flush()
+        del self.records, self._count_field, self._mmap
+        with open(self.path, 'r+b') as f:
+            f.truncate(HEADER_SIZE + self.count * self.dtype.itemsize)
+
+
+def new_flight_directory(root='flights', name='detection'):
+    """Fresh directory for one recording, named by start time, recording process and pid."""
+    base = os.path.join(root, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{os.getpid()}")
+    path, n = base, 1
+    while os.path.exists(path):  # Restarted within the same second
+        n += 1
+        path = f"{base}-{n}"
+    return path
+
+
+class FlightRecorder:
+    """Binary flight data recorder: detections, poses and mission events.
+
+    Each stream is a RecordStream under ``directory``; a background thread
+    flushes them every ``flush_interval`` seconds. Use load_flight() to read
+    a recording back as NumPy arrays. Records arriving after close() are dropped.
+    """
+
+    def __init__(self, directory, flush_interval=1.0, capacity=4096):
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(os.path.join(directory, 'meta.json')):
+            raise FileExistsError(f"{directory} already holds a flight recording")
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.meta = {
+            'version': VERSION,
+            'wall_start': time.time(),
+            'monotonic_start': time.monotonic(),
+            'cameras': [],
+            'modes': list(MODES),
+        }
+        self.cameras = {}
+        self.streams = {name: RecordStream(os.path.join(directory, f"{name}.bin"), dtype, capacity)
+                        for name, dtype in STREAMS.items()}
+        self._locks = {name: threading.Lock() for name in STREAMS}
+        self.closed = False  # Checked under the stream lock, so no write races close()
+        self._write_meta()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name='flight_recorder', daemon=True)
+        self._thread.start()
+        logging.info(f"Recording flight data to {directory}")
+
+    def _write_meta(self):
+        with open(os.path.join(self.directory, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f, indent=2)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def camera_index(self, camera_id):
+        index = self.cameras.get(camera_id)
+        if index is None:
+            index = self.cameras[camera_id] = len(self.meta['cameras'])
+            self.meta['cameras'].append(str(camera_id))
+            self._write_meta()
+        return index
+
+    def record_detections(self, timestamp, camera_id, seq, detections, track_ids=None, located=None, mode='full'):
+        """
+        Record all detections of one frame in one block write.
+
+        Args:
+            timestamp (float): Frame capture time, time.monotonic().
+            camera_id: Camera the frame came from.
+            seq (int): Frame sequence number.
+            detections (array): (N, 6) x_min, y_min, x_max, y_max, conf, class.
+            track_ids (array): Optional (N,) track id per detection.
+            located (array): Optional (N, >=3) latitude, longitude, distance per detection,
+                as Geolocator.locate returns.
+            mode (str): Inference mode of the frame, one of MODES.
+        """
+        n = len(detections)
+        if not n:
+            return
+        camera = self.camera_index(camera_id)
+        with self._locks['detections']:
+            if self.closed:
+                return
+            stream = self.streams['detections']
+            block = stream.reserve(n)
+            block['time'] = timestamp
+            block['seq'] = seq
+            block['camera'] = camera
+            block['mode'] = MODES.index(mode)
+            block['cls'] = detections[:, 5]
+            block['track_id'] = track_ids if track_ids is not None else -1
+            block['box'] = detections[:, :4]
+            block['conf'] = detections[:, 4]
+            if located is not None:
+                block['latitude'] = located[:, 0]
+                block['longitude'] = located[:, 1]
+                block['distance'] = located[:, 2]
+            else:
+                block['latitude'] = block['longitude'] = block['distance'] = np.nan
+            stream.commit(n)
+
+    def record_pose(self, timestamp, latitude, longitude, altitude, heading=None):
+        with self._locks['poses']:
+            if self.closed:
+                return
+            self.streams['poses'].append(timestamp, latitude, longitude, altitude,
+                                         np.nan if heading is None else heading)
+
+    def record_event(self, name, target=-1, value=np.nan, timestamp=None):
+        """Record a mission event; value is the duration for timed phases."""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._locks['events']:
+            if self.closed:
+                return
+            self.streams['events'].append(timestamp, name.encode()[:24], -1 if target is None else target, value)
+
+    def flush(self):
+        for name, stream in self.streams.items():
+            with self._locks[name]:
+                if not self.closed:
+                    stream.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.closed = True
+        for name, stream in self.streams.items():
+            with self._locks[name]:
+                stream.close()
+        self._write_meta()
+        logging.info("Flight data recorded: " + ', '.join(f"{stream.count} {name}"
+                                                          for name, stream in self.streams.items()))
+
+
+def read_stream(path, dtype):
+    """Records of one stream file as a read-only memory-mapped array (no copy)."""
+    with open(path, 'rb') as f:
+        magic, version, itemsize, count = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} flight record")
+    if itemsize != np.dtype(dtype).itemsize:
+        raise ValueError(f"{path} has {itemsize}-byte records, expected {np.dtype(dtype).itemsize}")
+    if not count:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+def load_flight(directory):
+    """
+    Load a recording made by FlightRecorder, including one still being written.
+
+    Returns:
+        dict: 'meta' (meta.json), and 'detections', 'poses' and 'events' as
+        memory-mapped structured arrays with the *_DTYPE fields.
+    """
+    with open(os.path.join(directory, 'meta.json')) as f:
+        flight = {'meta': json.load(f)}
+    for name, dtype in STREAMS.items():
+        flight[name] = read_stream(os.path.join(directory, f"{name}.bin"), dtype)
+    return flight
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import deque
+
+
+class FramePacket:
+    """A captured frame together with its capture metadata."""
+
+    __slots__ = ('seq', 'frame', 'capture_time', 'camera_id')
+
+    def __init__(self, seq, frame, capture_time, camera_id=None):
+        self.seq = seq
+        self.frame = frame
+        self.capture_time = capture_time  # time.monotonic() when the frame was read
+        self.camera_id = camera_id
+
+    def age(self, now=None):
+        """Seconds elapsed since the frame was captured."""
+        return (now if now is not None else time.monotonic()) - self.capture_time
+
+
+class LatestQueue:
+    """Bounded queue that drops the oldest item when full.
+
+    Producers never block, so a slow consumer only ever loses stale items
+    and always finds the freshest ones waiting for it.
+    """
+
+    def __init__(self, maxsize=1):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        """Add an item, evicting the oldest one if the queue is full."""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Pop the oldest queued item, or return None on timeout."""
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+    def get_latest(self, timeout=None):
+        """Pop the newest queued item and discard everything older."""
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            return item
+
+    def clear(self):
+        with self._cond:
+            self.dropped += len(self._items)
+            self._items.clear()
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+
+class StageStats:
+    """Rolling frame-age statistics for one pipeline stage."""
+
+    def __init__(self, window=100):
+        self._ages = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, age):
+        self._ages.append(age)
+        self.count += 1
+
+    def snapshot(self):
+        """Return the latest, mean and max frame age (ms) over the window."""
+        ages = list(self._ages)
+        if not ages:
+            return {'count': self.count, 'last_ms': None, 'mean_ms': None, 'max_ms': None}
+        return {
+            'count': self.count,
+            'last_ms': ages[-1] * 1000,
+            'mean_ms': sum(ages) / len(ages) * 1000,
+            'max_ms': max(ages) * 1000,
+        }
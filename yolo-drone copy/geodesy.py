@@ -0,0 +1,111 @@
+import math
+import numpy as np
+
+EARTH_RADIUS = 6371000.0  # Mean Earth radius in meters
+
+# Scalar versions use the math module and are the fastest choice for one pair of points;
+# the *_np versions take arrays (or scalars) and broadcast.
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between two points given in decimal degrees."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(min(1.0, a)))
+
+
+def equirectangular(lat1, lon1, lat2, lon2):
+    """Flat-earth distance in meters with longitude convergence; accurate over a few kilometers."""
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return EARTH_RADIUS * math.hypot(x, y)
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    """Initial bearing in degrees clockwise from north, from the first point to the second."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dlon = math.radians(lon2 - lon1)
+    y = math.sin(dlon) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlon)
+    return math.degrees(math.atan2(y, x)) % 360
+
+
+def destination(lat, lon, distance, bearing_deg):
+    """Point reached from (lat, lon) after distance meters along bearing_deg; returns (lat, lon)."""
+    phi1, lam1 = math.radians(lat), math.radians(lon)
+    delta, theta = distance / EARTH_RADIUS, math.radians(bearing_deg)
+    phi2 = math.asin(math.sin(phi1) * math.cos(delta) + math.cos(phi1) * math.sin(delta) * math.cos(theta))
+    lam2 = lam1 + math.atan2(math.sin(theta) * math.sin(delta) * math.cos(phi1),
+                             math.cos(delta) - math.sin(phi1) * math.sin(phi2))
+    return math.degrees(phi2), (math.degrees(lam2) + 540) % 360 - 180
+
+
+def haversine_np(lat1, lon1, lat2, lon2):
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(np.subtract(lon2, lon1)) / 2) ** 2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(1.0, a)))
+
+
+def equirectangular_np(lat1, lon1, lat2, lon2):
+    x = np.radians(np.subtract(lon2, lon1)) * np.cos(np.radians(np.add(lat1, lat2) / 2))
+    y = np.radians(np.subtract(lat2, lat1))
+    return EARTH_RADIUS * np.hypot(x, y)
+
+
+def bearing_np(lat1, lon1, lat2, lon2):
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dlon = np.radians(np.subtract(lon2, lon1))
+    y = np.sin(dlon) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
+def destination_np(lat, lon, distance, bearing_deg):
+    phi1, lam1 = np.radians(lat), np.radians(lon)
+    delta, theta = np.divide(distance, EARTH_RADIUS), np.radians(bearing_deg)
+    sin_phi1, cos_phi1 = np.sin(phi1), np.cos(phi1)
+    sin_phi2 = sin_phi1 * np.cos(delta) + cos_phi1 * np.sin(delta) * np.cos(theta)
+    phi2 = np.arcsin(sin_phi2)
+    lam2 = lam1 + np.arctan2(np.sin(theta) * np.sin(delta) * cos_phi1, np.cos(delta) - sin_phi1 * sin_phi2)
+    return np.degrees(phi2), (np.degrees(lam2) + 540) % 360 - 180
+
+
+def haversine_matrix(lats1, lons1, lats2, lons2):
+    """(N, M) great-circle distances in meters between every pair of points of the two sets."""
+    return haversine_np(np.asarray(lats1, dtype=np.float64)[:, None], np.asarray(lons1, dtype=np.float64)[:, None],
+                        np.asarray(lats2, dtype=np.float64)[None, :], np.asarray(lons2, dtype=np.float64)[None, :])
+
+
+class LocalFrame:
+    """East-north-up tangent plane at a fixed origin, for fast metric work near it.
+
+    The origin's trigonometry is computed once, so converting points costs a
+    multiply and an add per axis. Scale error grows with north-south distance
+    from the origin: under a millimeter within 100 m, and up to about 1 m at
+    5 km at high latitudes (see yolo-model/geodesy_benchmark.py).
+    """
+
+    def __init__(self, lat0, lon0):
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.meters_per_rad_lat = EARTH_RADIUS
+        self.meters_per_rad_lon = EARTH_RADIUS * math.cos(math.radians(lat0))
+
+    def to_enu(self, lat, lon):
+        """Return (east, north) in meters for scalars or arrays of degrees."""
+        east = np.radians(np.subtract(lon, self.lon0)) * self.meters_per_rad_lon
+        north = np.radians(np.subtract(lat, self.lat0)) * self.meters_per_rad_lat
+        return east, north
+
+    def to_geodetic(self, east, north):
+        """Inverse of to_enu; returns (lat, lon) in degrees."""
+        lat = self.lat0 + np.degrees(np.divide(north, self.meters_per_rad_lat))
+        lon = self.lon0 + np.degrees(np.divide(east, self.meters_per_rad_lon))
+        return lat, lon
+
+    def distance(self, lat1, lon1, lat2, lon2):
+        east1, north1 = self.to_enu(lat1, lon1)
+        east2, north2 = self.to_enu(lat2, lon2)
+        return np.hypot(east2 - east1, north2 - north1)
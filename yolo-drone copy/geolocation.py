@@ -0,0 +1,79 @@
+import math
+import numpy as np
+try:
+    from utils.geodesy import destination_np
+except ImportError:  # Imported from the repository checkout, as yolo-model/ does
+    from geodesy import destination_np
+
+# Columns of the array returned by Geolocator.locate
+LAT, LON, DISTANCE, BEARING, CONFIDENCE = range(5)
+
+
+class PixelTables:
+    """Ground distance and direction of every pixel, for one frame size.
+
+    ``distance`` is in metres per metre of altitude, so a single multiply by
+    the current altitude gives metres on the ground. ``angle`` is the direction
+    from the frame centre in radians, clockwise from image-up: the camera looks
+    straight down with image-up towards the vehicle's nose, so image-right is
+    its right side and ``angle`` plus the heading is a compass bearing.
+    """
+
+    def __init__(self, frame_width, frame_height, fov):
+        meters_per_pixel = 2 * math.tan(math.radians(fov) / 2) / frame_width
+        dx = np.arange(frame_width, dtype=np.float32) - frame_width / 2
+        dy = (np.arange(frame_height, dtype=np.float32) - frame_height / 2)[:, None]
+        self.distance = (np.hypot(dx, dy) * meters_per_pixel).astype(np.float32)
+        self.angle = np.arctan2(dx, -dy).astype(np.float32)  # Image rows grow downwards
+
+
+class Geolocator:
+    """Georeferences all detections of a frame in one vectorized call."""
+
+    def __init__(self, fov=45):
+        self.fov = fov  # Camera field of view in degrees
+        self._tables = {}
+
+    def tables(self, frame_width, frame_height):
+        key = (frame_width, frame_height)
+        tables = self._tables.get(key)
+        if tables is None:
+            tables = self._tables[key] = PixelTables(frame_width, frame_height, self.fov)
+        return tables
+
+    def locate(self, detections, latitude, longitude, altitude, frame_width, frame_height, heading=None):
+        """
+        Convert an array of detections to ground positions.
+
+        Args:
+            detections (array): (N, 6) boxes as in results.xyxy[0]: x_min, y_min, x_max, y_max, conf, class.
+            latitude (float): Drone latitude in decimal degrees.
+            longitude (float): Drone longitude in decimal degrees.
+            altitude (float): Drone altitude above ground in meters.
+            frame_width (int): Width of the video frame in pixels.
+            frame_height (int): Height of the video frame in pixels.
+            heading (float): Drone heading in degrees; None takes image-up as north.
+
+        Returns:
+            array: (N, 5) float array indexed by LAT, LON, DISTANCE (m), BEARING (deg), CONFIDENCE.
+        """
+        boxes = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+        located = np.empty((len(boxes), 5))
+        if not len(boxes):
+            return located
+
+        tables = self.tables(frame_width, frame_height)
+        center_x = ((boxes[:, 0] + boxes[:, 2]) * 0.5).astype(np.intp).clip(0, frame_width - 1)
+        center_y = ((boxes[:, 1] + boxes[:, 3]) * 0.5).astype(np.intp).clip(0, frame_height - 1)
+        # Tables are float32 to stay small; degrees need float64 precision
+        distance = tables.distance[center_y, center_x].astype(np.float64) * altitude
+        angle = tables.angle[center_y, center_x].astype(np.float64)
+        if heading is not None:
+            angle += math.radians(heading)
+
+        bearing = np.degrees(angle) % 360
+        located[:, LAT], located[:, LON] = destination_np(latitude, longitude, distance, bearing)
+        located[:, DISTANCE] = distance
+        located[:, BEARING] = bearing
+        located[:, CONFIDENCE] = boxes[:, 4]
+        return located
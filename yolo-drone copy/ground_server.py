@@ -0,0 +1,190 @@
+import logging
+import selectors
+import socket
+import threading
+from collections import deque
+try:
+    from utils.protocol import MessageReader
+    from utils.instrumentation import REGISTRY
+except ImportError:  # Imported from the repository checkout, as yolo-model/ does
+    from protocol import MessageReader
+    from instrumentation import REGISTRY
+
+
+class Subscriber:
+    """One connected client and its bounded queue of outgoing messages."""
+
+    def __init__(self, sock, addr, max_queue):
+        self.sock = sock
+        self.addr = addr
+        self.reader = MessageReader()
+        self.pending = deque()  # Whole messages not yet started
+        self.max_queue = max_queue
+        self.current = None     # memoryview of the message being written
+        self.dropped = 0
+        self.sent = 0
+
+    def enqueue(self, data):
+        """Queue a message; returns True if the oldest queued one had to be dropped for it."""
+        dropped = len(self.pending) >= self.max_queue
+        if dropped:
+            self.pending.popleft()  # Oldest unsent message goes, never a partly sent one
+            self.dropped += 1
+        self.pending.append(data)
+        return dropped
+
+    def flush(self):
+        """Write as much as the socket accepts; returns True once everything is sent."""
+        while True:
+            if self.current is None:
+                if not self.pending:
+                    return True
+                self.current = memoryview(self.pending.popleft())
+            try:
+                written = self.sock.send(self.current)
+            except BlockingIOError:
+                return False
+            self.current = self.current[written:]
+            if len(self.current):
+                return False
+            self.current = None
+            self.sent += 1
+
+
+class BroadcastServer:
+    """Selector-based server that fans framed messages out to any number of subscribers.
+
+    broadcast() can be called from any thread and never blocks: each
+    subscriber has its own bounded send queue, so a slow ground link only
+    loses its own oldest messages and cannot hold back the others.
+    """
+
+    def __init__(self, host='0.0.0.0', port=5000, max_queue=64, on_message=None):
+        self.max_queue = max_queue
+        self.on_message = on_message  # Called as on_message(subscriber, msg_type, payload)
+        self.selector = selectors.DefaultSelector()
+        self.subscribers = {}
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+        self.broadcasts = REGISTRY.counter('broadcast_messages', 'Messages broadcast to all subscribers')
+        self.drops = REGISTRY.counter('subscriber_drops', 'Queued messages dropped for slow subscribers')
+        self.send_time = REGISTRY.histogram('socket_send_seconds', 'Non-blocking sends to all subscribers per pass')
+
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((host, port))
+        self.server_socket.listen(8)
+        self.server_socket.setblocking(False)
+        self.selector.register(self.server_socket, selectors.EVENT_READ, None)
+
+        # Lets broadcast() wake the selector when new data is queued
+        self._wake_recv, self._wake_send = socket.socketpair()
+        self._wake_recv.setblocking(False)
+        self._wake_send.setblocking(False)
+        self.selector.register(self._wake_recv, selectors.EVENT_READ, 'wake')
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._loop, name='broadcast_server', daemon=True)
+        self._thread.start()
+
+    def broadcast(self, data):
+        with self._lock:
+            for subscriber in self.subscribers.values():
+                if subscriber.enqueue(data):
+                    self.drops.inc()
+        self.broadcasts.inc()
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_send.send(b'\0')
+        except BlockingIOError:
+            pass  # Already a wake-up pending
+
+    def _loop(self):
+        while self._running.is_set():
+            for key, events in self.selector.select(timeout=0.5):
+                if key.fileobj is self.server_socket:
+                    self._accept()
+                elif key.data == 'wake':
+                    try:
+                        self._wake_recv.recv(4096)
+                    except BlockingIOError:
+                        pass
+                else:
+                    subscriber = key.data
+                    if events & selectors.EVENT_READ:
+                        self._read(subscriber)
+            self._flush_all()
+
+    def _accept(self):
+        try:
+            sock, addr = self.server_socket.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        subscriber = Subscriber(sock, addr, self.max_queue)
+        with self._lock:
+            self.subscribers[sock.fileno()] = subscriber
+        self.selector.register(sock, selectors.EVENT_READ, subscriber)
+        logging.info(f"Subscriber connected: {addr}")
+
+    def _read(self, subscriber):
+        try:
+            messages = subscriber.reader.recv_from(subscriber.sock)
+        except BlockingIOError:
+            return
+        except Exception as e:
+            self._drop(subscriber, e)
+            return
+        if self.on_message:
+            for msg_type, payload in messages:
+                self.on_message(subscriber, msg_type, payload)
+
+    def _flush_all(self):
+        with self._lock:
+            subscribers = list(self.subscribers.values())
+        if not subscribers:
+            return
+        with self.send_time.time():
+            for subscriber in subscribers:
+                try:
+                    done = subscriber.flush()
+                except Exception as e:
+                    self._drop(subscriber, e)
+                    continue
+                events = selectors.EVENT_READ if done else selectors.EVENT_READ | selectors.EVENT_WRITE
+                self.selector.modify(subscriber.sock, events, subscriber)
+
+    def _drop(self, subscriber, reason):
+        logging.info(f"Subscriber {subscriber.addr} disconnected: {reason}")
+        with self._lock:
+            self.subscribers.pop(subscriber.sock.fileno(), None)
+        try:
+            self.selector.unregister(subscriber.sock)
+        except (KeyError, ValueError):
+            pass
+        subscriber.sock.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                str(subscriber.addr): {'queued': len(subscriber.pending), 'sent': subscriber.sent,
+                                       'dropped': subscriber.dropped}
+                for subscriber in self.subscribers.values()
+            }
+
+    def close(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        with self._lock:
+            subscribers = list(self.subscribers.values())
+        for subscriber in subscribers:
+            self._drop(subscriber, "server shutting down")
+        self.selector.close()
+        self.server_socket.close()
+        self._wake_recv.close()
+        self._wake_send.close()
@@ -0,0 +1,286 @@
+import cv2
+import numpy as np
+try:
+    from utils.detectors import DetectionResults
+except ImportError:  # Imported from the repository checkout, as yolo-model/ does
+    from detectors import DetectionResults
+
+FULL, ROI, SKIP = 'full', 'roi', 'skip'
+
+# Named scheduling policies; any of their settings can be overridden in make_scheduler
+POLICIES = {
+    'always': dict(full_every=1, motion=False, roi=False),   # Full frame every frame (the old behaviour)
+    'every_n': dict(full_every=5, motion=False, roi=False),  # Full frame every N frames, trackers coast between
+    'motion': dict(full_every=30, motion=True, roi=False),   # Full frame when the scene changed, or every N
+    'roi': dict(full_every=30, motion=True, roi=True, roi_every=3),  # As motion, plus crops around tracks
+}
+
+
+class MotionDetector:
+    """Cheap scene-change check on a small blurred grey copy of the frame.
+
+    The frame is compared with the reference taken at the last full
+    inference, so slow drift adds up until it triggers instead of hiding
+    under a per-frame threshold. All buffers are reused between frames.
+    """
+
+    def __init__(self, width=160, threshold=25, blur=5):
+        self.width = width
+        self.threshold = threshold  # Grey-level change that counts a pixel as changed
+        self.blur = blur
+        self.reference = None
+        self._shape = None
+
+    def measure(self, frame):
+        """Fraction of pixels that changed since the reference; 1.0 before there is one."""
+        frame_height, frame_width = frame.shape[:2]
+        shape = (max(1, round(frame_height * self.width / frame_width)), self.width)
+        if shape != self._shape:
+            self._shape = shape
+            self._resized = np.empty(shape + (3,), dtype=np.uint8)
+            self._grey = np.empty(shape, dtype=np.uint8)
+            self._diff = np.empty(shape, dtype=np.uint8)
+            self.reference = None
+        cv2.resize(frame, shape[::-1], dst=self._resized, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2GRAY, dst=self._grey)
+        cv2.GaussianBlur(self._grey, (self.blur, self.blur), 0, dst=self._grey)
+        if self.reference is None:
+            return 1.0
+        cv2.absdiff(self._grey, self.reference, dst=self._diff)
+        cv2.threshold(self._diff, self.threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+        return cv2.countNonZero(self._diff) / self._diff.size
+
+    def set_reference(self):
+        """Make the last measured frame the reference."""
+        if self.reference is None:
+            self.reference = self._grey.copy()
+        else:
+            np.copyto(self.reference, self._grey)
+
+
+class CameraSchedule:
+    """Per-camera scheduling state."""
+
+    __slots__ = ('motion', 'since_full', 'since_roi', 'last_motion')
+
+    def __init__(self, motion):
+        self.motion = motion
+        self.since_full = None  # Frames since the last full inference, None before the first
+        self.since_roi = 0
+        self.last_motion = None
+
+
+def roi_windows(boxes, frame_shape, roi_size, margin):
+    """
+    Square crop windows around predicted boxes, shifted to lie inside the frame.
+
+    Args:
+        boxes (array): (K, 4) xyxy boxes in frame pixels.
+        frame_shape (tuple): Shape of the frame.
+        roi_size (int): Smallest window side in pixels.
+        margin (float): Extra context around each box, as a fraction of its longer side.
+
+    Returns:
+        array: (K, 3) int x, y, side of each window.
+    """
+    frame_height, frame_width = frame_shape[:2]
+    longer = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+    side = np.clip(np.maximum(longer * (1 + margin), roi_size), 1, min(frame_height, frame_width)).astype(int)
+    x = np.clip(((boxes[:, 0] + boxes[:, 2]) / 2 - side / 2).astype(int), 0, frame_width - side)
+    y = np.clip(((boxes[:, 1] + boxes[:, 3]) / 2 - side / 2).astype(int), 0, frame_height - side)
+    return np.column_stack([x, y, side])
+
+
+def nms(detections, iou):
+    """Per-class non-maximum suppression of (N, 6) detections."""
+    if len(detections) < 2:
+        return detections
+    xywh = detections[:, :4].astype(np.float32)
+    xywh[:, 2:] -= xywh[:, :2]
+    xywh[:, :2] += (detections[:, 5] * 4096.0)[:, None]
+    kept = cv2.dnn.NMSBoxes(xywh.tolist(), detections[:, 4].tolist(), 0.0, iou)
+    return detections[np.asarray(kept, dtype=np.intp).reshape(-1)]
+
+
+class InferenceScheduler:
+    """Decides per frame whether to run the detector on the full frame, on crops, or not at all.
+
+    A frame gets full inference every ``full_every`` frames, or as soon as
+    the motion check sees that enough of the scene changed since the last
+    full pass. In between, frames whose camera has live tracks get ROI
+    inference: square windows around the tracker's predicted boxes are
+    tiled into mosaics the size of the model input, so all tracks of all
+    cameras in a batch cost as few images as possible and small victims are
+    seen at native resolution. Remaining frames are skipped and their
+    trackers coast on the motion model (see Tracker.coast).
+    """
+
+    def __init__(self, predicted_boxes=None, full_every=30, motion=True, roi=True, motion_threshold=25,
+                 motion_fraction=0.002, motion_width=160, roi_every=1, roi_size=320, roi_margin=1.0,
+                 max_rois=8, input_size=640, iou=0.45):
+        """
+        Args:
+            predicted_boxes (callable): camera_id -> (K, 4) predicted xyxy boxes of its live tracks.
+            full_every (int): Longest run of frames without a full inference.
+            motion (bool): Run full inference when the scene changed.
+            roi (bool): Run crop inference around tracks on the other frames.
+            motion_threshold (int): Grey-level change that counts a pixel as changed.
+            motion_fraction (float): Fraction of changed pixels that triggers full inference.
+            motion_width (int): Width of the downscaled frame the motion check runs on.
+            roi_every (int): Run crop inference every roi_every frames when not running full.
+            roi_size (int): Side of a mosaic tile; input_size // roi_size tiles fit per row.
+            roi_margin (float): Context around each predicted box, as a fraction of its longer side.
+            max_rois (int): Most crop windows per frame.
+            input_size (int): Model input size, the mosaic side.
+            iou (float): IoU threshold for merging detections from overlapping crops.
+        """
+        if roi and predicted_boxes is None:
+            raise ValueError("ROI scheduling needs predicted_boxes")
+        self.predicted_boxes = predicted_boxes
+        self.full_every = max(1, full_every)
+        self.use_motion = motion
+        self.use_roi = roi
+        self.motion_threshold = motion_threshold
+        self.motion_fraction = motion_fraction
+        self.motion_width = motion_width
+        self.roi_every = max(1, roi_every)
+        self.roi_size = roi_size
+        self.roi_margin = roi_margin
+        self.max_rois = max_rois
+        self.input_size = input_size
+        self.iou = iou
+        self.tiles = max(1, input_size // roi_size)
+        self.cameras = {}
+        self._mosaics = []
+        self.counts = {FULL: 0, ROI: 0, SKIP: 0}
+        self.motion_triggers = 0
+        self.images = 0  # Images sent to the detector, full frames plus mosaics
+
+    def _camera(self, camera_id):
+        schedule = self.cameras.get(camera_id)
+        if schedule is None:
+            motion = MotionDetector(self.motion_width, self.motion_threshold) if self.use_motion else None
+            schedule = self.cameras[camera_id] = CameraSchedule(motion)
+        return schedule
+
+    def decide(self, camera_id, frame):
+        """Mode for this frame, and the (K, 3) crop windows when it is ROI."""
+        schedule = self._camera(camera_id)
+        mode = FULL if schedule.since_full is None or schedule.since_full + 1 >= self.full_every else None
+        if mode is None and schedule.motion is not None:
+            schedule.last_motion = schedule.motion.measure(frame)
+            if schedule.last_motion >= self.motion_fraction:
+                mode = FULL
+                self.motion_triggers += 1
+        windows = None
+        if mode is None and self.use_roi and schedule.since_roi + 1 >= self.roi_every:
+            boxes = np.asarray(self.predicted_boxes(camera_id)).reshape(-1, 4)[:self.max_rois]
+            if len(boxes):
+                mode, windows = ROI, roi_windows(boxes, frame.shape, self.roi_size, self.roi_margin)
+        mode = mode or SKIP
+
+        if mode == FULL:
+            schedule.since_full = 0
+            schedule.since_roi = 0
+            if schedule.motion is not None:
+                if schedule.last_motion is None:  # Full pass was due, the check did not run
+                    schedule.motion.measure(frame)
+                schedule.motion.set_reference()
+        else:
+            schedule.since_full += 1
+            schedule.since_roi = 0 if mode == ROI else schedule.since_roi + 1
+        schedule.last_motion = None
+        self.counts[mode] += 1
+        return mode, windows
+
+    def _mosaic(self, index):
+        while len(self._mosaics) <= index:
+            self._mosaics.append(np.zeros((self.input_size, self.input_size, 3), dtype=np.uint8))
+        return self._mosaics[index]
+
+    def predict(self, predict_batch, camera_ids, frames):
+        """
+        Run one scheduled batch.
+
+        Args:
+            predict_batch (callable): A detector's predict_batch.
+            camera_ids (list): Camera of each frame.
+            frames (list): BGR frames, one per camera id.
+
+        Returns:
+            tuple: (detections, modes, results) with an (N, 6) array per frame in frame
+            pixels (empty for skipped frames), the mode of each frame, and a DetectionResults.
+        """
+        modes, images, tiles = [], [], []  # tiles: (frame index, mosaic index, tile, x, y, side)
+        full_images = {}
+        for index, (camera_id, frame) in enumerate(zip(camera_ids, frames)):
+            mode, windows = self.decide(camera_id, frame)
+            modes.append(mode)
+            if mode == FULL:
+                full_images[index] = len(images)
+                images.append(frame)
+            elif mode == ROI:
+                for x, y, side in windows:
+                    tiles.append((index, x, y, side))
+
+        # Pack every crop of the batch into as few model-input mosaics as possible
+        per_mosaic = self.tiles * self.tiles
+        first_mosaic = len(images)
+        placed = []
+        for slot, (index, x, y, side) in enumerate(tiles):
+            mosaic_index, tile = divmod(slot, per_mosaic)
+            mosaic = self._mosaic(mosaic_index)
+            if tile == 0:
+                mosaic.fill(114)
+                images.append(mosaic)
+            row, col = divmod(tile, self.tiles)
+            top, left = row * self.roi_size, col * self.roi_size
+            cv2.resize(frames[index][y:y + side, x:x + side], (self.roi_size, self.roi_size),
+                       dst=mosaic[top:top + self.roi_size, left:left + self.roi_size],
+                       interpolation=cv2.INTER_AREA if side > self.roi_size else cv2.INTER_LINEAR)
+            placed.append((index, first_mosaic + mosaic_index, left, top, x, y, side / self.roi_size))
+
+        self.images += len(images)
+        outputs = predict_batch(images)[0] if images else []
+        detections = [np.empty((0, 6), dtype=np.float32) for _ in frames]
+        for index, image_index in full_images.items():
+            detections[index] = outputs[image_index]
+
+        crops = {}
+        for index, image_index, left, top, x, y, scale in placed:
+            boxes = outputs[image_index]
+            centre_x = (boxes[:, 0] + boxes[:, 2]) / 2
+            centre_y = (boxes[:, 1] + boxes[:, 3]) / 2
+            inside = ((centre_x >= left) & (centre_x < left + self.roi_size) &
+                      (centre_y >= top) & (centre_y < top + self.roi_size))
+            boxes = boxes[inside].copy()
+            # Tile pixels -> frame pixels, one affine step per crop
+            np.clip(boxes[:, 0:4:2], left, left + self.roi_size, out=boxes[:, 0:4:2])
+            np.clip(boxes[:, 1:4:2], top, top + self.roi_size, out=boxes[:, 1:4:2])
+            boxes[:, :4] -= (left, top, left, top)
+            boxes[:, :4] *= scale
+            boxes[:, :4] += (x, y, x, y)
+            # Drop boxes cut off by a crop edge inside the frame; the tracked victim sits centred
+            # in its window, and anyone cut off is seen whole by their own window or a full pass
+            frame_height, frame_width = frames[index].shape[:2]
+            side, tolerance = self.roi_size * scale, 2 * scale
+            cut = (((boxes[:, 0] <= x + tolerance) & (x > 0)) |
+                   ((boxes[:, 1] <= y + tolerance) & (y > 0)) |
+                   ((boxes[:, 2] >= x + side - tolerance) & (x + side < frame_width)) |
+                   ((boxes[:, 3] >= y + side - tolerance) & (y + side < frame_height)))
+            crops.setdefault(index, []).append(boxes[~cut])
+        for index, parts in crops.items():
+            detections[index] = nms(np.concatenate(parts), self.iou)
+        return detections, modes, DetectionResults(frames, detections)
+
+    def stats(self):
+        frames = sum(self.counts.values())
+        return dict(self.counts, frames=frames, images=self.images, motion_triggers=self.motion_triggers,
+                    inference_rate=self.images / frames if frames else None)
+
+
+def make_scheduler(policy='always', predicted_boxes=None, **kwargs):
+    """InferenceScheduler for one of POLICIES, with any setting overridden by kwargs."""
+    if policy not in POLICIES:
+        raise ValueError(f"policy must be one of {tuple(POLICIES)}")
+    return InferenceScheduler(predicted_boxes, **dict(POLICIES[policy], **kwargs))
@@ -0,0 +1,217 @@
+import logging
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+# Quantiles reported for every histogram, over the samples still in its ring buffer
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Counter:
+    """Monotonic count, such as messages received or frames dropped."""
+
+    kind = 'counter'
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name, labels):
+        return [(name + '_total', labels, self.value)]
+
+
+class Gauge:
+    """Value that goes up and down, such as queue depth or readiness."""
+
+    kind = 'gauge'
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+
+class Span:
+    """Times a with block on the monotonic clock into a histogram."""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter() - self.start)
+
+
+class NullSpan:
+    """Span of a disabled registry."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Histogram:
+    """Durations (or any values) in a preallocated ring buffer.
+
+    record() is one slot write and two additions, so it stays well under a
+    microsecond; quantiles are only computed when the metrics are read, over
+    the last ``capacity`` samples. The count and sum cover every sample.
+    Each histogram is meant to be written by one thread; readers never block it.
+    """
+
+    kind = 'summary'
+
+    def __init__(self, registry, capacity=2048):
+        self.registry = registry
+        self.values = array('d', bytes(8 * capacity))
+        self.capacity = capacity
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value):
+        if self.registry.enabled:
+            self.values[self.count % self.capacity] = value
+            self.count += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager that records the duration of its block."""
+        return Span(self) if self.registry.enabled else NULL_SPAN
+
+    def window(self):
+        """Samples still in the ring buffer, as a zero-copy array (oldest first is not guaranteed)."""
+        return np.frombuffer(self.values, dtype=np.float64)[:min(self.count, self.capacity)]
+
+    def quantiles(self):
+        window = self.window()
+        if not len(window):
+            return dict.fromkeys(QUANTILES, float('nan'))
+        return dict(zip(QUANTILES, np.quantile(window, QUANTILES)))
+
+    def samples(self, name, labels):
+        samples = [(name, labels + (('quantile', str(q)),), value) for q, value in self.quantiles().items()]
+        samples.append((name + '_sum', labels, self.sum))
+        samples.append((name + '_count', labels, self.count))
+        return samples
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Registry:
+    """Named metrics of one process, rendered in the Prometheus text format.
+
+    Metrics are created once (typically in __init__ of the code they measure)
+    and then updated without any lookup or lock on the hot path. Setting
+    ``enabled`` to False turns spans and histogram records into no-ops.
+    """
+
+    def __init__(self, prefix='', enabled=True):
+        self.prefix = prefix
+        self.enabled = enabled
+        self.metrics = {}  # name -> (kind, help, {labels: metric})
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, *args):
+        name = self.prefix + name
+        labels = tuple(sorted(labels.items()))
+        with self._lock:
+            kind, _, series = self.metrics.setdefault(name, (cls.kind, help, {}))
+            if kind != cls.kind:
+                raise ValueError(f"Metric {name} is already a {kind}")
+            if labels not in series:
+                series[labels] = cls(*args)
+            return series[labels]
+
+    def counter(self, name, help='', **labels):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help='', **labels):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help='', capacity=2048, **labels):
+        return self._get(Histogram, name, help, labels, self, capacity)
+
+    def span(self, name, help='', **labels):
+        """Span into histogram name; for hot paths keep the histogram and call its time() instead."""
+        return self.histogram(name, help, **labels).time()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = [(name, kind, help, list(series.items())) for name, (kind, help, series) in self.metrics.items()]
+        lines = []
+        for name, kind, help, series in metrics:
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in series:
+                for sample_name, sample_labels, value in metric.samples(name, labels):
+                    lines.append(f"{sample_name}{format_labels(sample_labels)} {value:.9g}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registry of this process; modules create their metrics in it
+REGISTRY = Registry(prefix='drone_')
+
+
+class MetricsServer:
+    """Serves GET /metrics for Prometheus (or curl) from a background thread."""
+
+    def __init__(self, host='0.0.0.0', port=9100, registry=REGISTRY, extra=None):
+        self.registry = registry
+        self.extra = extra  # Optional callable returning more exposition text, e.g. relayed metrics
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = server.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the log
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='metrics_server', daemon=True)
+
+    def render(self):
+        text = self.registry.render()
+        return text + self.extra() if self.extra else text
+
+    def start(self):
+        self._thread.start()
+        logging.info(f"Metrics on http://{self.httpd.server_address[0]}:{self.httpd.server_address[1]}/metrics")
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+try:
+    from utils.instrumentation import REGISTRY
+except ImportError:  # Imported from the repository checkout, as yolo-model/ does
+    from instrumentation import REGISTRY
+
+
+class PhaseTimeout(Exception):
+    pass
+
+
+class VehicleEvents:
+    """Wakes waiting mission phases whenever the vehicle reports new state.
+
+    dronekit attribute listeners (and any MAVLink message listener that calls
+    notify()) wake wait_until(), which re-checks its condition straight away
+    instead of polling once a second.
+    """
+
+    ATTRIBUTES = ('armed', 'mode', 'ekf_ok', 'gps_0', 'system_status', 'location.global_relative_frame')
+
+    def __init__(self, vehicle=None):
+        self.condition = threading.Condition()
+        if vehicle is not None:
+            self.attach(vehicle)
+
+    def attach(self, vehicle):
+        """Start listening to a vehicle that connected after this was created."""
+        for name in self.ATTRIBUTES:
+            vehicle.add_attribute_listener(name, self._on_attribute)
+
+    def _on_attribute(self, vehicle, name, value):
+        self.notify()
+
+    def notify(self):
+        with self.condition:
+            self.condition.notify_all()
+
+    def wait_until(self, predicate, timeout, description):
+        """Block until predicate() is true; timeout None waits forever."""
+        with self.condition:
+            if timeout is not None:
+                timeout = max(0.0, timeout)
+            if not self.condition.wait_for(predicate, timeout):
+                raise PhaseTimeout(f"Timed out after {timeout:.1f}s waiting for {description}")
+
+
+class PhaseTimer:
+    """Records how long each mission phase took, in the order they ran.
+
+    With a FlightRecorder, every phase is also logged as an event at its start
+    time with its duration as the value.
+    """
+
+    def __init__(self, registry=REGISTRY, recorder=None):
+        self.durations = {}
+        self.registry = registry
+        self.recorder = recorder
+
+    @contextmanager
+    def phase(self, name):
+        logging.info(f"Phase '{name}' started")
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.durations[name] = time.monotonic() - start
+            # Per-delivery phases (transit_2, ...) share one series per kind of phase
+            kind = name.rstrip('0123456789').rstrip('_')
+            self.registry.histogram('mission_phase_seconds', 'Mission phase durations', phase=kind).record(
+                self.durations[name])
+            if self.recorder is not None:
+                self.recorder.record_event(name, value=self.durations[name], timestamp=start)
+            logging.info(f"Phase '{name}' took {self.durations[name]:.2f}s")
+
+    def summary(self):
+        summary = {name: round(duration, 3) for name, duration in self.durations.items()}
+        summary['total'] = round(sum(self.durations.values()), 3)
+        return summary
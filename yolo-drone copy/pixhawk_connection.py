@@ -1,56 +1,178 @@
-from pymavlink import mavutil
+import math
+import threading
 import time
 import logging
+try:
+    from utils.pose_history import PoseHistory
+    from utils.instrumentation import REGISTRY
+except ImportError:  # Imported from the repository checkout, as yolo-model/ does
+    from pose_history import PoseHistory
+    from instrumentation import REGISTRY
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
-class PixhawkConnection:
-    def __init__(self):
-        try:
-            # Connect to Pixhawk
-            self.connection = mavutil.mavlink_connection(
-                'udpin:0.0.0.0:14550',  # For UDP connection
-                baud=57600
-            )
-            
-            # Wait for the first heartbeat 
-            logging.info("Waiting for Pixhawk heartbeat...")
-            self.connection.wait_heartbeat()
-            logging.info("Heartbeat received!")
+# pymavlink, imported on first use: loading its message dialect takes seconds on the Xavier,
+# and only live links and tlog replay need it (synthetic and recorded telemetry run without)
+mavutil = None
+
 
-            # Request position data stream
-            self.request_data_stream()
+def import_mavutil():
+    global mavutil
+    if mavutil is None:
+        from pymavlink import mavutil as module
+        mavutil = module
+    return mavutil
+
+
+class PixhawkConnection:
+    def __init__(self, connection_string='udpin:0.0.0.0:14550', stream_rate_hz=10, max_age=2.0):
+        # Latest telemetry, each stored as one tuple ending in its time.monotonic()
+        # receive time. The reader thread replaces whole tuples, so reads need no lock.
+        self.position = None     # (latitude, longitude, relative_alt, heading, timestamp)
+        self.attitude = None     # (roll, pitch, yaw, timestamp) in radians
+        self.rangefinder = None  # (distance_m, timestamp)
+        self.stream_rate_hz = stream_rate_hz
+        self.max_age = max_age   # Seconds before cached telemetry counts as stale
+        self.pose_history = PoseHistory(capacity=512)  # ~50 s of poses at 10 Hz
+        self.recorder = None     # Optional FlightRecorder that logs every position fix
+        self.running = threading.Event()
+        self.reader_thread = None
+        self.connection = None
+        self.handlers = {
+            'GLOBAL_POSITION_INT': self.handle_position,
+            'ATTITUDE': self.handle_attitude,
+            'DISTANCE_SENSOR': self.handle_distance_sensor,
+            'RANGEFINDER': self.handle_rangefinder,
+        }
+        self.message_counts = {}  # MAVLink message type -> Counter
+        self.handle_time = REGISTRY.histogram('mavlink_handle_seconds', 'Handling one received MAVLink message')
+        self.stale_gps = REGISTRY.counter('stale_gps_reads', 'GPS reads that found no fresh position')
+        self.gps_stale = False  # Logged once per outage instead of on every read
 
+        try:
+            self.connect(connection_string)
         except Exception as e:
             logging.error(f"Failed to connect to Pixhawk: {e}")
             raise
 
-    def request_data_stream(self):
-        """Request GPS data stream from Pixhawk"""
-        self.connection.mav.request_data_stream_send(
-            self.connection.target_system,
-            self.connection.target_component,
-            mavutil.mavlink.MAV_DATA_STREAM_POSITION,
-            1,  # 1 Hz update rate
-            1   # 1 = start sending, 0 = stop sending
+    def connect(self, connection_string):
+        """Open the MAVLink link, wait for the autopilot and start reading; replay sources override this"""
+        self.connection = import_mavutil().mavlink_connection(
+            connection_string,  # 'udpin:0.0.0.0:14550' for UDP connection
+            baud=57600
         )
 
-    def get_gps_coordinates(self):
-        """Get current GPS coordinates from Pixhawk"""
-        try:
-            msg = self.connection.recv_match(
-                type='GLOBAL_POSITION_INT', 
-                blocking=True,
-                timeout=5
+        # Wait for the first heartbeat
+        logging.info("Waiting for Pixhawk heartbeat...")
+        self.connection.wait_heartbeat()
+        logging.info("Heartbeat received!")
+
+        # Request position data stream
+        self.request_data_stream()
+        self.start_reader()
+
+    def request_data_stream(self):
+        """Request position, attitude and rangefinder streams from Pixhawk"""
+        for stream in (mavutil.mavlink.MAV_DATA_STREAM_POSITION,   # GLOBAL_POSITION_INT
+                       mavutil.mavlink.MAV_DATA_STREAM_EXTRA1,     # ATTITUDE
+                       mavutil.mavlink.MAV_DATA_STREAM_EXTRA3):    # DISTANCE_SENSOR / RANGEFINDER
+            self.connection.mav.request_data_stream_send(
+                self.connection.target_system,
+                self.connection.target_component,
+                stream,
+                self.stream_rate_hz,  # Update rate in Hz
+                1   # 1 = start sending, 0 = stop sending
             )
-            if msg:
-                latitude = msg.lat / 1e7   # Convert from int32 to degrees
-                longitude = msg.lon / 1e7
-                altitude = msg.relative_alt / 1000  # Convert from millimeters to meters
-                return latitude, longitude, altitude
-            else:
-                logging.warning("No GPS data received")
-                return None
-        except Exception as e:
-            logging.error(f"Error getting GPS data: {e}")
-            return None
\ No newline at end of file
+
+    def start_reader(self):
+        self.running.set()
+        self.reader_thread = threading.Thread(target=self.reader_loop, name='mavlink_reader', daemon=True)
+        self.reader_thread.start()
+
+    def reader_loop(self):
+        """Drain every incoming MAVLink message into the latest-state cache"""
+        while self.running.is_set():
+            try:
+                msg = self.connection.recv_match(blocking=True, timeout=0.5)
+            except Exception as e:
+                logging.error(f"Error reading MAVLink: {e}")
+                time.sleep(0.1)
+                continue
+            if msg is None:
+                continue
+            msg_type = msg.get_type()
+            counter = self.message_counts.get(msg_type)
+            if counter is None:
+                counter = self.message_counts[msg_type] = REGISTRY.counter(
+                    'mavlink_messages', 'MAVLink messages received by type', type=msg_type)
+            counter.inc()
+            handler = self.handlers.get(msg_type)
+            if handler:
+                with self.handle_time.time():
+                    handler(msg, time.monotonic())
+
+    def handle_position(self, msg, timestamp):
+        heading = msg.hdg / 100 if msg.hdg != 65535 else None  # centidegrees, 65535 = unknown
+        if heading is None and self.is_fresh(self.attitude):
+            heading = math.degrees(self.attitude[2]) % 360
+        self.position = (
+            msg.lat / 1e7,   # Convert from int32 to degrees
+            msg.lon / 1e7,
+            msg.relative_alt / 1000,  # Convert from millimeters to meters
+            heading,
+            timestamp,
+        )
+        self.pose_history.append(timestamp, *self.position[:4])
+        if self.recorder is not None:
+            self.recorder.record_pose(timestamp, *self.position[:4])
+
+    def handle_attitude(self, msg, timestamp):
+        self.attitude = (msg.roll, msg.pitch, msg.yaw, timestamp)
+
+    def handle_distance_sensor(self, msg, timestamp):
+        self.rangefinder = (msg.current_distance / 100.0, timestamp)  # Convert cm to meters
+
+    def handle_rangefinder(self, msg, timestamp):
+        self.rangefinder = (msg.distance, timestamp)
+
+    def is_fresh(self, sample, max_age=None):
+        if sample is None:
+            return False
+        limit = self.max_age if max_age is None else max_age
+        return time.monotonic() - sample[-1] <= limit
+
+    def get_gps_coordinates(self, max_age=None):
+        """Get the latest cached GPS coordinates without blocking"""
+        position = self.position
+        if not self.is_fresh(position, max_age):
+            self.stale_gps.inc()
+            if not self.gps_stale:
+                logging.warning("No fresh GPS data received")
+                self.gps_stale = True
+            return None
+        if self.gps_stale:
+            logging.info(f"GPS data fresh again after {self.stale_gps.value} stale reads in total")
+            self.gps_stale = False
+        latitude, longitude, altitude = position[:3]
+        return latitude, longitude, altitude
+
+    def get_pose_at(self, timestamp):
+        """Interpolated (latitude, longitude, altitude, heading) at a time.monotonic() timestamp"""
+        return self.pose_history.pose_at(timestamp)
+
+    def get_attitude(self, max_age=None):
+        """Latest (roll, pitch, yaw) in radians, or None if stale"""
+        attitude = self.attitude
+        return attitude[:3] if self.is_fresh(attitude, max_age) else None
+
+    def get_rangefinder_distance(self, max_age=None):
+        """Latest rangefinder distance in meters, or None if stale"""
+        rangefinder = self.rangefinder
+        return rangefinder[0] if self.is_fresh(rangefinder, max_age) else None
+
+    def close(self):
+        self.running.clear()
+        if self.reader_thread is not None:
+            self.reader_thread.join(timeout=2)
+        if self.connection is not None:
+            self.connection.close()
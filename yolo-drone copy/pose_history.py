@@ -0,0 +1,81 @@
+import math
+import threading
+
+
+class PoseHistory:
+    """Ring buffer of timestamped drone poses with interpolated lookup.
+
+    Poses are appended in time.monotonic() order by the MAVLink reader, so the
+    buffer stays sorted and a lookup is a binary search over the ring.
+    """
+
+    def __init__(self, capacity=512, max_extrapolation=0.5):
+        self.capacity = capacity
+        self.max_extrapolation = max_extrapolation  # Seconds a pose may be held past the newest sample
+        self._times = [0.0] * capacity
+        self._poses = [None] * capacity  # (latitude, longitude, altitude, heading)
+        self._start = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, latitude, longitude, altitude, heading=None):
+        """Add a pose; samples older than the newest one are ignored."""
+        with self._lock:
+            if self._count and timestamp <= self._times[(self._start + self._count - 1) % self.capacity]:
+                return
+            index = (self._start + self._count) % self.capacity
+            if self._count == self.capacity:
+                self._start = (self._start + 1) % self.capacity
+            else:
+                self._count += 1
+            self._times[index] = timestamp
+            self._poses[index] = (latitude, longitude, altitude, heading)
+
+    def _bisect(self, timestamp):
+        """Logical index of the first sample at or after timestamp."""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._times[(self._start + mid) % self.capacity] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def pose_at(self, timestamp):
+        """
+        Interpolate the pose at a time.monotonic() timestamp.
+
+        Returns:
+            (float, float, float, float or None): latitude, longitude, altitude and heading
+            in degrees, or None if the timestamp is outside the buffered history.
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            i = self._bisect(timestamp)
+            if i == self._count:
+                newest = (self._start + self._count - 1) % self.capacity
+                if timestamp - self._times[newest] > self.max_extrapolation:
+                    return None
+                return self._poses[newest]
+            after = (self._start + i) % self.capacity
+            if i == 0:
+                return self._poses[after] if self._times[after] == timestamp else None
+            before = (self._start + i - 1) % self.capacity
+            t0, t1 = self._times[before], self._times[after]
+            p0, p1 = self._poses[before], self._poses[after]
+
+        fraction = (timestamp - t0) / (t1 - t0)
+        latitude = p0[0] + (p1[0] - p0[0]) * fraction
+        longitude = p0[1] + (p1[1] - p0[1]) * fraction
+        altitude = p0[2] + (p1[2] - p0[2]) * fraction
+        heading = None
+        if p0[3] is not None and p1[3] is not None:
+            # Interpolate along the shorter arc so 359 -> 1 passes through 0
+            delta = (p1[3] - p0[3] + 180) % 360 - 180
+            heading = math.fmod(p0[3] + delta * fraction + 360, 360)
+        return latitude, longitude, altitude, heading
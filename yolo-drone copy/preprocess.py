@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+
+
+class Letterbox:
+    """Letterboxes frames straight into a reused model-layout input buffer.
+
+    Each batch slot has a uint8 canvas that cv2.resize writes into in place;
+    its grey padding is only repainted when the frame size changes. The
+    canvas is then converted BGR HWC -> RGB CHW and scaled to [0, 1] directly
+    into ``buffer`` (pinned host memory with ``pin_memory`` when torch and a
+    GPU are available), so steady-state frames allocate no frame-sized arrays.
+    """
+
+    def __init__(self, input_size=640, batch_size=1, dtype=np.float32, pad_value=114, pin_memory=False):
+        self.input_size = input_size
+        self.batch_size = batch_size
+        self.pad_value = pad_value
+        shape = (batch_size, 3, input_size, input_size)
+        self.tensor = None  # torch view of buffer when pinned
+        if pin_memory:
+            try:
+                import torch
+                torch_dtype = torch.float16 if dtype == np.float16 else torch.float32
+                self.tensor = torch.empty(shape, dtype=torch_dtype).pin_memory()
+            except (ImportError, RuntimeError):  # No torch, or no CUDA to pin for
+                self.tensor = None
+        self.buffer = self.tensor.numpy() if self.tensor is not None else np.empty(shape, dtype=dtype)
+        self.canvas = np.full((batch_size, input_size, input_size, 3), pad_value, dtype=np.uint8)
+        self.scales = np.ones(batch_size)
+        self.pads = np.zeros((batch_size, 2))
+        self.offsets = np.zeros((batch_size, 4))  # Padding as x, y, x, y, subtracted from xyxy boxes
+        self._layouts = [None] * batch_size  # (frame_height, frame_width, new_w, new_h, left, top) per slot
+
+    def _layout(self, index, frame_height, frame_width):
+        layout = self._layouts[index]
+        if layout is not None and layout[:2] == (frame_height, frame_width):
+            return layout
+        scale = min(self.input_size / frame_height, self.input_size / frame_width)
+        new_w, new_h = int(round(frame_width * scale)), int(round(frame_height * scale))
+        left, top = (self.input_size - new_w) // 2, (self.input_size - new_h) // 2
+        self.canvas[index].fill(self.pad_value)
+        self.scales[index] = scale
+        self.pads[index] = left, top
+        self.offsets[index] = left, top, left, top
+        layout = self._layouts[index] = (frame_height, frame_width, new_w, new_h, left, top)
+        return layout
+
+    def put(self, index, frame):
+        """Letterbox one BGR frame into batch slot index."""
+        _, _, new_w, new_h, left, top = self._layout(index, *frame.shape[:2])
+        canvas = self.canvas[index]
+        cv2.resize(frame, (new_w, new_h), dst=canvas[top:top + new_h, left:left + new_w],
+                   interpolation=cv2.INTER_LINEAR)
+        np.multiply(canvas.transpose(2, 0, 1)[::-1], 1 / 255, out=self.buffer[index], casting='unsafe')
+
+    def fill(self, frames):
+        """Letterbox up to batch_size frames; returns the filled part of the buffer."""
+        for index, frame in enumerate(frames):
+            self.put(index, frame)
+        return self.buffer[:len(frames)]
+
+    def unscale(self, detections, index, frame_shape):
+        """Map (N, >=4) xyxy boxes from model input to frame pixels, in place, in one affine step."""
+        boxes = detections[:, :4]
+        boxes -= self.offsets[index]
+        boxes /= self.scales[index]
+        height, width = frame_shape[:2]
+        np.clip(boxes[:, 0::2], 0, width, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, height, out=boxes[:, 1::2])
+        return detections
@@ -0,0 +1,115 @@
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:  # JSON is used when msgpack is not installed
+    msgpack = None
+
+# Message types
+DETECTIONS = 1  # Boxes of one frame: camera_id, seq, frame_width, frame_height, boxes, track_ids
+TRACKS = 2      # Confirmed tracks with smoothed geolocation and victim_id; new victims are flagged as alarms
+HEARTBEAT = 3
+ACK = 4         # Acknowledges an alarm by track_id and victim_id
+METRICS = 5     # Prometheus text exposition of the sender's metrics, relayed to the Backend's /metrics
+
+# Payload codecs, recorded per message so both ends need not share the same install
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+
+# Frame header: message type, codec, payload length
+HEADER = struct.Struct('!BBI')
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_message(msg_type, payload):
+    """Serialize one framed message."""
+    if msgpack is not None:
+        codec, body = CODEC_MSGPACK, msgpack.packb(payload, use_bin_type=True)
+    else:
+        codec, body = CODEC_JSON, json.dumps(payload, separators=(',', ':')).encode()
+    return HEADER.pack(msg_type, codec, len(body)) + body
+
+
+def decode_payload(codec, body):
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ProtocolError("Received msgpack payload but msgpack is not installed")
+        return msgpack.unpackb(body, raw=False)
+    if codec == CODEC_JSON:
+        return json.loads(bytes(body))
+    raise ProtocolError(f"Unknown codec {codec}")
+
+
+class MessageReader:
+    """Incremental decoder over a reusable receive buffer.
+
+    Handles partial reads and several messages arriving in one read; the
+    buffer only grows if a single message is larger than its capacity.
+    """
+
+    def __init__(self, capacity=64 * 1024):
+        self._buffer = bytearray(capacity)
+        self._start = 0
+        self._end = 0
+
+    def recv_from(self, sock):
+        """Read what the socket has available and return the complete messages.
+
+        Raises ConnectionError when the peer has closed the connection.
+        """
+        if self._end == len(self._buffer):
+            self._compact()
+        with memoryview(self._buffer) as view:
+            received = sock.recv_into(view[self._end:])
+        if received == 0:
+            raise ConnectionError("Connection closed by peer")
+        self._end += received
+        return self._parse()
+
+    def feed(self, data):
+        """Append raw bytes and return the complete messages."""
+        if self._end + len(data) > len(self._buffer):
+            self._compact()
+            self._grow(self._end + len(data))
+        self._buffer[self._end:self._end + len(data)] = data
+        self._end += len(data)
+        return self._parse()
+
+    def _grow(self, size):
+        while len(self._buffer) < size:
+            self._buffer.extend(bytes(len(self._buffer)))
+
+    def _compact(self):
+        """Move unread bytes to the front, growing the buffer if it is entirely unread."""
+        remaining = self._end - self._start
+        if self._start:
+            self._buffer[:remaining] = self._buffer[self._start:self._end]
+            self._start, self._end = 0, remaining
+        if remaining == len(self._buffer):
+            self._grow(remaining * 2)
+
+    def _parse(self):
+        messages = []
+        while self._end - self._start >= HEADER.size:
+            msg_type, codec, length = HEADER.unpack_from(self._buffer, self._start)
+            if length > MAX_PAYLOAD:
+                raise ProtocolError(f"Payload of {length} bytes exceeds limit")
+            body_start = self._start + HEADER.size
+            if self._end - body_start < length:
+                # Make sure the rest of this message will fit
+                if self._start + HEADER.size + length > len(self._buffer):
+                    self._compact()
+                    self._grow(HEADER.size + length)
+                break
+            with memoryview(self._buffer) as view:
+                payload = decode_payload(codec, view[body_start:body_start + length])
+            messages.append((msg_type, payload))
+            self._start = body_start + length
+        if self._start == self._end:
+            self._start = self._end = 0
+        return messages
@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+import cv2
+import numpy as np
+
+
+class ReplayClock:
+    """Media time shared by the replayed frame and telemetry sources.
+
+    In real time, media time follows the wall clock from the first frame. At
+    max speed it is whatever the frame sources last reached, so replayed
+    telemetry keeps step with the frames however fast they are consumed.
+    """
+
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self._start = None  # time.monotonic() at media time 0
+        self._media_time = 0.0
+        self._cond = threading.Condition()
+
+    def now(self):
+        with self._cond:
+            if self.realtime:
+                return time.monotonic() - self._start if self._start is not None else 0.0
+            return self._media_time
+
+    def tick(self, media_time):
+        """Called by a frame source before it hands out the frame at media_time."""
+        if self.realtime:
+            self.wait_until(media_time)
+            return
+        with self._cond:
+            if media_time > self._media_time:
+                self._media_time = media_time
+                self._cond.notify_all()
+
+    def wait_until(self, media_time, running=None):
+        """Block until media_time is reached; returns False if running was cleared first."""
+        with self._cond:
+            if self.realtime:
+                if self._start is None:
+                    self._start = time.monotonic()
+                due = self._start + media_time
+            while running is None or running.is_set():
+                if self.realtime:
+                    remaining = due - time.monotonic()
+                    if remaining <= 0:
+                        return True
+                    self._cond.wait(min(remaining, 0.5))
+                elif self._media_time >= media_time:
+                    return True
+                else:
+                    self._cond.wait(0.5)
+            return False
+
+
+class VideoFileSource:
+    """A recorded video read like a camera (cv2.VideoCapture interface).
+
+    Frames come out at the file's frame rate on a real-time clock, or as fast
+    as they are read at max speed. ``finished`` is set at the end of the file.
+    """
+
+    def __init__(self, path, clock=None, loop=False):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.clock = clock or ReplayClock()
+        self.loop = loop
+        self.index = 0
+        self.finished = False
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop and self.index:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if not ret:
+            self.finished = True
+            return False, None
+        self.clock.tick(self.index / self.fps)
+        self.index += 1
+        return True, frame
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return False  # Driver buffering only applies to live cameras
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticFrameSource:
+    """Generated frames of a few small people drifting over a textured background.
+
+    Needs no camera or recording, so the whole pipeline can be exercised and
+    timed on a bench. ``boxes`` holds the xyxy ground truth of the last frame.
+    """
+
+    def __init__(self, width=1280, height=720, fps=30.0, victims=3, frames=None, clock=None, seed=0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames = frames  # Stop after this many frames, None for endless
+        self.clock = clock or ReplayClock()
+        rng = np.random.default_rng(seed)
+        noise = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+        self.background = cv2.GaussianBlur(cv2.resize(noise, (width, height)), (0, 0), 3) // 3 + 40
+        self.size = np.array([20, 30]) * max(1, width // 1280)
+        self.position = rng.uniform(0, 1, (victims, 2)) * (np.array([width, height]) - self.size)
+        self.velocity = rng.uniform(-2, 2, (victims, 2))  # Pixels per frame
+        self.boxes = np.empty((0, 4))
+        self.index = 0
+        self.finished = False
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.frames is not None and self.index >= self.frames:
+            self.finished = True
+            return False, None
+        limit = np.array([self.width, self.height]) - self.size
+        self.position += self.velocity
+        bounced = (self.position < 0) | (self.position > limit)
+        self.velocity[bounced] *= -1
+        np.clip(self.position, 0, limit, out=self.position)
+
+        frame = self.background.copy()
+        self.boxes = np.hstack([self.position, self.position + self.size])
+        for x1, y1, x2, y2 in self.boxes.astype(int):
+            frame[y1:y2, x1:x2] = (60, 120, 240)
+        self.clock.tick(self.index / self.fps)
+        self.index += 1
+        return True, frame
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FPS: self.fps, cv2.CAP_PROP_FRAME_WIDTH: self.width,
+                cv2.CAP_PROP_FRAME_HEIGHT: self.height}.get(prop, 0.0)
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.finished = True
+
+
+def open_frame_source(spec, clock=None):
+    """
+    Open a frame source from a command-line style spec.
+
+    Args:
+        spec (int or str): A camera index ('0'), 'synthetic' or 'synthetic:WIDTHxHEIGHT@FPS',
+            a video file, or anything else cv2.VideoCapture opens (stream URLs, device paths).
+        clock (ReplayClock): Shared clock for replayed sources; real time by default.
+
+    Returns:
+        An object with the cv2.VideoCapture read/isOpened/get/set/release interface.
+    """
+    spec = str(spec)
+    if spec.isdigit():
+        return cv2.VideoCapture(int(spec))
+    if spec == 'synthetic' or spec.startswith('synthetic:'):
+        size, _, fps = spec.partition(':')[2].partition('@')
+        width, _, height = size.partition('x')
+        return SyntheticFrameSource(int(width or 1280), int(height or 720), float(fps or 30), clock=clock)
+    if os.path.isfile(spec):
+        return VideoFileSource(spec, clock)
+    return cv2.VideoCapture(spec)
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+try:
+    from utils.instrumentation import REGISTRY
+except ImportError:  # Imported from the repository checkout, as yolo-model/ does
+    from instrumentation import REGISTRY
+
+STARTING, READY, FAILED = 'starting', 'ready', 'failed'
+
+
+class Component:
+    """One component being initialized on its own thread."""
+
+    def __init__(self, name, registry, init, on_ready, retry_interval, max_retry_interval):
+        self.name = name
+        self.init = init
+        self.on_ready = on_ready
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.state = STARTING
+        self.result = None
+        self.error = None
+        self.seconds = None  # Time from Startup creation to ready
+        self.attempts = 0
+        self.done = threading.Event()
+        self.ready_gauge = registry.gauge('component_ready', 'Whether a startup component is ready (1) or not',
+                                          component=name)
+        self.seconds_gauge = registry.gauge('component_startup_seconds', 'Seconds until a component was ready',
+                                            component=name)
+
+
+class Startup:
+    """Initializes independent components concurrently and reports readiness per component.
+
+    Each start() runs its init function on a daemon thread, so slow ones (a
+    model load, a camera, an autopilot heartbeat) overlap instead of adding
+    up. Callers wait() only for what they need; the rest report readiness
+    through ``on_ready`` when they get there. A component that is lost later
+    (a dropped link) is restart()ed and counts as not ready until it is back.
+    Readiness is exported as component_ready / component_startup_seconds gauges.
+    """
+
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+        self.components = {}
+        self.start_time = time.monotonic()
+        self.stopped = threading.Event()
+
+    def start(self, name, init, on_ready=None, retry_interval=None, max_retry_interval=30.0):
+        """
+        Run init() in the background as component name.
+
+        Args:
+            init (callable): Builds and returns the component; may block.
+            on_ready (callable): Called with the result on the init thread once it is ready,
+                before wait() returns it.
+            retry_interval (float): Seconds before the first retry after a failure, doubling up to
+                max_retry_interval; None fails on the first error.
+        """
+        component = self.components[name] = Component(name, self.registry, init, on_ready, retry_interval,
+                                                      max_retry_interval)
+        self._launch(component)
+        return component
+
+    def restart(self, name):
+        """Mark a lost component not ready and initialize it again in the background."""
+        component = self.components[name]
+        if component.state == STARTING:
+            return  # Already (re)starting
+        component.state = STARTING
+        component.result = None
+        component.attempts = 0
+        component.done.clear()
+        component.ready_gauge.set(0)
+        logging.warning(f"{name} lost, restarting")
+        self._launch(component)
+
+    def _launch(self, component):
+        thread = threading.Thread(target=self._run, args=(component,), name=f"startup_{component.name}",
+                                  daemon=True)
+        thread.start()
+
+    def _run(self, component):
+        delay = component.retry_interval
+        while not self.stopped.is_set():
+            component.attempts += 1
+            try:
+                result = component.init()
+            except Exception as e:
+                component.error = e
+                if delay is None:
+                    component.state = FAILED
+                    logging.error(f"Startup of {component.name} failed: {e}")
+                    component.done.set()
+                    return
+                if component.attempts == 1:
+                    logging.warning(f"Startup of {component.name} failed, retrying: {e}")
+                self.stopped.wait(delay)
+                delay = min(delay * 2, component.max_retry_interval)
+                continue
+            if self.stopped.is_set():
+                # Shut down while this was starting; nobody will close it
+                if hasattr(result, 'close'):
+                    result.close()
+                break
+            component.result = result
+            component.error = None
+            component.seconds = time.monotonic() - self.start_time
+            component.seconds_gauge.set(component.seconds)
+            component.state = READY  # Before on_ready, so a restart() from what it starts is not ignored
+            component.ready_gauge.set(1)
+            logging.info(f"{component.name} ready after {component.seconds:.2f}s")
+            if component.on_ready is not None:
+                component.on_ready(result)
+            break
+        component.done.set()
+
+    def wait(self, name, timeout=None):
+        """Block until component name is ready and return it; raises its init error if it failed."""
+        component = self.components[name]
+        if not component.done.wait(timeout):
+            raise TimeoutError(f"{name} not ready after {timeout}s")
+        if component.state != READY:
+            raise component.error or RuntimeError(f"Startup of {name} was stopped")
+        return component.result
+
+    def ready(self, name):
+        return self.components[name].state == READY
+
+    def status(self):
+        """State and seconds to ready of every component, e.g. for heartbeats and stats."""
+        return {name: {'state': component.state, 'seconds': component.seconds}
+                for name, component in self.components.items()}
+
+    def stop(self):
+        """Stop retrying; components that become ready afterwards are closed."""
+        self.stopped.set()
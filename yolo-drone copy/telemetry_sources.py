@@ -0,0 +1,146 @@
+import logging
+import math
+import os
+import threading
+import time
+from types import SimpleNamespace
+try:
+    from utils.pixhawk_connection import PixhawkConnection, import_mavutil
+    from utils.geodesy import destination
+    from utils.sources import ReplayClock
+    from utils.flight_recorder import load_flight
+except ImportError:  # Imported from the repository checkout, as yolo-model/ does
+    from pixhawk_connection import PixhawkConnection, import_mavutil
+    from geodesy import destination
+    from sources import ReplayClock
+    from flight_recorder import load_flight
+
+
+class TlogTelemetry(PixhawkConnection):
+    """Replays a recorded MAVLink telemetry log (.tlog) through PixhawkConnection's handlers.
+
+    Messages are released on a ReplayClock, so a shared clock keeps them in
+    step with a replayed video. ``start_offset`` is how many seconds into the
+    log the video starts; ``finished`` is set at the end of the log.
+    """
+
+    def __init__(self, path, clock=None, start_offset=0.0, max_age=2.0):
+        self.clock = clock or ReplayClock()
+        self.start_offset = start_offset
+        self.finished = threading.Event()
+        super().__init__(path, max_age=max_age)
+
+    def connect(self, path):
+        self.connection = import_mavutil().mavlink_connection(path)
+        self.start_reader()
+
+    def reader_loop(self):
+        first = None
+        count = 0
+        while self.running.is_set():
+            msg = self.connection.recv_match(type=list(self.handlers))
+            if msg is None:
+                break
+            first = msg._timestamp if first is None else first
+            if not self.clock.wait_until(msg._timestamp - first - self.start_offset, self.running):
+                break
+            self.handlers[msg.get_type()](msg, time.monotonic())
+            count += 1
+        self.finished.set()
+        logging.info(f"Telemetry replay finished after {count} messages")
+
+
+class SyntheticTelemetry(PixhawkConnection):
+    """Generated telemetry of a straight, level flight, for benches without a log or autopilot.
+
+    Messages are built with MAVLink's field names and units and go through
+    the same handlers as a live link, at ``rate_hz`` of media time.
+    """
+
+    def __init__(self, latitude, longitude, altitude=30.0, speed=5.0, heading=0.0, rate_hz=10, clock=None,
+                 max_age=2.0):
+        self.origin = (latitude, longitude)
+        self.altitude = altitude  # Meters above home
+        self.speed = speed        # Meters per second
+        self.heading = heading    # Degrees from north
+        self.rate_hz = rate_hz
+        self.clock = clock or ReplayClock()
+        self.finished = threading.Event()
+        super().__init__(None, stream_rate_hz=rate_hz, max_age=max_age)
+
+    def connect(self, connection_string):
+        self.start_reader()
+
+    def reader_loop(self):
+        step = 0
+        yaw = math.radians(self.heading)
+        while self.clock.wait_until(step / self.rate_hz, self.running):
+            latitude, longitude = destination(*self.origin, self.speed * step / self.rate_hz, self.heading)
+            timestamp = time.monotonic()
+            self.handle_attitude(SimpleNamespace(roll=0.0, pitch=0.0, yaw=yaw), timestamp)
+            self.handle_position(SimpleNamespace(lat=int(latitude * 1e7), lon=int(longitude * 1e7),
+                                                 relative_alt=int(self.altitude * 1000),
+                                                 hdg=int(self.heading * 100) % 36000), timestamp)
+            self.handle_distance_sensor(SimpleNamespace(current_distance=int(self.altitude * 100)), timestamp)
+            step += 1
+        self.finished.set()
+
+
+class RecordedTelemetry(PixhawkConnection):
+    """Replays the poses of a flight recorded by FlightRecorder.
+
+    Poses are already converted, so they go straight into the position cache
+    and pose history rather than through the MAVLink handlers. The pose
+    records stay memory-mapped; ``finished`` is set after the last one.
+    """
+
+    def __init__(self, directory, clock=None, start_offset=0.0, max_age=2.0):
+        self.clock = clock or ReplayClock()
+        self.start_offset = start_offset
+        self.finished = threading.Event()
+        super().__init__(directory, max_age=max_age)
+
+    def connect(self, directory):
+        self.poses = load_flight(directory)['poses']
+        self.start_reader()
+
+    def reader_loop(self):
+        times = self.poses['time']
+        count = 0
+        for index in range(len(self.poses)):
+            if not self.clock.wait_until(times[index] - times[0] - self.start_offset, self.running):
+                break
+            _, latitude, longitude, altitude, heading = self.poses[index].tolist()
+            timestamp = time.monotonic()
+            self.position = (latitude, longitude, altitude, None if math.isnan(heading) else heading, timestamp)
+            self.pose_history.append(timestamp, *self.position[:4])
+            count += 1
+        self.finished.set()
+        logging.info(f"Telemetry replay finished after {count} poses")
+
+
+def open_telemetry(spec=None, clock=None, max_age=2.0):
+    """
+    Open a telemetry source from a command-line style spec.
+
+    Args:
+        spec (str): None for the live Pixhawk link, a .tlog file or a FlightRecorder directory to replay,
+            'synthetic:LAT,LON[,ALT[,SPEED[,HEADING]]]' for a generated flight,
+            or any other pymavlink connection string.
+        clock (ReplayClock): Shared clock for replayed sources; real time by default.
+
+    Returns:
+        A PixhawkConnection (or replay subclass) with the same getters.
+    """
+    if spec is None:
+        return PixhawkConnection(stream_rate_hz=10, max_age=max_age)
+    if spec.startswith('synthetic'):
+        values = [float(v) for v in spec.partition(':')[2].split(',') if v]
+        if len(values) < 2:
+            raise ValueError("synthetic telemetry needs at least synthetic:LAT,LON")
+        return SyntheticTelemetry(*values[:5], clock=clock, max_age=max_age)
+    if spec.endswith('.tlog'):
+        return TlogTelemetry(spec, clock, max_age=max_age)
+    if os.path.isdir(spec):
+        return RecordedTelemetry(spec, clock, max_age=max_age)
+    return PixhawkConnection(spec, stream_rate_hz=10, max_age=max_age)
@@ -0,0 +1,191 @@
+import numpy as np
+
+# Constant-velocity model over [center_x, center_y, width, height, vx, vy], one step per frame
+F = np.eye(6)
+F[0, 4] = F[1, 5] = 1.0
+H = np.eye(4, 6)
+Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.1, 0.1])
+R = np.diag([10.0, 10.0, 10.0, 10.0])
+P0 = np.diag([10.0, 10.0, 10.0, 10.0, 1000.0, 1000.0])
+
+
+def xyxy_to_state(boxes):
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2,
+                     boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1)
+
+
+def state_to_xyxy(state):
+    half_w, half_h = state[:, 2] / 2, state[:, 3] / 2
+    return np.stack([state[:, 0] - half_w, state[:, 1] - half_h,
+                     state[:, 0] + half_w, state[:, 1] + half_h], axis=1)
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (T, 4) and (N, 4) xyxy boxes."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def greedy_match(iou, threshold):
+    """Match rows to columns by descending IoU; returns (rows, cols) index arrays."""
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind='stable')
+    used_rows, used_cols, matches = set(), set(), []
+    for k in order:
+        r, c = rows[k], cols[k]
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            matches.append((r, c))
+    if not matches:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    matched = np.array(matches, dtype=np.intp)
+    return matched[:, 0], matched[:, 1]
+
+
+class Tracker:
+    """IoU + Kalman multi-object tracker, vectorized over all tracks and boxes.
+
+    Each track keeps an exponentially smoothed geolocation and raises exactly
+    one alarm, the first time it has been seen ``min_hits`` times.
+    """
+
+    def __init__(self, iou_threshold=0.3, min_hits=3, max_missed=10, smoothing=0.3, max_tracks=256):
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_missed = max_missed  # Frames a track may go unmatched before it is dropped
+        self.smoothing = smoothing    # Weight of the newest geolocation in the running average
+        self.max_tracks = max_tracks
+        self.next_id = 1
+        self.ids = np.empty(0, dtype=np.int64)
+        self.state = np.empty((0, 6))
+        self.covariance = np.empty((0, 6, 6))
+        self.hits = np.empty(0, dtype=np.int64)
+        self.missed = np.empty(0, dtype=np.int64)
+        self.confidence = np.empty(0)
+        self.location = np.empty((0, 3))  # Smoothed latitude, longitude, distance (NaN until located)
+        self.alarmed = np.empty(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def predicted_boxes(self):
+        """Current xyxy box estimate of every live track."""
+        return state_to_xyxy(self.state)
+
+    def coast(self):
+        """
+        Advance all tracks by one frame that the detector skipped.
+
+        Tracks move on their motion model without counting as missed, so a
+        scheduler can skip frames without tracks dying or losing step.
+
+        Returns:
+            tuple: (T, 6) predicted detections with each track's last confidence, and their track ids.
+        """
+        self._predict()
+        detections = np.zeros((len(self), 6))
+        detections[:, :4] = self.predicted_boxes()
+        detections[:, 4] = self.confidence
+        return detections, self.ids.copy()
+
+    def _predict(self):
+        self.state = self.state @ F.T
+        self.covariance = F @ self.covariance @ F.T + Q
+
+    def _correct(self, index, measurements):
+        x = self.state[index]
+        p = self.covariance[index]
+        innovation = measurements - x[:, :4]
+        gain = p[:, :, :4] @ np.linalg.inv(p[:, :4, :4] + R)
+        self.state[index] = x + (gain @ innovation[:, :, None])[:, :, 0]
+        self.covariance[index] = (np.eye(6) - gain @ H) @ p
+
+    def update(self, detections, locations=None):
+        """
+        Advance all tracks by one frame.
+
+        Args:
+            detections (array): (N, 6) boxes as in results.xyxy[0].
+            locations (array): Optional (N, 5) output of Geolocator.locate for the same boxes.
+
+        Returns:
+            array: (N,) track id per detection, -1 where no track could be assigned.
+        """
+        boxes = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+        track_ids = np.full(len(boxes), -1, dtype=np.int64)
+        self._predict()
+
+        rows, cols = greedy_match(iou_matrix(self.predicted_boxes(), boxes[:, :4]), self.iou_threshold)
+        if len(rows):
+            self._correct(rows, xyxy_to_state(boxes[cols, :4]))
+        self.hits[rows] += 1
+        self.missed += 1
+        self.missed[rows] = 0
+        self.confidence[rows] = boxes[cols, 4]
+        track_ids[cols] = self.ids[rows]
+
+        # Start tracks for unmatched boxes, up to the track budget
+        unmatched = np.setdiff1d(np.arange(len(boxes)), cols)[:max(0, self.max_tracks - len(self))]
+        if len(unmatched):
+            new_ids = np.arange(self.next_id, self.next_id + len(unmatched))
+            self.next_id += len(unmatched)
+            state = np.zeros((len(unmatched), 6))
+            state[:, :4] = xyxy_to_state(boxes[unmatched, :4])
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.state = np.concatenate([self.state, state])
+            self.covariance = np.concatenate([self.covariance, np.broadcast_to(P0, (len(unmatched), 6, 6))])
+            self.hits = np.concatenate([self.hits, np.ones(len(unmatched), dtype=np.int64)])
+            self.missed = np.concatenate([self.missed, np.zeros(len(unmatched), dtype=np.int64)])
+            self.confidence = np.concatenate([self.confidence, boxes[unmatched, 4]])
+            self.location = np.concatenate([self.location, np.full((len(unmatched), 3), np.nan)])
+            self.alarmed = np.concatenate([self.alarmed, np.zeros(len(unmatched), dtype=bool)])
+            track_ids[unmatched] = new_ids
+
+        if locations is not None and len(boxes):
+            self._smooth_locations(track_ids, np.asarray(locations)[:, :3])
+
+        keep = self.missed <= self.max_missed
+        if not keep.all():
+            for name in ('ids', 'state', 'covariance', 'hits', 'missed', 'confidence', 'location', 'alarmed'):
+                setattr(self, name, getattr(self, name)[keep])
+        return track_ids
+
+    def _smooth_locations(self, track_ids, locations):
+        assigned = track_ids >= 0
+        index = np.searchsorted(self.ids, track_ids[assigned])  # ids are kept in ascending order
+        current = self.location[index]
+        fresh = np.isnan(current[:, 0])
+        current[fresh] = locations[assigned][fresh]
+        current[~fresh] += self.smoothing * (locations[assigned][~fresh] - current[~fresh])
+        self.location[index] = current
+
+    def pop_alarms(self):
+        """Confirmed, located tracks that have not raised an alarm yet; marks them alarmed."""
+        ready = (self.hits >= self.min_hits) & ~self.alarmed & ~np.isnan(self.location[:, 0])
+        self.alarmed |= ready
+        return self._describe(ready)
+
+    def confirmed_tracks(self):
+        """Every track that has already raised its alarm and is still alive."""
+        return self._describe(self.alarmed)
+
+    def _describe(self, mask):
+        return [
+            {
+                'track_id': int(track_id),
+                'latitude': float(location[0]),
+                'longitude': float(location[1]),
+                'distance': float(location[2]),
+                'confidence': float(confidence),
+                'hits': int(hits),
+            }
+            for track_id, location, confidence, hits in zip(
+                self.ids[mask], self.location[mask], self.confidence[mask], self.hits[mask])
+        ]
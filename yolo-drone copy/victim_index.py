@@ -0,0 +1,220 @@
+import math
+import threading
+import time
+import numpy as np
+try:
+    from utils.geodesy import LocalFrame
+    from utils.coverage_planner import parse_rectangle
+except ImportError:  # Imported from the repository checkout, as Backend/ does
+    from geodesy import LocalFrame
+    from coverage_planner import parse_rectangle
+
+
+class VictimIndex:
+    """In-memory grid index of reported victims in a local ENU frame.
+
+    Positions are bucketed into square cells of ``cell_size`` meters, so an
+    insert only compares against the victims in the 3x3 cells around it and
+    merges with the nearest one within ``merge_radius``. Nearest-k searches
+    grow ring by ring from the query cell, falling back to one vectorized
+    pass once that would cost less than walking further rings. Rectangle
+    queries are always a vectorized pass, which is cheaper than walking
+    cells for the large areas the dashboard selects.
+
+    upsert() keeps victims under ids assigned elsewhere (the detection
+    server's), replacing their position on every report instead of merging.
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, merge_radius=5.0, cell_size=None, origin=None, capacity=1024):
+        self.merge_radius = merge_radius
+        self.cell_size = cell_size or merge_radius
+        self._merge_rings = int(math.ceil(merge_radius / self.cell_size))
+        self.frame = LocalFrame(*origin) if origin else None  # Set by the first insert otherwise
+        self.cells = {}
+        self.count = 0
+        self.keys = {}  # External id -> victim id, for victims kept by upsert()
+        self._external = {}  # Victim id -> external id, reported as victim_id by get()
+        self._lock = threading.RLock()
+        self.east = np.empty(capacity)
+        self.north = np.empty(capacity)
+        self.lat = np.empty(capacity)
+        self.lon = np.empty(capacity)
+        self.confidence = np.empty(capacity)
+        self.reports = np.empty(capacity, dtype=np.int64)
+        self.last_seen = np.empty(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def _cell(self, east, north):
+        return int(east // self.cell_size), int(north // self.cell_size)
+
+    def _grow(self):
+        for name in ('east', 'north', 'lat', 'lon', 'confidence', 'reports', 'last_seen'):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.empty_like(array)]))
+
+    def _neighbours(self, cell, ring):
+        """Victim ids in the cells exactly ``ring`` cells away from cell."""
+        cx, cy = cell
+        if ring == 0:
+            return list(self.cells.get(cell, ()))
+        ids = []
+        for x in range(cx - ring, cx + ring + 1):
+            for y in (cy - ring, cy + ring):
+                ids.extend(self.cells.get((x, y), ()))
+        for y in range(cy - ring + 1, cy + ring):
+            for x in (cx - ring, cx + ring):
+                ids.extend(self.cells.get((x, y), ()))
+        return ids
+
+    def insert(self, lat, lon, confidence=0.0, timestamp=None):
+        """
+        Add a report, merging it into the nearest known victim within merge_radius.
+
+        Args:
+            lat (float): Latitude in decimal degrees.
+            lon (float): Longitude in decimal degrees.
+            confidence (float): Detection confidence of this report.
+            timestamp (float): Report time, defaults to time.time().
+
+        Returns:
+            tuple: (victim_id, merged) where merged is False for a new victim.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if self.frame is None:
+                self.frame = LocalFrame(lat, lon)
+            east, north = (float(v) for v in self.frame.to_enu(lat, lon))
+            cell = self._cell(east, north)
+
+            candidates = []
+            for ring in range(self._merge_rings + 1):
+                candidates.extend(self._neighbours(cell, ring))
+            if candidates:
+                index = np.array(candidates)
+                distance = np.hypot(self.east[index] - east, self.north[index] - north)
+                nearest = int(np.argmin(distance))
+                if distance[nearest] <= self.merge_radius:
+                    victim_id = int(index[nearest])
+                    self._merge(victim_id, east, north, confidence, timestamp)
+                    return victim_id, True
+
+            return self._add(east, north, lat, lon, confidence, timestamp), False
+
+    def upsert(self, key, lat, lon, confidence=0.0, timestamp=None):
+        """
+        Add or move the victim with external id key, without merging it into others.
+
+        For victims already deduplicated elsewhere: the latest position replaces the
+        previous one, so a converging estimate is followed. get() reports key as its
+        victim_id.
+
+        Returns:
+            int: The victim id to pass to get().
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if self.frame is None:
+                self.frame = LocalFrame(lat, lon)
+            east, north = (float(v) for v in self.frame.to_enu(lat, lon))
+            victim_id = self.keys.get(key)
+            if victim_id is None:
+                victim_id = self.keys[key] = self._add(east, north, lat, lon, confidence, timestamp)
+                self._external[victim_id] = key
+                return victim_id
+            self._move(victim_id, east, north)
+            self.lat[victim_id], self.lon[victim_id] = lat, lon
+            self.confidence[victim_id] = max(self.confidence[victim_id], confidence)
+            self.reports[victim_id] += 1
+            self.last_seen[victim_id] = timestamp
+            return victim_id
+
+    def _add(self, east, north, lat, lon, confidence, timestamp):
+        if self.count == len(self.east):
+            self._grow()
+        victim_id = self.count
+        self.count += 1
+        self.east[victim_id], self.north[victim_id] = east, north
+        self.lat[victim_id], self.lon[victim_id] = lat, lon
+        self.confidence[victim_id] = confidence
+        self.reports[victim_id] = 1
+        self.last_seen[victim_id] = timestamp
+        self.cells.setdefault(self._cell(east, north), []).append(victim_id)
+        return victim_id
+
+    def _move(self, victim_id, east, north):
+        """Set a victim's local position, keeping its grid cell current."""
+        old_cell = self._cell(self.east[victim_id], self.north[victim_id])
+        self.east[victim_id], self.north[victim_id] = east, north
+        new_cell = self._cell(east, north)
+        if new_cell != old_cell:
+            self.cells[old_cell].remove(victim_id)
+            self.cells.setdefault(new_cell, []).append(victim_id)
+
+    def _merge(self, victim_id, east, north, confidence, timestamp):
+        """Fold a report into a victim: running mean position, highest confidence."""
+        reports = self.reports[victim_id] + 1
+        self._move(victim_id, self.east[victim_id] + (east - self.east[victim_id]) / reports,
+                   self.north[victim_id] + (north - self.north[victim_id]) / reports)
+        self.lat[victim_id], self.lon[victim_id] = self.frame.to_geodetic(self.east[victim_id], self.north[victim_id])
+        self.confidence[victim_id] = max(self.confidence[victim_id], confidence)
+        self.reports[victim_id] = reports
+        self.last_seen[victim_id] = timestamp
+
+    def nearest(self, lat, lon, k=1, max_distance=None):
+        """The k victims closest to (lat, lon) as (victim_id, distance) pairs, nearest first."""
+        with self._lock:
+            if not self.count:
+                return []
+            east, north = (float(v) for v in self.frame.to_enu(lat, lon))
+            cell = self._cell(east, north)
+            k = min(k, self.count)
+            found, ring = [], 0
+            while True:
+                if (2 * ring + 1) ** 2 * 64 > self.count:
+                    # Sparse around here: one vectorized scan of every victim beats more cell lookups
+                    found = np.arange(self.count)
+                    break
+                found.extend(self._neighbours(cell, ring))
+                if len(found) >= k:
+                    index = np.array(found)
+                    distance = np.hypot(self.east[index] - east, self.north[index] - north)
+                    # Victims outside the rings searched so far are more than ring cells away
+                    if np.partition(distance, k - 1)[k - 1] <= ring * self.cell_size:
+                        break
+                ring += 1
+            index = np.array(found)
+            distance = np.hypot(self.east[index] - east, self.north[index] - north)
+            closest = np.argpartition(distance, k - 1)[:k]
+            order = closest[np.argsort(distance[closest], kind='stable')]
+            return [(int(index[i]), float(distance[i])) for i in order
+                    if max_distance is None or distance[i] <= max_distance]
+
+    def within(self, north, south, west, east):
+        """Ids of the victims inside a latitude/longitude rectangle."""
+        with self._lock:
+            lat, lon = self.lat[:self.count], self.lon[:self.count]
+            mask = (lat <= north) & (lat >= south) & (lon >= west) & (lon <= east)
+            return [int(victim_id) for victim_id in np.nonzero(mask)[0]]
+
+    def query_rectangle(self, area):
+        """Victims inside an area in the dashboard's dispatch format (top_left / bottom_right)."""
+        return [self.get(victim_id) for victim_id in self.within(*parse_rectangle(area))]
+
+    def get(self, victim_id):
+        with self._lock:
+            return {
+                'victim_id': self._external.get(victim_id, victim_id),
+                'latitude': float(self.lat[victim_id]),
+                'longitude': float(self.lon[victim_id]),
+                'confidence': float(self.confidence[victim_id]),
+                'reports': int(self.reports[victim_id]),
+                'last_seen': float(self.last_seen[victim_id]),
+            }
+
+    def all(self):
+        with self._lock:
+            return [self.get(victim_id) for victim_id in range(self.count)]
@@ -1,46 +1,41 @@
-import torch
 import cv2
 import os
-import random
+import sys
+
+# Shared detection helpers live with the Xavier deployment code
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yolo-drone copy'))
 import math
+from geolocation import Geolocator, DISTANCE
+from geodesy import destination
+from tracker import Tracker
+from evidence_writer import EvidenceWriter
+from detectors import load_detector
+from sources import open_frame_source
+
 
 # Function to calculate the change in latitude and longitude based on distance
 def distance_to_lat_lon(distance, altitude, latitude, longitude, frame_width):
     """
-    Convert distance to changes in latitude and longitude.
+    Convert a pixel distance to a new latitude and longitude. Kept for existing callers; use Geolocator.locate.
 
     Args:
-        distance (float): Distance to the detected human in meters.
+        distance (float): Distance to the detected human in pixels, as from the frame centre.
         altitude (float): Altitude of the drone in meters.
         latitude (float): Current latitude of the drone in decimal degrees.
         longitude (float): Current longitude of the drone in decimal degrees.
         frame_width (int): Width of the video frame in pixels.
 
     Returns:
-        (float, float): New latitude and longitude after distance change.
+        (float, float): New latitude and longitude, offset by the distance both north and east as before.
     """
-    # Approximate conversion factor for degrees to meters on Earth
-    meters_per_degree_lat = 111320  # Average meters per degree of latitude
-    meters_per_degree_lon = 40008000 / 360  # Meters per degree of longitude at the equator
-    
-    # Assuming the drone is flying horizontally at a known altitude
-    horizontal_fov = 2 * altitude * math.tan(math.radians(45) / 2)  # Horizontal field of view
-    pixel_size_meters = horizontal_fov / frame_width  # Convert pixel size to meters
-
-    # Calculate the distance in degrees
-    distance_degrees_lat = (distance * pixel_size_meters) / meters_per_degree_lat
-    distance_degrees_lon = (distance * pixel_size_meters) / meters_per_degree_lon
-
-    # Calculate new latitude and longitude
-    new_latitude = latitude + distance_degrees_lat
-    new_longitude = longitude + distance_degrees_lon
-
-    return new_latitude, new_longitude
+    meters = distance * 2 * altitude * math.tan(math.radians(45) / 2) / frame_width
+    return destination(latitude, longitude, meters * math.sqrt(2), 45.0)
 
 # Function to calculate distance based on bounding box and altitude
 def calculate_distance(bbox, altitude, frame_width, frame_height, fov=45):
     """
-    Calculate the distance of the drone from a detected human using the bounding box.
+    Ground distance from the point below the drone to a bounding box centre. Kept for existing callers;
+    Geolocator.locate gives the distance of every detection of a frame at once.
 
     Args:
         bbox (list): Bounding box coordinates [x_min, y_min, x_max, y_max, confidence, class].
@@ -52,54 +47,40 @@ def calculate_distance(bbox, altitude, frame_width, frame_height, fov=45):
     Returns:
         float: Calculated distance to the human in meters.
     """
-    # Get the center of the bounding box
-    x_min, y_min, x_max, y_max = bbox[:4]
-    bbox_width = x_max - x_min
-    bbox_height = y_max - y_min
-
-    # Calculate the horizontal FOV in meters at the given altitude
-    fov_rad = math.radians(fov)
-    horizontal_fov_meters = 2 * altitude * math.tan(fov_rad / 2)
-
-    # Calculate the size of one pixel in meters
-    pixel_size_meters = horizontal_fov_meters / frame_width
+    box = [*bbox[:4], 0.0, 0.0]
+    return float(Geolocator(fov).locate([box], 0.0, 0.0, altitude, frame_width, frame_height)[0, DISTANCE])
 
-    # Calculate the approximate distance to the human
-    bbox_center_x = (x_min + x_max) / 2
-    bbox_center_y = (y_min + y_max) / 2
-    distance = math.sqrt((bbox_center_x - frame_width / 2) ** 2 + (bbox_center_y - frame_height / 2) ** 2)
-    distance_meters = distance * pixel_size_meters
-
-    return distance_meters
-
-# Function to run video detection and calculate distance for a random human
-def run_video_detection_with_distance(weights_path, altitude, initial_latitude, initial_longitude, output_dir="output", conf_threshold=0.25):
+# Function to run video detection and geolocate every detected human
+def run_video_detection_with_distance(weights_path, altitude, initial_latitude, initial_longitude, output_dir="output", conf_threshold=0.25, backend="auto", source=0):
     """
-    Run YOLOv5 detection on a live feed from the drone's USB camera and calculate the distance of a random detected human.
+    Run YOLOv5 detection on a live feed from the drone's USB camera and geolocate every detected human.
 
     Args:
-        weights_path (str): Path to the YOLOv5 weights file (.pt).
+        weights_path (str): Path to the YOLOv5 weights file (.pt), or an exported .onnx/.torchscript model.
         altitude (float): Altitude of the drone in meters.
         initial_latitude (float): Initial latitude of the drone in decimal degrees.
         initial_longitude (float): Initial longitude of the drone in decimal degrees.
         output_dir (str): Directory to save the detection frame.
         conf_threshold (float): Confidence threshold for detections (default: 0.25).
+        backend (str): Detector backend, see detectors.load_detector (default: by file extension).
+        source (int or str): Camera index, video file or 'synthetic', see sources.open_frame_source (default: 0).
 
     Returns:
         None
     """
-    # Initialize video capture from USB camera (device index 0, adjust if needed)
-    cap = cv2.VideoCapture(0)  # 0 for default camera, change to the appropriate device index if needed
+    # Initialize video capture from the USB camera, or replay a recording
+    cap = open_frame_source(source)  # 0 for default camera, change to the appropriate device index if needed
     if not cap.isOpened():
-        print("Error: Cannot open video feed from USB camera.")
+        print(f"Error: Cannot open video feed from {source}.")
         return
 
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
+    # Snapshots are written in the background into output_dir
+    evidence = EvidenceWriter(output_dir=output_dir, encoding='jpeg')
 
-    # Load YOLOv5 model
-    model = torch.hub.load('ultralytics/yolov5', 'custom', path=weights_path)
-    model.conf = conf_threshold  # Set confidence threshold
+    # Load the detection model
+    detector = load_detector(backend, weights_path, conf=conf_threshold)
+    geolocator = Geolocator(fov=45)
+    tracker = Tracker(min_hits=3)  # A person must be seen in 3 frames before raising an alarm
 
     print("Starting live feed detection...")
 
@@ -114,29 +95,25 @@ def run_video_detection_with_distance(weights_path, altitude, initial_latitude,
         frame_height, frame_width = frame.shape[:2]
 
         # Perform inference on the frame
-        results = model(frame)
-        detections = results.xyxy[0].cpu().numpy()  # Get detections as numpy array
-
-        if len(detections) > 0:  # If there are any detections
-            print(f"Detections found in frame {frame_count}.")
-
-            # Select a random detection
-            random_detection = random.choice(detections)
-            human_id = int(random_detection[5])  # Human class ID (0 is usually for persons in YOLOv5)
-
-            # Calculate distance to the random detection
-            distance = calculate_distance(random_detection, altitude, frame_width, frame_height)
-            print(f"Selected Human ID: {human_id}, Calculated distance: {distance:.2f} meters.")
-
-            # Convert distance to latitude and longitude
-            new_latitude, new_longitude = distance_to_lat_lon(distance, altitude, initial_latitude, initial_longitude, frame_width)
-            print(f"New latitude: {new_latitude:.6f}, New longitude: {new_longitude:.6f}")
-
-            # Annotate and save the frame
-            annotated_frame = results.render()[0]  # Render detections on the frame
-            output_path = os.path.join(output_dir, f"detection_frame_{frame_count}.jpg")
-            cv2.imwrite(output_path, annotated_frame)
-            print(f"Frame saved with annotations at {output_path}")
+        batch_detections, results = detector.predict_batch([frame])
+        detections = batch_detections[0]  # (N, 6) numpy array
+
+        # Geolocate all detections in one call and follow them across frames
+        located = geolocator.locate(detections, initial_latitude, initial_longitude, altitude, frame_width, frame_height)
+        track_ids = tracker.update(detections, located)
+        alarms = tracker.pop_alarms()
+
+        if alarms:  # If a tracked human has been confirmed
+            print(f"Confirmed humans in frame {frame_count}.")
+            for alarm in alarms:
+                print(f"Track ID: {alarm['track_id']}, distance: {alarm['distance']:.2f} meters, "
+                      f"latitude: {alarm['latitude']:.6f}, longitude: {alarm['longitude']:.6f}")
+
+                # Annotate and save the frame with a JSON sidecar
+                bbox = [float(v) for v in detections[track_ids == alarm['track_id']][0, :4]]
+                output_path = evidence.submit(frame, dict(alarm, frame=frame_count, bbox=bbox),
+                                              boxes=detections, track_id=alarm['track_id'], bbox=bbox)
+                print(f"Frame queued for saving at {output_path}")
 
             # Exit after detecting and calculating distance
             break
@@ -150,6 +127,7 @@ def run_video_detection_with_distance(weights_path, altitude, initial_latitude,
             break
 
     cap.release()
+    evidence.close()
     cv2.destroyAllWindows()
     print("Video detection completed.")
 
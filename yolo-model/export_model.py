@@ -0,0 +1,38 @@
+import argparse
+import os
+
+
+def export(weights, fmt, input_size, batch_size, half):
+    """Export ultralytics weights (YOLOv5u/v8/11) to a fixed-shape ONNX or TorchScript file."""
+    from ultralytics import YOLO
+    model = YOLO(weights)
+    return model.export(format=fmt, imgsz=input_size, batch=batch_size, half=half, dynamic=False, simplify=True)
+
+
+def quantize_int8(onnx_path):
+    """Dynamic INT8 quantization of the weights; activations stay float, so no calibration set is needed."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    output = os.path.splitext(onnx_path)[0] + '.int8.onnx'
+    quantize_dynamic(onnx_path, output, weight_type=QuantType.QUInt8)
+    return output
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Export a detection model for the onnx/torchscript backends of detectors.py. '
+                    'Legacy torch.hub YOLOv5 weights are exported with the yolov5 checkout instead: '
+                    'python export.py --weights best.pt --include onnx --imgsz 640 --batch-size 1')
+    parser.add_argument('weights', help='Path to the .pt weights')
+    parser.add_argument('--format', choices=('onnx', 'torchscript'), default='onnx')
+    parser.add_argument('--input-size', type=int, default=640)
+    parser.add_argument('--batch-size', type=int, default=1, help='Fixed batch, one frame per camera')
+    parser.add_argument('--half', action='store_true', help='FP16 weights and input (GPU targets such as the Xavier)')
+    parser.add_argument('--int8', action='store_true', help='Also write a dynamically quantized INT8 ONNX model')
+    args = parser.parse_args()
+    if args.int8 and (args.format != 'onnx' or args.half):
+        parser.error('--int8 needs an FP32 ONNX export')
+
+    path = export(args.weights, args.format, args.input_size, args.batch_size, args.half)
+    print(f"Exported {path}")
+    if args.int8:
+        print(f"Quantized {quantize_int8(path)}")
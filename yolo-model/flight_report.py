@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import numpy as np
+
+# Shared detection helpers live with the Xavier deployment code
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yolo-drone copy'))
+from flight_recorder import load_flight, MODES
+from geodesy import haversine_np
+
+
+def summarize_flight(flight):
+    """Post-mission summary of a recording loaded by flight_recorder.load_flight."""
+    meta, detections, poses, events = flight['meta'], flight['detections'], flight['poses'], flight['events']
+    times = [stream['time'][[0, -1]] for stream in (detections, poses, events) if len(stream)]
+    start, end = (min(t[0] for t in times), max(t[1] for t in times)) if times else (0.0, 0.0)
+
+    cameras = {}
+    for index, camera_id in enumerate(meta['cameras']):
+        mine = detections[detections['camera'] == index]
+        tracked = mine['track_id'][mine['track_id'] >= 0]
+        cameras[camera_id] = {
+            'detections': len(mine),
+            'frames': len(np.unique(mine['seq'])),
+            'tracks': len(np.unique(tracked)),
+            'by_mode': {mode: int((mine['mode'] == code).sum()) for code, mode in enumerate(MODES)},
+            'located': int(np.isfinite(mine['latitude']).sum()),
+            'mean_conf': float(mine['conf'].mean()) if len(mine) else None,
+        }
+
+    distance = 0.0
+    if len(poses) > 1:
+        distance = float(haversine_np(poses['latitude'][:-1], poses['longitude'][:-1],
+                                      poses['latitude'][1:], poses['longitude'][1:]).sum())
+    return {
+        'start': meta['wall_start'] + start - meta['monotonic_start'] if times else None,
+        'duration_s': end - start,
+        'cameras': cameras,
+        'poses': len(poses),
+        'path_m': distance,
+        'max_altitude_m': float(poses['altitude'].max()) if len(poses) else None,
+        'events': [(round(float(t - start), 2), name.decode(), int(target), float(value))
+                   for t, name, target, value in events.tolist()],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarize flights recorded by the detection server and '
+                                                 'drone controller (flight_recorder.FlightRecorder).')
+    parser.add_argument('flights', nargs='+', help='Flight recording directories')
+    args = parser.parse_args()
+
+    for directory in args.flights:
+        summary = summarize_flight(load_flight(directory))
+        print(f"{directory}: {summary['duration_s']:.1f}s, {summary['poses']} poses, "
+              f"{summary['path_m']:.0f} m flown, max altitude {summary['max_altitude_m']}")
+        for camera_id, stats in summary['cameras'].items():
+            print(f"  {camera_id}: {stats['detections']} detections in {stats['frames']} frames, "
+                  f"{stats['tracks']} tracks, {stats['located']} located, by mode {stats['by_mode']}")
+        for offset, name, target, value in summary['events']:
+            detail = f" victim {target}" if target >= 0 else ''
+            detail += f" ({value:.2f}s)" if np.isfinite(value) else ''
+            print(f"  +{offset:>8.2f}s {name}{detail}")
@@ -0,0 +1,138 @@
+import math
+import os
+import sys
+import timeit
+import numpy as np
+
+# Shared detection helpers live with the Xavier deployment code
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yolo-drone copy'))
+from geodesy import (haversine, equirectangular, bearing, destination, haversine_np, equirectangular_np,
+                     destination_np, LocalFrame)
+from geolocation import Geolocator, BEARING
+
+
+def dms(degrees, minutes, seconds):
+    return degrees + minutes / 60 + seconds / 3600
+
+
+# Worked examples for a 6371 km sphere (Chris Veness, "Calculate distance, bearing and more
+# between Latitude/Longitude points"): Land's End to John o' Groats, and a destination point.
+REFERENCE_DISTANCES = [
+    # lat1, lon1, lat2, lon2, distance (m), initial bearing (deg)
+    (dms(50, 3, 59), -dms(5, 42, 53), dms(58, 38, 38), -dms(3, 4, 12), 968.9e3, dms(9, 7, 11)),
+]
+REFERENCE_DESTINATIONS = [
+    # lat, lon, distance (m), bearing (deg), expected lat, expected lon
+    (dms(53, 19, 14), -dms(1, 43, 47), 124.8e3, dms(96, 1, 18), dms(53, 11, 18), dms(0, 8, 0)),
+]
+
+
+def flat_earth_distance(lat1, lon1, lat2, lon2):
+    """The formula DroneController.get_distance_meters used before geodesy.py."""
+    return math.sqrt((lat2 - lat1) ** 2 + (lon2 - lon1) ** 2) * 1.113195e5
+
+
+def check_accuracy():
+    failures = 0
+    for lat1, lon1, lat2, lon2, distance, initial_bearing in REFERENCE_DISTANCES:
+        got_distance = haversine(lat1, lon1, lat2, lon2)
+        got_bearing = bearing(lat1, lon1, lat2, lon2)
+        ok = abs(got_distance - distance) < 100 and abs(got_bearing - initial_bearing) < 1e-3
+        failures += not ok
+        print(f"haversine {got_distance / 1000:.2f} km (ref {distance / 1000:.1f}), "
+              f"bearing {got_bearing:.4f} (ref {initial_bearing:.4f}) {'ok' if ok else 'FAIL'}")
+    for lat, lon, distance, bearing_deg, expected_lat, expected_lon in REFERENCE_DESTINATIONS:
+        got_lat, got_lon = destination(lat, lon, distance, bearing_deg)
+        ok = abs(got_lat - expected_lat) < 1 / 3600 and abs(got_lon - expected_lon) < 1 / 3600
+        failures += not ok
+        print(f"destination {got_lat:.5f}, {got_lon:.5f} (ref {expected_lat:.5f}, {expected_lon:.5f}) "
+              f"{'ok' if ok else 'FAIL'}")
+
+    # Vectorized versions must agree with the scalar ones
+    rng = np.random.default_rng(0)
+    lat1, lat2 = rng.uniform(-80, 80, (2, 1000))
+    lon1, lon2 = rng.uniform(-180, 180, (2, 1000))
+    scalar = np.array([haversine(*p) for p in zip(lat1, lon1, lat2, lon2)])
+    ok = np.allclose(haversine_np(lat1, lon1, lat2, lon2), scalar, rtol=1e-12, atol=1e-6)
+    distance, bearing_deg = rng.uniform(0, 5000, 1000), rng.uniform(0, 360, 1000)
+    lat, lon = destination_np(lat1, lon1, distance, bearing_deg)
+    ok &= np.allclose(haversine_np(lat1, lon1, lat, lon), distance, atol=1e-6)
+    failures += not ok
+    print(f"vectorized agrees with scalar and round-trips destination: {'ok' if ok else 'FAIL'}")
+
+    # Errors at mission scale: the 2 m arrival radius and few-kilometer sorties
+    print("\nError vs haversine (m)     flat-earth   equirect.   ENU frame")
+    for lat0 in (0.0, 12.9716, 45.0, 60.0):
+        for distance in (2.0, 100.0, 5000.0):
+            errors = np.zeros(3)
+            frame = LocalFrame(lat0, 77.5946)
+            for bearing_deg in range(0, 360, 15):
+                lat, lon = destination(lat0, 77.5946, distance, bearing_deg)
+                errors = np.maximum(errors, np.abs([
+                    flat_earth_distance(lat0, 77.5946, lat, lon) - distance,
+                    equirectangular(lat0, 77.5946, lat, lon) - distance,
+                    float(frame.distance(lat0, 77.5946, lat, lon)) - distance,
+                ]))
+            print(f"lat {lat0:5.1f}, {distance:6.0f} m      {errors[0]:10.4f}  {errors[1]:10.6f}  {errors[2]:10.6f}")
+    return failures
+
+
+# Camera axes: looking straight down, image-up towards the nose. A detection
+# (column, row) in a 640x480 frame at a heading should lie on this bearing.
+REFERENCE_CAMERA_BEARINGS = [
+    # column, row, heading (deg), expected bearing (deg)
+    (320, 40, 0.0, 0.0),      # Ahead, flying north: north
+    (600, 240, 0.0, 90.0),    # Right of track, flying north: east
+    (320, 440, 0.0, 180.0),   # Behind
+    (40, 240, 0.0, 270.0),    # Left
+    (320, 40, 90.0, 90.0),    # Ahead, flying east: east
+    (600, 240, 90.0, 180.0),  # Right of track, flying east: south
+    (520, 40, 270.0, 315.0),  # Ahead and right, flying west: north-west
+    (320, 40, None, 0.0),     # No heading: image-up is north
+]
+
+
+def check_camera_axes():
+    failures = 0
+    geolocator = Geolocator(fov=45)
+    lat0, lon0 = 12.9716, 77.5946
+    for column, row, heading, expected in REFERENCE_CAMERA_BEARINGS:
+        located = geolocator.locate([[column - 1, row - 1, column + 1, row + 1, 0.9, 0]], lat0, lon0, 30.0,
+                                    640, 480, heading)[0]
+        got = located[BEARING]
+        # The position must agree with the bearing, not just the bearing column
+        moved = bearing(lat0, lon0, located[0], located[1])
+        error = max(abs((got - expected + 180) % 360 - 180), abs((moved - expected + 180) % 360 - 180))
+        ok = error < 0.5
+        failures += not ok
+        print(f"pixel ({column}, {row}) heading {heading}: bearing {got:.1f} (ref {expected:.0f}) "
+              f"{'ok' if ok else 'FAIL'}")
+    return failures
+
+
+def benchmark():
+    lat1, lon1, lat2, lon2 = 12.9716, 77.5946, 12.9720, 77.5950
+    print("\nScalar (us per call)")
+    for name, fn in (('haversine', haversine), ('equirectangular', equirectangular), ('bearing', bearing),
+                     ('haversine_np', haversine_np)):
+        seconds = min(timeit.repeat(lambda: fn(lat1, lon1, lat2, lon2), number=20000, repeat=3)) / 20000
+        print(f"  {name:16s} {seconds * 1e6:8.3f}")
+
+    print("\nVectorized (ns per point)")
+    rng = np.random.default_rng(1)
+    for n in (100, 10000, 1000000):
+        lats = lat1 + rng.uniform(-0.05, 0.05, n)
+        lons = lon1 + rng.uniform(-0.05, 0.05, n)
+        frame = LocalFrame(lat1, lon1)
+        for name, fn in (('haversine_np', lambda: haversine_np(lat1, lon1, lats, lons)),
+                         ('equirectangular_np', lambda: equirectangular_np(lat1, lon1, lats, lons)),
+                         ('LocalFrame.to_enu', lambda: frame.to_enu(lats, lons))):
+            number = max(1, 100000 // n)
+            seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+            print(f"  {name:20s} n={n:<8d} {seconds / n * 1e9:8.2f}")
+
+
+if __name__ == '__main__':
+    failed = check_accuracy() + check_camera_axes()
+    benchmark()
+    sys.exit(1 if failed else 0)
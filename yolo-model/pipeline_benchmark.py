@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+try:
+    import resource
+except ImportError:  # Windows has no getrusage; memory is reported as null there
+    resource = None
+
+# Shared detection helpers live with the Xavier deployment code
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yolo-drone copy'))
+from detectors import load_detector
+from geolocation import Geolocator
+from tracker import Tracker
+from inference_scheduler import make_scheduler, POLICIES, SKIP
+from protocol import encode_message, DETECTIONS
+from sources import ReplayClock, open_frame_source
+from telemetry_sources import open_telemetry
+
+# Per-frame stages, in pipeline order. detect is the whole scheduled detector call; preprocess,
+# inference and postprocess are its parts as the backend reports them (see detectors.timings).
+STAGES = ('capture', 'detect', 'preprocess', 'inference', 'postprocess', 'geolocation', 'tracking', 'publish',
+          'total')
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds of a list of durations in seconds."""
+    if not samples:
+        return {'count': 0}
+    ms = np.asarray(samples) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {'count': len(ms), 'mean_ms': float(ms.mean()), 'p50_ms': float(p50), 'p90_ms': float(p90),
+            'p99_ms': float(p99), 'max_ms': float(ms.max())}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)  # bytes on macOS, KiB on Linux
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(sources, weights, backend='auto', telemetry=None, realtime=False, frames=300, warmup=10,
+                  policy='always', conf=0.25):
+    """
+    Run capture -> detect -> geolocate -> track -> publish inline over replayed sources.
+
+    The stages run one after another on the calling thread, so every
+    duration is that stage's own cost rather than time spent waiting on
+    queues, and runs are comparable across commits.
+
+    Returns:
+        dict: Machine-readable results (see the keys below).
+    """
+    clock = ReplayClock(realtime=realtime)
+    caps = {f"camera{index}": open_frame_source(spec, clock) for index, spec in enumerate(sources)}
+    telemetry_source = open_telemetry(telemetry, clock) if telemetry else None
+    detector = load_detector(backend, weights, conf=conf, batch_size=len(caps))
+    geolocator = Geolocator(fov=45)
+    trackers = {camera_id: Tracker(min_hits=3) for camera_id in caps}
+    scheduler = make_scheduler(policy, lambda camera_id: trackers[camera_id].predicted_boxes())
+    samples = {stage: [] for stage in STAGES}
+    camera_ids = list(caps)
+    located_frames = processed = 0
+    rss_start = peak_rss_mb()
+
+    try:
+        for iteration in range(warmup + frames):
+            if iteration == warmup:
+                wall_start = time.perf_counter()
+            t0 = time.perf_counter()
+            batch = []
+            for camera_id in camera_ids:
+                ret, frame = caps[camera_id].read()
+                if not ret:
+                    break
+                batch.append(frame)
+            if len(batch) < len(camera_ids):
+                break
+            capture_time = time.monotonic()
+            t1 = time.perf_counter()
+
+            detector.timings = {}
+            detections, modes, _ = scheduler.predict(detector.predict_batch, camera_ids, batch)
+            timings = detector.timings
+            t2 = time.perf_counter()
+
+            pose = telemetry_source.get_pose_at(capture_time) if telemetry_source else None
+            located = [None] * len(batch)
+            if pose:
+                latitude, longitude, altitude, heading = pose
+                for index, (frame, boxes) in enumerate(zip(batch, detections)):
+                    if len(boxes) and modes[index] != SKIP:
+                        located[index] = geolocator.locate(boxes, latitude, longitude, altitude,
+                                                           frame.shape[1], frame.shape[0], heading)
+                located_frames += 1
+            t3 = time.perf_counter()
+
+            track_ids = []
+            for index, camera_id in enumerate(camera_ids):
+                if modes[index] == SKIP:
+                    detections[index], ids = trackers[camera_id].coast()
+                else:
+                    ids = trackers[camera_id].update(detections[index], located[index])
+                track_ids.append(ids)
+            t4 = time.perf_counter()
+
+            message = b''.join(encode_message(DETECTIONS, {
+                'camera_id': camera_id, 'seq': iteration, 'mode': modes[index],
+                'frame_width': batch[index].shape[1], 'frame_height': batch[index].shape[0],
+                'boxes': detections[index][:, :5].tolist(), 'track_ids': track_ids[index].tolist(),
+            }) for index, camera_id in enumerate(camera_ids))
+            t5 = time.perf_counter()
+
+            if iteration < warmup:
+                continue
+            processed += 1
+            for stage, duration in (('capture', t1 - t0), ('detect', t2 - t1), ('geolocation', t3 - t2),
+                                    ('tracking', t4 - t3), ('publish', t5 - t4), ('total', t5 - t0)):
+                samples[stage].append(duration)
+            for stage in ('preprocess', 'inference', 'postprocess'):
+                if stage in timings:
+                    samples[stage].append(timings[stage])
+        wall = time.perf_counter() - wall_start if processed else 0.0
+    finally:
+        for cap in caps.values():
+            cap.release()
+        if telemetry_source is not None:
+            telemetry_source.close()
+
+    return {
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {'sources': list(sources), 'weights': weights, 'backend': type(detector).__name__,
+                   'telemetry': telemetry, 'realtime': realtime, 'policy': policy, 'warmup': warmup},
+        'frames': processed,
+        'cameras': len(camera_ids),
+        'fps': processed / wall if wall else None,
+        'located_frames': located_frames,
+        'stages': {stage: summarize(values) for stage, values in samples.items()},
+        'memory': {'rss_peak_start_mb': rss_start, 'rss_peak_mb': peak_rss_mb()},
+        'scheduler': scheduler.stats(),
+    }
+
+
+def print_report(result, baseline=None):
+    print(f"{result['frames']} frames x {result['cameras']} cameras at {result['fps'] or 0:.1f} fps "
+          f"({result['config']['backend']}, policy {result['config']['policy']}, commit {result['commit']})")
+    header = f"{'stage':<12}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    print(header + (f"{'p50 vs base':>13}" if baseline else ''))
+    for stage in STAGES:
+        stats = result['stages'][stage]
+        if not stats['count']:
+            continue
+        line = f"{stage:<12}{stats['p50_ms']:>9.2f}{stats['p90_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['max_ms']:>9.2f}"
+        base = baseline['stages'].get(stage, {}) if baseline else {}
+        if base.get('count'):
+            line += f"{(stats['p50_ms'] / base['p50_ms'] - 1) * 100 if base['p50_ms'] else 0:>+12.1f}%"
+        print(line)
+    memory = result['memory']['rss_peak_mb']
+    if memory is not None:
+        print(f"peak RSS {memory:.0f} MB")
+    if baseline and baseline.get('fps') and result['fps']:
+        print(f"fps {result['fps']:.1f} vs {baseline['fps']:.1f} at {baseline['commit']} "
+              f"({(result['fps'] / baseline['fps'] - 1) * 100:+.1f}%)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='End-to-end latency benchmark of the detection pipeline on replayed or synthetic input. '
+                    'Writes machine-readable JSON to compare across commits.')
+    parser.add_argument('--weights', required=True, help='Model file, see detectors.load_detector')
+    parser.add_argument('--backend', default='auto')
+    parser.add_argument('--source', action='append',
+                        help='Frame source per camera: video file, synthetic[:WxH@FPS] or device index '
+                             '(repeatable, default: synthetic)')
+    parser.add_argument('--telemetry', default='synthetic:12.9716,77.5946,30',
+                        help='.tlog or flight recording directory to replay, synthetic:LAT,LON[,ALT], '
+                             'or a MAVLink connection string')
+    parser.add_argument('--realtime', action='store_true', help='Pace replay at the recorded rate (default: max speed)')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--policy', choices=tuple(POLICIES), default='always')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Results JSON of an earlier run to compare against')
+    args = parser.parse_args()
+
+    result = run_benchmark(args.source or ['synthetic'], args.weights, args.backend, args.telemetry, args.realtime,
+                           args.frames, args.warmup, args.policy)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import sys
+import time
+import cv2
+
+# Shared detection helpers live with the Xavier deployment code
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yolo-drone copy'))
+from detectors import load_detector
+from tracker import Tracker, iou_matrix, greedy_match
+from inference_scheduler import make_scheduler, POLICIES, SKIP
+
+
+def read_frames(video, max_frames):
+    """Frames of a recording, streamed so long flights do not have to fit in memory."""
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open {video}")
+    try:
+        for _ in range(max_frames) if max_frames else iter(int, 1):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+
+def reference_detections(detector, video, max_frames):
+    """Full-frame detections of every frame: the recall baseline, and the cost of running them."""
+    reference = []
+    start = time.perf_counter()
+    for frame in read_frames(video, max_frames):
+        reference.append(detector.predict_batch([frame])[0][0][:, :4].copy())
+    return reference, time.perf_counter() - start
+
+
+def evaluate(detector, video, reference, policy, iou=0.5, **overrides):
+    """
+    Replay a recording through one scheduling policy.
+
+    A reference box counts as recalled when a box the pipeline reported for
+    that frame overlaps it with at least iou: a detection when the detector
+    ran, a coasting track's predicted box when the frame was skipped.
+    """
+    tracker = Tracker(min_hits=3)
+    scheduler = make_scheduler(policy, lambda camera_id: tracker.predicted_boxes(), **overrides)
+    matched = total = 0
+    start = time.perf_counter()
+    for frame, expected in zip(read_frames(video, len(reference)), reference):
+        detections, modes, _ = scheduler.predict(detector.predict_batch, ['camera'], [frame])
+        if modes[0] == SKIP:
+            reported, _ = tracker.coast()
+        else:
+            reported = detections[0]
+            tracker.update(reported)
+        total += len(expected)
+        if len(expected) and len(reported):
+            matched += len(greedy_match(iou_matrix(expected, reported[:, :4]), iou)[0])
+    elapsed = time.perf_counter() - start
+    stats = scheduler.stats()
+    return dict(policy=policy, recall=matched / total if total else None, reference_boxes=total,
+                ms_per_frame=elapsed / max(stats['frames'], 1) * 1000, **stats)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Effective inference rate against detection recall of the inference scheduler '
+                    'policies on recorded footage. Full-frame inference on every frame is the reference.')
+    parser.add_argument('video', help='Recorded flight video')
+    parser.add_argument('--weights', required=True, help='Model file, see detectors.load_detector')
+    parser.add_argument('--backend', default='auto')
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--policies', nargs='+', choices=tuple(POLICIES), default=list(POLICIES))
+    parser.add_argument('--full-every', type=int, help='Override the policies\' full_every')
+    parser.add_argument('--max-frames', type=int, default=0, help='Stop after this many frames (0: all)')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    detector = load_detector(args.backend, args.weights, conf=args.conf)
+    reference, elapsed = reference_detections(detector, args.video, args.max_frames)
+    print(f"Reference: {len(reference)} frames, {sum(len(r) for r in reference)} boxes, "
+          f"{elapsed / max(len(reference), 1) * 1000:.1f} ms/frame")
+
+    overrides = {'full_every': args.full_every} if args.full_every else {}
+    rows = []
+    print(f"{'policy':<10}{'rate':>8}{'recall':>9}{'ms/frame':>10}{'full':>7}{'roi':>7}{'skip':>7}{'motion':>8}")
+    for policy in args.policies:
+        row = evaluate(detector, args.video, reference, policy, **overrides)
+        rows.append(row)
+        recall = f"{row['recall']:.3f}" if row['recall'] is not None else 'n/a'
+        print(f"{policy:<10}{row['inference_rate']:>8.3f}{recall:>9}{row['ms_per_frame']:>10.1f}"
+              f"{row['full']:>7}{row['roi']:>7}{row['skip']:>7}{row['motion_triggers']:>8}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
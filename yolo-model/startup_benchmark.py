@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+XAVIER_CODE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yolo-drone copy')
+
+
+def child(mode, weights, backend, sources, telemetry, cache_dir):
+    """One cold start, as DetectionServer does it: timings in seconds from the start of this process's imports."""
+    start = time.perf_counter()
+    # Shared detection helpers live with the Xavier deployment code; imported here so they are timed
+    sys.path.append(XAVIER_CODE)
+    from detectors import load_detector
+    from sources import ReplayClock, open_frame_source
+    from telemetry_sources import open_telemetry
+    from instrumentation import Registry
+    from startup import Startup
+    imported = time.perf_counter() - start
+
+    clock = ReplayClock()
+    inits = {
+        'model': lambda: load_detector(backend, weights, conf=0.25, batch_size=len(sources), cache_dir=cache_dir),
+        'cameras': lambda: {index: open_frame_source(spec, clock) for index, spec in enumerate(sources)},
+        'telemetry': lambda: open_telemetry(telemetry, clock),
+    }
+    ready = {}
+    if mode == 'serial':
+        components = {}
+        for name, init in inits.items():
+            components[name] = init()
+            ready[name] = time.perf_counter() - start
+        serving = ready['telemetry']  # Serially, serving waits for every component, telemetry included
+    else:
+        offset = time.perf_counter() - start
+        startup = Startup(registry=Registry())
+        for name, init in inits.items():
+            startup.start(name, init)
+        components = {name: startup.wait(name) for name in ('model', 'cameras')}
+        serving = time.perf_counter() - start
+        components['telemetry'] = startup.wait('telemetry')
+        ready = {name: offset + component.seconds for name, component in startup.components.items()}
+    total = time.perf_counter() - start
+
+    for cap in components['cameras'].values():
+        cap.release()
+    components['telemetry'].close()
+    return {'imports': imported, 'ready': ready, 'serving': serving, 'total': total}
+
+
+def run_once(mode, args):
+    command = [sys.executable, os.path.abspath(__file__), '--child', mode, '--weights', args.weights,
+               '--backend', args.backend, '--telemetry', args.telemetry]
+    for source in args.source or ['synthetic']:
+        command += ['--source', source]
+    if args.cache_dir:
+        command += ['--cache-dir', args.cache_dir]
+    start = time.perf_counter()
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process'] = time.perf_counter() - start  # Includes interpreter start-up and shutdown
+    return result
+
+
+def print_report(results):
+    print(f"{'mode':<10}{'run':>4}{'imports s':>11}{'model s':>9}{'cameras s':>11}{'telemetry s':>13}"
+          f"{'serving s':>11}{'total s':>9}{'process s':>11}")
+    for mode, runs in results.items():
+        for index, run in enumerate(runs, 1):
+            ready = run['ready']
+            print(f"{mode:<10}{index:>4}{run['imports']:>11.2f}{ready['model']:>9.2f}{ready['cameras']:>11.2f}"
+                  f"{ready['telemetry']:>13.2f}{run['serving']:>11.2f}{run['total']:>9.2f}{run['process']:>11.2f}")
+    for mode, runs in results.items():
+        print(f"{mode}: median {np.median([run['serving'] for run in runs]):.2f}s to serving, "
+              f"{np.median([run['total'] for run in runs]):.2f}s to all components")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Cold-start time of the detection server components (imports, model, cameras, telemetry), '
+                    'initialized one after another versus concurrently as DetectionServer does. '
+                    'Every run is a fresh interpreter; with --cache-dir the first run fills the model cache.')
+    parser.add_argument('--weights', required=True, help='Model file, see detectors.load_detector')
+    parser.add_argument('--backend', default='auto')
+    parser.add_argument('--source', action='append',
+                        help='Frame source per camera: video file, synthetic[:WxH@FPS] or device index '
+                             '(repeatable, default: synthetic)')
+    parser.add_argument('--telemetry', default='synthetic:12.9716,77.5946,30',
+                        help='.tlog or flight recording directory to replay, synthetic:LAT,LON[,ALT], '
+                             'or a MAVLink connection string')
+    parser.add_argument('--cache-dir', help='Model cache directory (see detectors.ExportedDetector)')
+    parser.add_argument('--runs', type=int, default=3, help='Cold starts per mode')
+    parser.add_argument('--modes', nargs='+', choices=('serial', 'parallel'), default=['serial', 'parallel'])
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--child', choices=('serial', 'parallel'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = child(args.child, args.weights, args.backend, args.source or ['synthetic'], args.telemetry,
+                       args.cache_dir)
+        print(json.dumps(result))
+        sys.exit()
+
+    results = {mode: [run_once(mode, args) for _ in range(args.runs)] for mode in args.modes}
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'weights': args.weights,
+                       'sources': args.source or ['synthetic'], 'telemetry': args.telemetry,
+                       'cache_dir': args.cache_dir, 'results': results}, f, indent=2)
@@ -1,59 +1,82 @@
 import cv2
 import numpy as np
-import torch
-from ultralytics import YOLO
+import os
+import sys
 
-# Load the YOLO model from the local weights file
-model_path = 'C:/Users/angel/Downloads/model (4)/content/runs/detect/train/weights/best.pt'  # Update this path
-model = YOLO(model_path, verbose=False)  # Load YOLOv11 model
+# Shared detection helpers live with the Xavier deployment code
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yolo-drone copy'))
+from detectors import load_detector
+from tracker import Tracker
+from inference_scheduler import make_scheduler, SKIP
+from sources import open_frame_source
 
-# Open the webcam
-cap = cv2.VideoCapture(0)
+# Camera id -> device index, video file or 'synthetic' (see sources.open_frame_source);
+# frames from all cameras share one forward pass
+camera_sources = {
+    'nadir': 0,
+}
 
-# Start video stream and human detection
-while True:
-    ret, frame = cap.read()  # Capture frame-by-frame
-    if not ret:
-        break
+# Load the YOLO model from the local weights file; an exported .onnx/.torchscript model also works
+model_path = 'C:/Users/angel/Downloads/model (4)/content/runs/detect/train/weights/best.pt'  # Update this path
+backend = 'ultralytics' if model_path.endswith('.pt') else 'auto'  # YOLOv11 weights need ultralytics
+# Frames are letterboxed into one preallocated 640x640 batch buffer, one slot per camera
+detector = load_detector(backend, model_path, conf=0.5, input_size=640, batch_size=len(camera_sources))
 
-    # Get original frame dimensions
-    orig_height, orig_width = frame.shape[:2]
+# Full-frame inference only when the scene changed or every 30 frames, crops around tracks in between
+trackers = {camera_id: Tracker(min_hits=3) for camera_id in camera_sources}
+scheduler = make_scheduler('roi', lambda camera_id: trackers[camera_id].predicted_boxes())
 
-    # Resize the frame for YOLO model (YOLO expects a square input, 640x640)
-    input_size = 640
-    frame_resized = cv2.resize(frame, (input_size, input_size))
+def draw_detections(frame, detections):
+    """Draw the boxes of one batch entry onto its original frame."""
+    # Boxes already come back in original frame pixels; convert all of them at once
+    confident = detections[detections[:, 4] > 0.5]  # Adjust confidence threshold
+    corners = confident[:, :4].astype(int)
 
-    # Detect humans using the YOLO model
-    results = model(frame_resized, verbose=False)
+    label = 'Human'
+    for (x1, y1, x2, y2), conf in zip(corners, confident[:, 4]):
+        # Draw bounding box on the original frame
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        # Add label and confidence to the image
+        cv2.putText(frame, f'{label} {conf:.2f}', (x1, y1 - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 
-    # Check for boxes in the results
-    if results and results[0].boxes:
-        boxes = results[0].boxes
-        # Draw bounding boxes on the original frame
-        for box in boxes:
-            if box.conf[0] > 0.5:  # Adjust confidence threshold
-                x1, y1, x2, y2 = map(int, box.xyxy[0])  # Get coordinates in resized frame
+# Open the webcams
+caps = {camera_id: open_frame_source(source) for camera_id, source in camera_sources.items()}
 
-                # Scale the coordinates back to the original frame size
-                x1 = int(x1 * orig_width / input_size)
-                y1 = int(y1 * orig_height / input_size)
-                x2 = int(x2 * orig_width / input_size)
-                y2 = int(y2 * orig_height / input_size)
+# Start video stream and human detection
+while True:
+    frames = {}
+    for camera_id, cap in caps.items():
+        ret, frame = cap.read()  # Capture frame-by-frame
+        if ret:
+            frames[camera_id] = frame
+    if not frames:
+        break
 
-                label = 'Human'
-                # Draw bounding box on the original frame
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                # Add label and confidence to the image
-                cv2.putText(frame, f'{label} {box.conf[0]:.2f}', (x1, y1 - 5),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    # Detect humans in every camera's frame with a single batched call; the detector
+    # letterboxes them (aspect ratio kept) and maps the boxes back to each frame
+    camera_ids = list(frames)
+    batch_detections, modes, _ = scheduler.predict(detector.predict_batch, camera_ids,
+                                                   [frames[camera_id] for camera_id in camera_ids])
 
-    # Display the resulting frame with bounding boxes
-    cv2.imshow('Human Detection', frame)
+    for camera_id, detections, mode in zip(camera_ids, batch_detections, modes):
+        frame = frames[camera_id]
+        if mode == SKIP:
+            detections, _ = trackers[camera_id].coast()  # Show where the tracks are predicted to be
+        else:
+            trackers[camera_id].update(detections)
+        draw_detections(frame, detections)
+
+        # Display the resulting frame with bounding boxes
+        cv2.imshow(f'Human Detection ({camera_id})', frame)
 
     # Break the loop if 'q' is pressed
     if cv2.waitKey(1) & 0xFF == ord('q'):
         break
 
-# Release the webcam and close windows
-cap.release()
+print(f"Scheduler: {scheduler.stats()}")
+
+# Release the webcams and close windows
+for cap in caps.values():
+    cap.release()
 cv2.destroyAllWindows()